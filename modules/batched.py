@@ -0,0 +1,224 @@
+"""This is the batched module. This module contains an engine that plays
+many small games at the same time. The animals of every board are stored
+in the same arrays of an ArrayBoard together with the number of their
+board, so one vectorized iteration advances every board at once. Boards
+whose game has ended are cleared and get the next game of the queue.
+
+Games are played with the rules of modules.vectorized, every animal moves
+at the same time and battles are resolved afterwards.
+"""
+
+import numpy as np
+
+from modules.functions import GameResult
+from modules.vectorized import ArrayBoard, SPECIES
+
+
+class BatchedBoards(ArrayBoard):
+    """This class plays a queue of games on a fixed number of boards of the
+    same size. Every board holds one game at a time, and a board is
+    refilled with the next game as soon as its game ends
+
+    Attributes
+    ----------
+    board : numpy.ndarray of int
+        number of the board of every animal
+    n_boards : int
+        number of boards played at the same time
+    n_iter : int
+        the number of iterations of every game
+    slot_game : numpy.ndarray of int
+        number of the game on every board, -1 for a board without a game
+    slot_iter : numpy.ndarray of int
+        iteration of the game on every board
+    slot_battles : numpy.ndarray of int
+        number of battles of the game on every board
+
+    Methods
+    -------
+    board_counts()
+        returns the number of alive animals per board and species
+    play(games)
+        plays every game and returns their results
+    """
+
+    ARRAYS = ArrayBoard.ARRAYS + ('board',)
+
+    def __init__(self, grid_size, n_boards = 1024, n_iter = 25, seed = None):
+        """Constructor of BatchedBoards, the boards start without animals
+
+        Parameters
+        ----------
+        grid_size : tuple of length 2 containing int
+            dimension of every board
+        n_boards : int
+            number of boards played at the same time, default = 1024
+        n_iter : int
+            the number of iterations of every game, default = 25
+        seed : int or None
+            seed of the random number generator, default = None
+        """
+
+        super().__init__([], grid_size, seed)
+        self.board = np.zeros(0, dtype = np.int64)
+        self.n_boards = n_boards
+        self.n_iter = n_iter
+        self.slot_game = np.full(n_boards, -1)
+        self.slot_iter = np.zeros(n_boards, dtype = np.int64)
+        self.slot_battles = np.zeros(n_boards, dtype = np.int64)
+
+    def _cells(self, idx):
+        """returns the number of the cell of the given animals, cells of
+        different boards never share a number
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+
+        Returns
+        -------
+        numpy.ndarray of int
+            cell of every animal counted over all boards
+        """
+
+        rows, cols = self.grid_size
+        return (self.board[idx] * rows + self.rows[idx]) * cols + self.cols[idx]
+
+    def _battle(self, animal_one, animal_two):
+        """battles the animals like ArrayBoard and counts the battles of
+        every board
+
+        Parameters
+        ----------
+        animal_one : numpy.ndarray of int
+            indices of the first animals of each battle
+        animal_two : numpy.ndarray of int
+            indices of the second animals of each battle
+
+        Returns
+        -------
+        numpy.ndarray of int
+            indices of the winners
+        """
+
+        self.slot_battles += np.bincount(self.board[animal_one], minlength = self.n_boards)
+        return super()._battle(animal_one, animal_two)
+
+    def board_counts(self):
+        """returns the number of alive animals of every species on every board
+
+        Returns
+        -------
+        numpy.ndarray of int
+            array of shape (n_boards, len(SPECIES))
+        """
+
+        n_species = len(SPECIES)
+        alive = self.alive
+        counts = np.bincount(self.board[alive] * n_species + self.species[alive],
+                             minlength = self.n_boards * n_species)
+        return counts.reshape(self.n_boards, n_species)
+
+    def _refill(self, slots, queue):
+        """puts the next games of the queue on the given boards
+
+        Parameters
+        ----------
+        slots : numpy.ndarray of int
+            the boards without a game
+        queue : iterator
+            iterator of (number, counts) of the games left to play
+        """
+
+        # number of animals of every species of the new games
+        filled = []
+        rows = []
+        for slot in slots:
+            game = next(queue, None)
+            if game is None:
+                break
+            number, counts = game
+            unknown = [name for name in counts if name not in SPECIES]
+            if unknown:
+                raise ValueError('unknown species ' + ', '.join(repr(name) for name in unknown)
+                                 + ' in game ' + str(number))
+            self.slot_game[slot] = number
+            filled.append(slot)
+            rows.append([counts.get(name, 0) for name in SPECIES])
+        if not filled:
+            return
+
+        filled = np.array(filled)
+        self.slot_iter[filled] = 0
+        self.slot_battles[filled] = 0
+        rows = np.array(rows, dtype = np.int64)
+        species = np.repeat(np.tile(np.arange(len(SPECIES), dtype = np.int8), len(filled)),
+                            rows.ravel())
+        n = len(species)
+        # new animals start on random positions with the default state
+        new = {
+            'rows' : self.rng.integers(self.grid_size[0], size = n),
+            'cols' : self.rng.integers(self.grid_size[1], size = n),
+            'species' : species,
+            'alive' : np.ones(n, dtype = bool),
+            'can_move' : np.ones(n, dtype = bool),
+            'move_index' : np.zeros(n, dtype = np.int8),
+            'move_count' : np.zeros(n, dtype = np.int8),
+            'attack_index' : np.zeros(n, dtype = np.int8),
+            'board' : np.repeat(filled, rows.sum(axis = 1)),
+        }
+        for name in self.ARRAYS:
+            setattr(self, name, np.concatenate([getattr(self, name), new[name]]))
+
+    def play(self, games):
+        """plays every game of the queue, up to n_boards games at the same
+        time
+
+        Parameters
+        ----------
+        games : iterable of dict
+            dictionaries that map the species name to the number of animals
+            of every game
+
+        Returns
+        -------
+        results : list of GameResult
+            the outcome of every game, in the order of games
+        """
+
+        results = []
+        queue = enumerate(games)
+        self._refill(np.arange(self.n_boards), queue)
+
+        while True:
+            playing = self.slot_game >= 0
+            counts = self.board_counts()
+            n_species = np.count_nonzero(counts, axis = 1)
+            # a game ends when a species has won or it ran out of iterations
+            done = playing & ((n_species == 1) | (self.slot_iter >= self.n_iter))
+
+            slots = np.flatnonzero(done)
+            ended = zip(self.slot_game[slots].tolist(), counts[slots].tolist(),
+                        self.slot_iter[slots].tolist(), self.slot_battles[slots].tolist())
+            for number, slot_counts, iteration, battles in ended:
+                species_count = {SPECIES[i] : count for i, count in enumerate(slot_counts) if count > 0}
+                winner = None
+                if len(species_count) == 1:
+                    winner = next(iter(species_count))
+                results.append((number, GameResult(winner, iteration, species_count, battles)))
+            if len(slots):
+                # clear the boards of the ended games and start the next games
+                self.alive &= ~done[self.board]
+                self.slot_game[slots] = -1
+                self._refill(slots, queue)
+                # the new games may have ended before their first iteration
+                continue
+
+            if not playing.any():
+                break
+            self.step()
+            self.slot_iter[playing] += 1
+
+        results.sort(key = lambda result: result[0])
+        return [result for number, result in results]
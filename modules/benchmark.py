@@ -0,0 +1,277 @@
+"""This is the benchmark module. This module times games over a range of
+board sizes, populations and species mixes and writes the results as JSON
+so that runs on different commits can be compared.
+
+Run it from the repository root with
+
+    python -m modules.benchmark --output bench.json
+
+and add --full for the largest boards and populations.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from modules.classes import *
+from modules.functions import battle, run_simulation
+
+
+# share of every species in the mixes, scaled to the population
+MIXES = {
+    'balanced' : {'dog' : 1, 'turtle' : 1, 'frog' : 1, 'eagle' : 1, 'bear' : 1, 'lion' : 1, 'snake' : 1},
+    'frog_heavy' : {'frog' : 14, 'dog' : 1, 'turtle' : 1, 'eagle' : 1, 'bear' : 1, 'lion' : 1, 'snake' : 1},
+    'lion_heavy' : {'lion' : 14, 'dog' : 1, 'turtle' : 1, 'frog' : 1, 'eagle' : 1, 'bear' : 1, 'snake' : 1},
+}
+
+# (engine, grid_size, population, mix, n_iter, n_games) of every scenario,
+# 'objects' plays run_simulation, 'arrays' plays vectorized.ArrayBoard and
+# 'batched' plays all games together with batched.BatchedBoards
+SCENARIOS = [
+    ('objects', (5, 5), 7, 'balanced', 100, 2000),
+    ('batched', (5, 5), 7, 'balanced', 100, 20000),
+    ('objects', (5, 5), 20, 'frog_heavy', 100, 2000),
+    ('objects', (5, 5), 20, 'lion_heavy', 100, 2000),
+    ('objects', (50, 50), 100, 'balanced', 200, 20),
+    ('objects', (50, 50), 100, 'frog_heavy', 200, 20),
+    ('objects', (50, 50), 100, 'lion_heavy', 200, 20),
+    ('objects', (1000, 1000), 1000, 'balanced', 50, 1),
+    ('arrays', (1000, 1000), 100000, 'balanced', 10, 1),
+]
+FULL_SCENARIOS = [
+    ('objects', (10000, 10000), 10000, 'balanced', 10, 1),
+    ('objects', (10000, 10000), 10000, 'frog_heavy', 10, 1),
+    ('arrays', (10000, 10000), 1000000, 'balanced', 5, 1),
+    ('arrays', (10000, 10000), 1000000, 'lion_heavy', 5, 1),
+]
+
+
+def _play_scenario(engine, grid_size, counts, n_iter, n_games):
+    """plays the games of a scenario
+
+    Parameters
+    ----------
+    engine : str
+        'objects', 'arrays' or 'batched'
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    counts : dict
+        dictionary that maps the species name to the number of animals
+    n_iter : int
+        the number of iterations of every game
+    n_games : int
+        the number of games to play
+
+    Returns
+    -------
+    iterations : int
+        number of iterations played over all games
+    battles : int
+        number of battles fought over all games
+    """
+
+    if engine == 'batched':
+        from modules.batched import BatchedBoards
+        results = BatchedBoards(grid_size, 4096, n_iter, seed = 0).play([counts] * n_games)
+        return sum(result.n_iter for result in results), sum(result.n_battles for result in results)
+    
+    iterations = 0
+    battles = 0
+    for seed in range(n_games):
+        if engine == 'arrays':
+            # NumPy is only needed for the array scenarios
+            from modules.vectorized import ArrayBoard
+            result = ArrayBoard.from_counts(counts, grid_size, seed).play(n_iter)
+        else:
+            result = run_simulation(make_animals(counts), n_iter, grid_size, seed)
+        iterations += result.n_iter
+        battles += result.n_battles
+    return iterations, battles
+
+
+def run_scenario(engine, grid_size, population, mix, n_iter, n_games):
+    """times a scenario and then plays it again to measure its peak memory
+
+    Parameters
+    ----------
+    engine : str
+        'objects', 'arrays' or 'batched'
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    population : int
+        total number of animals
+    mix : str
+        name of the mix in MIXES
+    n_iter : int
+        the number of iterations of every game
+    n_games : int
+        the number of games to play
+
+    Returns
+    -------
+    dict
+        the scenario and its measurements
+    """
+
+    counts = scale_mix(MIXES[mix], population)
+
+    start = time.perf_counter()
+    iterations, battles = _play_scenario(engine, grid_size, counts, n_iter, n_games)
+    seconds = time.perf_counter() - start
+
+    # tracemalloc slows the game down, so memory is measured in a second run
+    tracemalloc.start()
+    _play_scenario(engine, grid_size, counts, n_iter, n_games)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'name' : engine + '_' + str(grid_size[0]) + 'x' + str(grid_size[1]) + '_' + str(population) + '_' + mix,
+        'engine' : engine,
+        'grid_size' : list(grid_size),
+        'population' : population,
+        'mix' : mix,
+        'n_iter' : n_iter,
+        'n_games' : n_games,
+        'seconds' : seconds,
+        'iterations' : iterations,
+        'battles' : battles,
+        'iterations_per_sec' : iterations / seconds,
+        'battles_per_sec' : battles / seconds,
+        'peak_memory_bytes' : peak,
+    }
+
+
+def _calls_per_sec(function, n_calls):
+    """times a function that takes no arguments
+
+    Parameters
+    ----------
+    function : callable
+        the function to time
+    n_calls : int
+        number of calls
+
+    Returns
+    -------
+    float
+        calls per second
+    """
+
+    start = time.perf_counter()
+    for i in range(n_calls):
+        function()
+    return n_calls / (time.perf_counter() - start)
+
+
+def run_micro(n_calls = 100000):
+    """times wander and battle on their own
+
+    Parameters
+    ----------
+    n_calls : int
+        number of calls of every function, default = 100000
+
+    Returns
+    -------
+    results : dict
+        dictionary that maps every micro benchmark to its calls per second
+    """
+
+    results = {}
+    # frogs and lions in the corner of a small board are the worst case of wander
+    for cls, position, grid_size in [(Dog, (2, 2), (5, 5)), (Frog, (0, 0), (3, 3)),
+                                     (Lion, (0, 0), (5, 5))]:
+        animal = cls()
+        animal.set_grid_size(grid_size)
+        animal.position = position
+        results['wander_' + animal.species + '_' + str(grid_size[0]) + 'x' + str(grid_size[1])] = \
+            _calls_per_sec(animal.wander, n_calls)
+
+    species_count = {'dog' : n_calls, 'bear' : n_calls}
+    dog = Dog()
+    bear = Bear()
+
+    def dog_bear_battle():
+        battle(dog, bear, species_count)
+        dog.is_alive = True
+        bear.is_alive = True
+    results['battle_dog_bear'] = _calls_per_sec(dog_bear_battle, n_calls)
+    return results
+
+
+def _commit():
+    """returns the current git commit, None outside of a git checkout
+    """
+
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output = True, text = True)
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+def run_benchmarks(full = False, scenarios = None, micro_calls = 100000):
+    """runs the micro benchmarks and every scenario
+
+    Parameters
+    ----------
+    full : bool
+        whether to include the largest boards and populations, default = False
+    scenarios : list of tuple or None
+        scenarios to run instead of SCENARIOS, default = None
+    micro_calls : int
+        number of calls of every micro benchmark, default = 100000
+
+    Returns
+    -------
+    dict
+        the machine readable report
+    """
+
+    if scenarios is None:
+        scenarios = SCENARIOS + FULL_SCENARIOS if full else SCENARIOS
+    return {
+        'commit' : _commit(),
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'micro' : run_micro(micro_calls),
+        'scenarios' : [run_scenario(*scenario) for scenario in scenarios],
+    }
+
+
+def main(argv = None):
+    """runs the benchmarks from the command line and prints or writes the report
+
+    Parameters
+    ----------
+    argv : list of str or None
+        command line arguments, default = None for sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description = 'Benchmark the animal battle royale.')
+    parser.add_argument('--full', action = 'store_true',
+                        help = 'include 10^4 x 10^4 boards and 10^6 animals')
+    parser.add_argument('--output', help = 'write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.full)
+    for scenario in report['scenarios']:
+        print('%-45s %12.0f it/s %12.0f battles/s %10.2f MB' % (
+            scenario['name'], scenario['iterations_per_sec'], scenario['battles_per_sec'],
+            scenario['peak_memory_bytes'] / 1e6), file = sys.stderr)
+
+    text = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
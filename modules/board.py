@@ -0,0 +1,422 @@
+"""This is the board module. This module contains the data structures
+that keep track of the animals of a game and where they are on the board.
+"""
+
+
+class OccupancyIndex():
+    """This class maps every occupied cell of the board to the animals on
+    it, so that only occupied cells are stored no matter how big the board
+    is. Animals can only share a cell when they are placed at the start of
+    the game, the animal added last is the occupant that battles animals
+    moving in.
+
+    Attributes
+    ----------
+    cells : dict
+        dictionary that maps a (row, col) tuple to the list of animals on it
+
+    Methods
+    -------
+    add(animal)
+        adds the animal to the cell of its position
+    remove(animal)
+        removes the animal from the cell of its position
+    occupant(position)
+        returns the animal that occupies a cell
+    to_grid(grid_size)
+        returns the board as a dense grid of characters
+    characters()
+        returns the character of every occupied cell
+    """
+
+    def __init__(self, animals = ()):
+        """Constructor of OccupancyIndex
+
+        Parameters
+        ----------
+        animals : iterable of Animal
+            animals to add to the index, default = ()
+        """
+
+        self.cells = {}
+        for animal in animals:
+            self.add(animal)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, animal):
+        """adds the animal to the cell of its current position
+
+        Parameters
+        ----------
+        animal : Animal
+            the animal to add
+        """
+
+        cell = animal.position
+        if cell in self.cells:
+            self.cells[cell].append(animal)
+        else:
+            self.cells[cell] = [animal]
+
+    def remove(self, animal):
+        """removes the animal from the cell of its current position, does
+        nothing if the animal is not on that cell
+
+        Parameters
+        ----------
+        animal : Animal
+            the animal to remove
+        """
+
+        cell = animal.position
+        on_cell = self.cells.get(cell)
+        if on_cell is None or animal not in on_cell:
+            return
+        on_cell.remove(animal)
+        # only store cells that are occupied
+        if not on_cell:
+            del self.cells[cell]
+
+    def occupant(self, position):
+        """returns the animal that occupies the cell
+
+        Parameters
+        ----------
+        position : tuple of int
+            row and column of the cell
+
+        Returns
+        -------
+        Animal or None
+            the occupant, None if the cell is empty
+        """
+
+        on_cell = self.cells.get(position)
+        if on_cell is None:
+            return None
+        return on_cell[-1]
+
+    def to_grid(self, grid_size, empty = '.'):
+        """builds the dense grid of characters of the board for display
+
+        Parameters
+        ----------
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        empty : str
+            character of empty cells, default = '.'
+
+        Returns
+        -------
+        grid_list : list of list of str
+            character of every cell of the board
+        """
+
+        grid_list = [[empty for i in range(grid_size[1])] for j in range(grid_size[0])]
+        for (row, col), on_cell in self.cells.items():
+            grid_list[row][col] = on_cell[-1].character
+        return grid_list
+
+    def characters(self):
+        """returns the character of the occupant of every occupied cell, a
+        snapshot of the board that only grows with the number of animals
+
+        Returns
+        -------
+        dict
+            dictionary that maps a (row, col) tuple to a character
+        """
+
+        return {cell : on_cell[-1].character for cell, on_cell in self.cells.items()}
+
+
+class SpatialIndex(OccupancyIndex):
+    """This class is an OccupancyIndex that also answers questions about
+    the neighbourhood of a cell. Animals are kept in square buckets of
+    cells for every species, so a query only looks at the buckets near
+    the cell instead of every animal. Distances are Manhattan distances,
+    the number of single steps between two cells
+
+    Attributes
+    ----------
+    bucket_size : int
+        number of rows and columns of a bucket
+    buckets : dict
+        dictionary that maps the species name to a dictionary that maps a
+        (bucket row, bucket col) tuple to the animals in the bucket
+    extent : list of int
+        smallest row, smallest col, largest row and largest col of the
+        buckets that ever held an animal
+
+    Methods
+    -------
+    within(position, radius, species, exclude)
+        returns the animals within a distance of a cell
+    nearest(position, k, species, exclude)
+        returns the k animals closest to a cell
+    """
+
+    def __init__(self, animals = (), bucket_size = 4):
+        """Constructor of SpatialIndex
+
+        Parameters
+        ----------
+        animals : iterable of Animal
+            animals to add to the index, default = ()
+        bucket_size : int
+            number of rows and columns of a bucket, default = 4
+        """
+
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.extent = None
+        super().__init__(animals)
+
+    def _bucket(self, position):
+        """returns the bucket of a cell
+
+        Parameters
+        ----------
+        position : tuple of int
+            row and column of the cell
+
+        Returns
+        -------
+        tuple of int
+            row and column of the bucket
+        """
+
+        return (position[0] // self.bucket_size, position[1] // self.bucket_size)
+
+    def add(self, animal):
+        """adds the animal to the cell and the bucket of its position
+
+        Parameters
+        ----------
+        animal : Animal
+            the animal to add
+        """
+
+        super().add(animal)
+        bucket = self._bucket(animal.position)
+        buckets = self.buckets.setdefault(animal.species, {})
+        # a dict keeps the order the animals were added in, unlike a set
+        buckets.setdefault(bucket, {})[animal] = None
+
+        extent = self.extent
+        if extent is None:
+            self.extent = [bucket[0], bucket[1], bucket[0], bucket[1]]
+        else:
+            extent[0] = min(extent[0], bucket[0])
+            extent[1] = min(extent[1], bucket[1])
+            extent[2] = max(extent[2], bucket[0])
+            extent[3] = max(extent[3], bucket[1])
+
+    def remove(self, animal):
+        """removes the animal from the cell and the bucket of its position,
+        does nothing if the animal is not on that cell
+
+        Parameters
+        ----------
+        animal : Animal
+            the animal to remove
+        """
+
+        on_cell = self.cells.get(animal.position)
+        if on_cell is None or animal not in on_cell:
+            return
+        super().remove(animal)
+        buckets = self.buckets[animal.species]
+        bucket = self._bucket(animal.position)
+        del buckets[bucket][animal]
+        # only store buckets that hold animals
+        if not buckets[bucket]:
+            del buckets[bucket]
+
+    def _species_buckets(self, species):
+        """returns the bucket dictionaries of the species to look at
+
+        Parameters
+        ----------
+        species : str or iterable of str or None
+            the species, None for every species
+
+        Returns
+        -------
+        list of dict
+            the bucket dictionaries
+        """
+
+        if species is None:
+            return list(self.buckets.values())
+        if isinstance(species, str):
+            species = (species,)
+        return [self.buckets[name] for name in species if name in self.buckets]
+
+    def _ring(self, center, d):
+        """returns the buckets at a Chebyshev distance of d buckets from the
+        center bucket
+
+        Parameters
+        ----------
+        center : tuple of int
+            the center bucket
+        d : int
+            distance in buckets
+
+        Returns
+        -------
+        list of tuple
+            the buckets of the ring
+        """
+
+        row, col = center
+        if d == 0:
+            return [center]
+        ring = [(row - d, col + j) for j in range(-d, d + 1)]
+        ring += [(row + d, col + j) for j in range(-d, d + 1)]
+        ring += [(row + i, col - d) for i in range(-d + 1, d)]
+        ring += [(row + i, col + d) for i in range(-d + 1, d)]
+        return ring
+
+    def within(self, position, radius, species = None, exclude = None):
+        """returns the animals within a distance of a cell
+
+        Parameters
+        ----------
+        position : tuple of int
+            row and column of the cell
+        radius : int
+            largest distance
+        species : str or iterable of str or None
+            species to look for, default = None for every species
+        exclude : Animal or None
+            animal to leave out, default = None
+
+        Returns
+        -------
+        found : list of Animal
+            the animals, closest first
+        """
+
+        row, col = position
+        low = self._bucket((row - radius, col - radius))
+        high = self._bucket((row + radius, col + radius))
+        found = []
+        for buckets in self._species_buckets(species):
+            for bucket_row in range(low[0], high[0] + 1):
+                for bucket_col in range(low[1], high[1] + 1):
+                    for animal in buckets.get((bucket_row, bucket_col), ()):
+                        distance = abs(animal.position[0] - row) + abs(animal.position[1] - col)
+                        if distance <= radius and animal is not exclude:
+                            found.append((distance, animal))
+        found.sort(key = lambda pair: pair[0])
+        return [animal for distance, animal in found]
+
+    def nearest(self, position, k = 1, species = None, exclude = None):
+        """returns the k animals closest to a cell, by looking at rings of
+        buckets around the cell until no animal further out can be closer
+
+        Parameters
+        ----------
+        position : tuple of int
+            row and column of the cell
+        k : int
+            number of animals, default = 1
+        species : str or iterable of str or None
+            species to look for, default = None for every species
+        exclude : Animal or None
+            animal to leave out, default = None
+
+        Returns
+        -------
+        list of Animal
+            up to k animals, closest first
+        """
+
+        species_buckets = [buckets for buckets in self._species_buckets(species) if buckets]
+        if not species_buckets:
+            return []
+        # rings further than every bucket that held an animal are empty
+        center = self._bucket(position)
+        low_row, low_col, high_row, high_col = self.extent
+        last = max(center[0] - low_row, high_row - center[0], center[1] - low_col, high_col - center[1])
+
+        found = []
+        for d in range(last + 1):
+            for buckets in species_buckets:
+                for bucket in self._ring(center, d):
+                    for animal in buckets.get(bucket, ()):
+                        if animal is not exclude:
+                            distance = (abs(animal.position[0] - position[0])
+                                        + abs(animal.position[1] - position[1]))
+                            found.append((distance, animal))
+            # animals outside the rings so far are more than d buckets away
+            # in a row or column, so at least d * bucket_size + 1 cells
+            if len(found) >= k:
+                found.sort(key = lambda pair: pair[0])
+                if found[k - 1][0] <= d * self.bucket_size:
+                    break
+        found.sort(key = lambda pair: pair[0])
+        return [animal for distance, animal in found[:k]]
+
+
+class Population():
+    """This class stores the animals of a game in the order they move.
+    Animals that lose a battle keep their slot and are skipped by the move
+    loop, compact() then moves the alive animals forward in one pass. The
+    order of the animals never changes, and nothing is copied or allocated
+    in an iteration without deaths
+
+    Attributes
+    ----------
+    animals : list of Animal
+        the animals, dead animals stay in it until the next compact()
+
+    Methods
+    -------
+    compact()
+        removes the dead animals and returns how many were removed
+    """
+
+    def __init__(self, animals = ()):
+        """Constructor of Population
+
+        Parameters
+        ----------
+        animals : iterable of Animal
+            the animals in the order they move, a set is taken in its
+            current order, default = ()
+        """
+
+        self.animals = list(animals)
+
+    def __len__(self):
+        return len(self.animals)
+
+    def __iter__(self):
+        return iter(self.animals)
+
+    def compact(self):
+        """removes the dead animals in place, the alive animals keep their
+        order
+
+        Returns
+        -------
+        int
+            the number of animals removed
+        """
+
+        animals = self.animals
+        kept = 0
+        # write every alive animal over the first free slot, the slots it
+        # writes to have already been read by the loop
+        for animal in animals:
+            if animal.is_alive:
+                animals[kept] = animal
+                kept += 1
+        n_removed = len(animals) - kept
+        del animals[kept:]
+        return n_removed
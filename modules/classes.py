@@ -4,7 +4,7 @@ both movement and attack.
 """
 
 import random
-from modules.functions import check_position, add_lists
+from modules.grid import check_position, valid_moves
 
 
 class Animal():
@@ -15,6 +15,12 @@ class Animal():
     ----------------
     attacks : list
         list containing all the attacks
+    moves : tuple
+        tuple containing the default possible moves, shared by all animals
+        of a species
+    senses : bool
+        whether the species looks at the board with the queries of
+        modules.board.SpatialIndex, games then keep a SpatialIndex
         
     Attributes
     ----------
@@ -24,17 +30,28 @@ class Animal():
         name of the species of this animal
     is_alive : bool
         whether the animal is alive or not
-    position : list
-        list containing position of animal
-    moves : list
-        list containing the default list of possible moves
+    position : tuple
+        tuple containing position of animal
     grid_size : tuple
         tuple containing the dimensions of the grid
+    rng : random.Random or module
+        random number generator of the animal, the random module by default
+    board : SpatialIndex or None
+        the board of the game for species that sense, None otherwise
+    counters : dict or None
+        counters of the instrumentation of the game, the animal adds the
+        wander retries it avoided to them. None when nothing is counted
         
     Methods
     -------
     set_grid_size(grid_size)
         sets the grid_size of the animal with grid_size
+    set_rng(rng)
+        sets the random number generator of the animal with rng
+    set_board(board)
+        sets the board the animal can look at
+    set_counters(counters)
+        sets the counters the animal adds its avoided retries to
     wander()
         finds the new possible position of animal
     move()
@@ -46,6 +63,11 @@ class Animal():
     """
     
     attacks = ['roar', 'bump', 'bite']
+    moves = ((-1, 0), (1, 0), (0, 1), (0, -1))
+    senses = False
+    
+    # store attributes in slots instead of a __dict__ per animal
+    __slots__ = ('character', 'species', 'is_alive', 'position', 'grid_size', 'rng', 'board', 'counters')
     
     def __init__(self, species, character):
         """Constructor of Animal
@@ -60,9 +82,11 @@ class Animal():
         self.character = character
         self.species = species
         self.is_alive = True
-        self.position = [0, 0]
-        self.moves = [[-1, 0], [1, 0], [0, 1], [0, -1]]
+        self.position = (0, 0)
         self.grid_size = None
+        self.rng = random
+        self.board = None
+        self.counters = None
         
     def set_grid_size(self, grid_size):
         """sets the new grid_size of animal
@@ -75,26 +99,66 @@ class Animal():
         
         self.grid_size = grid_size
         
+    def set_rng(self, rng):
+        """sets the random number generator used by the animal
+        
+        Parameters
+        ----------
+        rng : random.Random or BlockRandom
+            random number generator of the game
+        """
+        
+        self.rng = rng
+        
+    def set_board(self, board):
+        """sets the board the animal can look at with the queries of
+        SpatialIndex, the animal itself is not on the board while it moves
+        
+        Parameters
+        ----------
+        board : SpatialIndex or None
+            the board of the game
+        """
+        
+        self.board = board
+        
+    def set_counters(self, counters):
+        """sets the counters the animal adds the wander retries it avoided
+        to, a game sets them for every animal when it is instrumented
+        
+        Parameters
+        ----------
+        counters : dict or None
+            counters of the Instrumentation of the game
+        """
+        
+        self.counters = counters
+        
     def wander(self):
         """finds and returns a new possible position by adding moves
         by random
         
-        This function was implemented by me in a previous assignment
+        This function was implemented by me in a previous assignment. It
+        used to keep adding random moves until the position was valid, now
+        it picks one of the valid moves which has the same result
         
         Returns
         -------
-        new_pos : list
-            list containing the new valid position
+        new_pos : tuple
+            tuple containing the new valid position
         """
         
-        has_new_pos = False
-        # keep adding a random move until the position is valid
-        while (not has_new_pos):
-            move = random.choice(self.moves)
-            new_pos = add_lists(self.position, move)
-            #check if the position is valid using check_position function
-            has_new_pos = check_position(new_pos, self.grid_size)
-        return new_pos
+        valid = valid_moves(self.moves, self.position, self.grid_size)
+        # stay in place when the board is too small for any move
+        if not valid:
+            return self.position
+        
+        n_moves = len(self.moves)
+        if len(valid) < n_moves and self.counters is not None:
+            self.counters['wander_retries_avoided'] += (n_moves - len(valid)) / len(valid)
+        
+        move = self.moves[self.rng.choice(valid)]
+        return (self.position[0] + move[0], self.position[1] + move[1])
     
     def move(self):
         """sets the position of the animal with a new valid position
@@ -106,8 +170,8 @@ class Animal():
         """sets the position of the animal to a random position
         """
         
-        self.position[0] = random.randrange(self.grid_size[0])
-        self.position[1] = random.randrange(self.grid_size[1])
+        self.position = (self.rng.randrange(self.grid_size[0]),
+                         self.rng.randrange(self.grid_size[1]))
     
     def attack(self, opponent):
         """ the default attack method, returns the attack taken by
@@ -137,6 +201,8 @@ class Dog(Animal):
         returns the attack of this dog
     """
     
+    __slots__ = ()
+    
     def __init__(self):
         """Constructor of Dog
         """
@@ -159,7 +225,7 @@ class Dog(Animal):
             the attack taken by this dog
         """
         
-        return random.choice(Animal.attacks)
+        return self.rng.choice(Animal.attacks)
     
     
 class Turtle(Animal):
@@ -178,6 +244,8 @@ class Turtle(Animal):
         sets the new position of turtle after moving
     """
     
+    __slots__ = ('can_move',)
+    
     def __init__(self):
         """Constructor of Turtle
         """
@@ -203,20 +271,28 @@ class Frog(Animal):
     create Frog objects. The frog can jump double the distance of normal
     animals
     
+    Class attributes
+    ----------------
+    moves : tuple
+        tuple containing the possible moves of double the distance
+    
     Methods
     -------
     move()
         sets the new position of turtle after moving
     """
     
+    # replace moves with double the distance because the frog jumps
+    # double the distance
+    moves = ((-2, 0), (2, 0), (0, 2), (0, -2))
+    
+    __slots__ = ()
+    
     def __init__(self):
         """Constructor of Frog
         """
         
         super().__init__('frog', 'F')
-        # replace moves with double the distance because the turtle jumps
-        # double the distance
-        self.moves = [[-2, 0], [2, 0], [0, 2], [0, -2]]
     
     def attack(self, opponent):
         """This method overrides the attack method in Animals. The frog only bumps
@@ -248,6 +324,8 @@ class Eagle(Animal):
         returns the attack of the eagle
     """
     
+    __slots__ = ()
+    
     def __init__(self):
         """Constructor for Eagle
         """
@@ -281,7 +359,7 @@ class Eagle(Animal):
         elif opponent.species == 'frog':
             return 'bite'
         else:
-            return random.choice(Animal.attacks)
+            return self.rng.choice(Animal.attacks)
         
         
 class Bear(Animal):
@@ -299,6 +377,8 @@ class Bear(Animal):
         returns the attack of the bear
     """
     
+    __slots__ = ('attack_index',)
+    
     def __init__(self):
         """Constructor of Bear
         """
@@ -352,6 +432,8 @@ class Lion(Animal):
     
     attacks = ['roar', 'bite']
     
+    __slots__ = ('move_index', 'move_count')
+    
     def __init__(self):
         """Constructor of Lion
         """
@@ -364,26 +446,45 @@ class Lion(Animal):
         """Overrides the wander method in Animals. Keeps moving the 
         lion in the same direction for four times and switching to
         another direction until the position is valid
+        
+        Returns
+        -------
+        new_pos : tuple
+            tuple containing the new valid position
         """
         
-        has_new_pos = False
-        while not has_new_pos:
-            # set current move
-            move = self.moves[self.move_index]
-            
-            # increment move_count
-            self.move_count += 1
-            
-            # reset move_count and switch to new move when the count is 4
-            if (self.move_count == 4):
-                self.move_count = 0
-                self.move_index = random.randrange(4)
-            
-            # add move to position and check if valid
-            new_pos = add_lists(self.position, move)
-            has_new_pos = check_position(new_pos, self.grid_size)
-            
-        return new_pos
+        # set current move
+        move = self.moves[self.move_index]
+        
+        # increment move_count
+        self.move_count += 1
+        
+        # reset move_count and switch to new move when the count is 4
+        if (self.move_count == 4):
+            self.move_count = 0
+            self.move_index = self.rng.randrange(4)
+        
+        # add move to position and check if valid
+        new_pos = (self.position[0] + move[0], self.position[1] + move[1])
+        if check_position(new_pos, self.grid_size):
+            return new_pos
+        
+        # A blocked lion used to keep trying the same move until the count
+        # reached 4, then try random directions for four rounds each until
+        # one was valid. That always ends on a random valid direction with
+        # a count of 1, so pick it directly
+        valid = valid_moves(self.moves, self.position, self.grid_size)
+        if not valid:
+            return self.position
+        
+        if self.counters is not None:
+            churn = 4 - self.move_count if self.move_count > 0 else 0
+            self.counters['wander_retries_avoided'] += 1 + churn + 4 * (4 - len(valid)) / len(valid)
+        
+        self.move_index = self.rng.choice(valid)
+        self.move_count = 1
+        move = self.moves[self.move_index]
+        return (self.position[0] + move[0], self.position[1] + move[1])
     
     def move(self):
         """Overrides the move method in animals
@@ -407,7 +508,7 @@ class Lion(Animal):
         if opponent.species == 'snake':
             return 'roar'
         else:
-            return random.choice(Lion.attacks)
+            return self.rng.choice(Lion.attacks)
 
         
 class Snake(Animal):
@@ -423,6 +524,8 @@ class Snake(Animal):
         returns the attack of the Lion
     """
     
+    __slots__ = ()
+    
     def __init__(self):
         """Constructor of Snake
         """
@@ -449,4 +552,60 @@ class Snake(Animal):
         
         if opponent.species == 'eagle':
             return 'none'
-        return 'bite'
\ No newline at end of file
+        return 'bite'
+
+
+# maps the name of every species to the class used to create it
+SPECIES_CLASSES = {
+    'dog' : Dog,
+    'turtle' : Turtle,
+    'frog' : Frog,
+    'eagle' : Eagle,
+    'bear' : Bear,
+    'lion' : Lion,
+    'snake' : Snake,
+}
+
+
+def make_animals(mix):
+    """creates a list of new animals from the number of animals of each species
+    
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+        
+    Returns
+    -------
+    animals : list of Animal
+        the new animals, grouped by species in the order of mix
+    """
+    
+    animals = []
+    for species, count in mix.items():
+        animals.extend(SPECIES_CLASSES[species]() for i in range(count))
+    return animals
+
+
+def scale_mix(mix, population):
+    """turns the shares of a mix into numbers of animals
+    
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to its share
+    population : int
+        total number of animals
+    
+    Returns
+    -------
+    counts : dict
+        dictionary that maps the species name to the number of animals
+    """
+    
+    total = sum(mix.values())
+    counts = {species : population * share // total for species, share in mix.items()}
+    # give the animals lost to rounding to the first species
+    first = next(iter(counts))
+    counts[first] += population - sum(counts.values())
+    return counts
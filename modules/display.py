@@ -0,0 +1,246 @@
+"""This is the display module. This module contains the functions that
+show the board while a game is played. It is only imported when a board
+is displayed, so that games without output don't need it.
+
+show_frame prints the whole board and waits, which is what a notebook
+needs. FrameRenderer draws the boards of a game in a thread of its own at a
+target frame rate, so the game never waits for the display. It skips the
+boards it has no time for and only redraws the cells that changed with
+ANSI escape codes, so it needs a terminal.
+"""
+
+import queue
+import sys
+import threading
+from time import sleep, perf_counter
+
+
+def show_frame(grid_list, sleep_time):
+    """clears the previous frame, prints the grid and waits
+
+    Parameters
+    ----------
+    grid_list : list of list of str
+        character of every cell of the board
+    sleep_time : int
+        the time to wait after printing
+    """
+
+    from IPython.display import clear_output
+
+    # Clear the previous iteration, print the new grid (as a string), and wait
+    clear_output(True)
+    print('\n'.join([' '.join(lst) for lst in grid_list]))
+    sleep(sleep_time)
+
+
+def frame_updates(old, new, empty = '.'):
+    """finds the cells that changed between two boards
+
+    Parameters
+    ----------
+    old : dict
+        dictionary that maps a (row, col) tuple to the character of the
+        previous board
+    new : dict
+        dictionary that maps a (row, col) tuple to the character of the
+        new board
+    empty : str
+        character of empty cells, default = '.'
+
+    Returns
+    -------
+    updates : list of tuple
+        (row, col, character) of every cell that changed
+    """
+
+    # cells that were left empty
+    updates = [(row, col, empty) for (row, col) in old if (row, col) not in new]
+    # cells that were entered or changed occupant
+    for (row, col), character in new.items():
+        if old.get((row, col)) != character:
+            updates.append((row, col, character))
+    return updates
+
+
+class FrameRenderer():
+    """This class draws the boards of a game in a background thread. The
+    game submits boards to a bounded queue and never waits, when the queue
+    is full the oldest board is dropped, and the thread only draws the
+    newest board it finds.
+
+    Attributes
+    ----------
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    fps : float
+        number of boards drawn per second at most
+    out : file
+        where the boards are written to
+    empty : str
+        character of empty cells
+    frames_drawn : int
+        number of boards drawn
+    frames_dropped : int
+        number of boards that were submitted but never drawn
+
+    Methods
+    -------
+    start()
+        starts the thread that draws the boards
+    ready()
+        returns whether it is time to submit the next board
+    submit(cells)
+        queues a board to be drawn
+    close()
+        draws the last board and stops the thread
+    """
+
+    def __init__(self, grid_size, fps = 10, queue_size = 2, out = None, empty = '.'):
+        """Constructor of FrameRenderer
+
+        Parameters
+        ----------
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        fps : float
+            number of boards drawn per second at most, default = 10
+        queue_size : int
+            number of boards waiting to be drawn at most, default = 2
+        out : file or None
+            where the boards are written to, default = None for sys.stdout
+        empty : str
+            character of empty cells, default = '.'
+        """
+
+        self.grid_size = grid_size
+        self.fps = fps
+        self.out = sys.stdout if out is None else out
+        self.empty = empty
+        self.frames_drawn = 0
+        self.frames_dropped = 0
+        # both the game and the thread drop boards
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self.drawn = None
+        self.next_submit = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        """starts the thread that draws the boards
+        """
+
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    def ready(self):
+        """returns whether it is time to submit the next board, so that the
+        game can skip building boards that would never be drawn
+
+        Returns
+        -------
+        bool
+            whether a board submitted now would be drawn on time
+        """
+
+        return perf_counter() >= self.next_submit
+
+    def submit(self, cells):
+        """queues a board to be drawn without waiting, the oldest waiting
+        board is dropped when the queue is full
+
+        Parameters
+        ----------
+        cells : dict
+            dictionary that maps a (row, col) tuple to the character of
+            every occupied cell
+        """
+
+        self.next_submit = perf_counter() + 1 / self.fps
+        while True:
+            try:
+                self.queue.put_nowait(cells)
+                return
+            except queue.Full:
+                pass
+            # make room by dropping the board that has waited longest
+            try:
+                self.queue.get_nowait()
+                with self.lock:
+                    self.frames_dropped += 1
+            except queue.Empty:
+                pass
+
+    def close(self):
+        """draws the last submitted board and stops the thread
+        """
+
+        if self.thread is None:
+            return
+        # None tells the thread to stop, it must not be dropped
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        """draws the newest board in the queue until close is called
+        """
+
+        while True:
+            cells = self.queue.get()
+            stop = cells is None
+            # skip to the newest board, the ones before it are stale
+            while not stop:
+                try:
+                    newer = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    stop = True
+                else:
+                    cells = newer
+                    with self.lock:
+                        self.frames_dropped += 1
+
+            if cells is not None:
+                start = perf_counter()
+                self._draw(cells)
+                # wait for the next frame
+                if not stop:
+                    sleep(max(0.0, 1 / self.fps - (perf_counter() - start)))
+            if stop:
+                return
+
+    def _draw(self, cells):
+        """writes the board, only the changed cells after the first board
+
+        Parameters
+        ----------
+        cells : dict
+            dictionary that maps a (row, col) tuple to the character of
+            every occupied cell
+        """
+
+        rows, cols = self.grid_size
+        if self.drawn is None:
+            # clear the screen and draw every cell of the first board
+            lines = [' '.join(cells.get((row, col), self.empty) for col in range(cols))
+                     for row in range(rows)]
+            text = ['\x1b[2J\x1b[H' + '\n'.join(lines)]
+        else:
+            # move the cursor to every changed cell, columns are two wide
+            text = ['\x1b[%d;%dH%s' % (row + 1, 2 * col + 1, character)
+                    for row, col, character in frame_updates(self.drawn, cells, self.empty)]
+        # leave the cursor below the board
+        text.append('\x1b[%d;1H' % (rows + 1))
+        self.out.write(''.join(text))
+        self.out.flush()
+        self.drawn = cells
+        self.frames_drawn += 1
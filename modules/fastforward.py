@@ -0,0 +1,445 @@
+"""This is the fastforward module. This module plays a game without moving
+every animal in every iteration, which is much faster on large boards with
+few animals.
+
+For every pair of animals it keeps the earliest iteration in which they
+could meet, from their distance and how far each species can get in an
+iteration, in a priority queue. The game jumps ahead to that iteration.
+Every animal has its own clock, and it is only moved forward to the
+current iteration when one of its pairs is due, then the iteration of
+that pair is worked out again from where the two animals are now. A bound
+from where an animal was at an older clock is still a valid bound, so the
+other pairs of the animal stay in the queue as they are. Only the animals
+that could meet are moved through the iteration together; the others stay
+where they were until they are needed.
+
+Animals only affect each other in battles, so moving an animal through
+many iterations at once draws its path from the same distribution as
+playing the game one iteration at a time. The outcomes have the same
+distribution as run_simulation, but not the same numbers for a seed.
+Eagles can reach any cell, so while an eagle is alive every iteration is
+played for every animal. On small crowded boards almost every pair is
+always due, and run_simulation is faster.
+"""
+
+import heapq
+
+from modules.classes import Animal, Turtle
+from modules.board import OccupancyIndex, SpatialIndex
+from modules.functions import _fight, _make_rng, _to_collection, GameResult
+
+
+# distance of a move of the species that don't use Animal.moves, None for
+# species that can reach any cell
+STEPS = {'snake' : 0, 'eagle' : None}
+
+# maps the class of an animal to the distance of its longest move
+_class_steps = {}
+
+
+def max_step(animal):
+    """returns the largest distance the animal can move in one move
+
+    Parameters
+    ----------
+    animal : Animal
+        the animal
+
+    Returns
+    -------
+    int or None
+        Manhattan distance of the longest move, None when it can reach
+        any cell
+    """
+
+    cls = type(animal)
+    if cls not in _class_steps:
+        if animal.species in STEPS:
+            _class_steps[cls] = STEPS[animal.species]
+        else:
+            _class_steps[cls] = max(abs(row) + abs(col) for row, col in animal.moves)
+    return _class_steps[cls]
+
+
+def speed(animal):
+    """returns how far an animal can get from its position, as twice the
+    distance it can cover in k iterations being at most rate * k + offset.
+    Turtles only move every other iteration, so they get half of the rate
+    and a head start when they move in the next iteration
+
+    Parameters
+    ----------
+    animal : Animal
+        the animal, it must not be able to reach any cell
+
+    Returns
+    -------
+    rate : int
+        twice the distance of the longest move in an iteration
+    offset : int
+        twice the distance of the head start
+    """
+
+    step = max_step(animal)
+    if isinstance(animal, Turtle):
+        return step, step if animal.can_move else 0
+    return 2 * step, 0
+
+
+def _walk(animal, n_iterations, rng):
+    """moves an animal through many iterations at once when every move it
+    could make is valid, then its moves are independent and uniform so only
+    the number of moves in every direction has to be drawn
+
+    Parameters
+    ----------
+    animal : Animal
+        the animal to move
+    n_iterations : int
+        number of iterations
+    rng : random.Random or BlockRandom
+        random number generator of the game
+
+    Returns
+    -------
+    bool
+        whether the animal was moved, False when it has to be moved one
+        iteration at a time
+    """
+
+    cls = type(animal)
+    turtle = isinstance(animal, Turtle)
+    # only animals that wander like Animal can be moved at once
+    if not turtle and (cls.move is not Animal.move or cls.wander is not Animal.wander):
+        return False
+
+    n_moves = n_iterations
+    if turtle:
+        n_moves = (n_iterations + animal.can_move) // 2
+
+    # every move is valid when the animal can't get to an edge
+    row, col = animal.position
+    edge = min(row, col, animal.grid_size[0] - 1 - row, animal.grid_size[1] - 1 - col)
+    if max_step(animal) * n_moves > edge:
+        return False
+
+    picks = rng.choices(range(len(animal.moves)), k = n_moves)
+    for m, move in enumerate(animal.moves):
+        count = picks.count(m)
+        row += count * move[0]
+        col += count * move[1]
+    animal.position = (row, col)
+    if turtle and n_iterations % 2 == 1:
+        animal.can_move = not animal.can_move
+    return True
+
+
+class FastForward():
+    """This class plays a game by jumping over the iterations in which no
+    two animals can meet
+
+    Attributes
+    ----------
+    animals : list of Animal
+        all of the animals in the order they move
+    n_iter : int
+        the number of iterations to run for this game
+    grid_size : tuple
+        dimension of the grid
+    rng : random.Random or BlockRandom
+        random number generator of the game
+    now : int
+        the current iteration of the game
+    clocks : list of int
+        iteration every animal has been moved to
+    queue : list of tuple
+        heap of (iteration, i, j) of every pair that can meet in the game
+    species_count : dict
+        dictionary that maps the species name to its remaining count
+    n_battles : int
+        number of battles so far
+    n_moved : int
+        number of moves that were played, to compare with n_iter times
+        the number of animals
+
+    Methods
+    -------
+    play()
+        plays the game and returns its outcome
+    """
+
+    def __init__(self, animals, n_iter, grid_size, rng):
+        """Constructor of FastForward, places the animals at random like
+        run_simulation
+
+        Parameters
+        ----------
+        animals : list of Animal
+            all of the animals in the order they move
+        n_iter : int
+            the number of iterations to run for this game
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        rng : random.Random or BlockRandom
+            random number generator of the game
+        """
+
+        self.animals = animals
+        self.n_iter = n_iter
+        self.grid_size = grid_size
+        self.rng = rng
+        self.now = 0
+        self.clocks = [0] * len(animals)
+        self.queue = []
+        self.species_count = {}
+        self.n_battles = 0
+        self.n_moved = 0
+
+        for animal in animals:
+            animal.set_grid_size(grid_size)
+            animal.set_rng(rng)
+            animal.random_pos()
+            self.species_count[animal.species] = self.species_count.get(animal.species, 0) + 1
+
+        # eagles have no speed, they are played in every iteration
+        self.speeds = [None if animal.species == 'eagle' else speed(animal) for animal in animals]
+
+    def _meeting(self, i, j):
+        """returns the earliest iteration in which two animals could share
+        a cell, from where they were at their clocks
+
+        Parameters
+        ----------
+        i : int
+            index of the first animal
+        j : int
+            index of the second animal
+
+        Returns
+        -------
+        int
+            the iteration, n_iter when they can't meet in the game
+        """
+
+        one = self.animals[i]
+        two = self.animals[j]
+        distance = abs(one.position[0] - two.position[0]) + abs(one.position[1] - two.position[1])
+        if distance == 0:
+            return self.now
+        rate_i, offset_i = self.speeds[i]
+        rate_j, offset_j = self.speeds[j]
+        if rate_i + rate_j == 0:
+            return self.n_iter
+
+        # they can only meet in iteration t when the distances they can
+        # cover from their clocks up to the end of t add up to the distance
+        #     rate_i * (t + 1 - clock_i) + offset_i
+        #   + rate_j * (t + 1 - clock_j) + offset_j >= 2 * distance
+        # so the first such t is rounded up from
+        needed = (2 * distance - offset_i - offset_j + rate_i * (self.clocks[i] - 1)
+                  + rate_j * (self.clocks[j] - 1))
+        meeting = -(-needed // (rate_i + rate_j))
+        return min(max(meeting, self.now), self.n_iter)
+
+    def _push(self, i, j):
+        """adds a pair to the queue, pairs that can't meet in the game are
+        left out
+
+        Parameters
+        ----------
+        i : int
+            index of the first animal
+        j : int
+            index of the second animal
+        """
+
+        meeting = self._meeting(i, j)
+        if meeting < self.n_iter:
+            heapq.heappush(self.queue, (meeting, i, j))
+
+    def _rebuild(self):
+        """fills the queue with every pair of alive animals that can meet in
+        the game. The clocks of the alive animals are all at the current
+        iteration here, so an animal can only meet the animals within the
+        distance it and the fastest animal cover in the remaining
+        iterations, and only those are looked up in a SpatialIndex
+        """
+
+        self.queue = []
+        alive = [i for i, animal in enumerate(self.animals) if animal.is_alive]
+        if not alive:
+            return
+        remaining = self.n_iter - self.now
+        fastest = max(self.speeds[i][0] for i in alive)
+        head_start = max(self.speeds[i][1] for i in alive)
+        # twice the distance covered by both animals, see _meeting
+        reach = [((self.speeds[i][0] + fastest) * remaining + self.speeds[i][1] + head_start) // 2
+                 for i in alive]
+
+        index = SpatialIndex((self.animals[i] for i in alive), bucket_size = max(1, max(reach)))
+        number = {self.animals[i] : i for i in alive}
+        for i, radius in zip(alive, reach):
+            animal = self.animals[i]
+            for other in index.within(animal.position, radius, exclude = animal):
+                j = number[other]
+                if j < i:
+                    continue
+                meeting = self._meeting(i, j)
+                if meeting < self.n_iter:
+                    self.queue.append((meeting, i, j))
+        heapq.heapify(self.queue)
+
+    def _advance(self, i):
+        """moves an animal through the iterations since its clock
+
+        Parameters
+        ----------
+        i : int
+            index of the animal
+        """
+
+        animal = self.animals[i]
+        n_iterations = self.now - self.clocks[i]
+        if not _walk(animal, n_iterations, self.rng):
+            for _ in range(n_iterations):
+                animal.move()
+        self.n_moved += n_iterations
+        self.clocks[i] = self.now
+        self.speeds[i] = speed(animal)
+
+    def _step(self, hot):
+        """plays the current iteration for the given animals, like the loop
+        of modules.functions._play
+
+        Parameters
+        ----------
+        hot : list of int
+            indices of the animals that could meet, in the order they move
+        """
+
+        index = OccupancyIndex(self.animals[i] for i in hot)
+        for i in hot:
+            animal = self.animals[i]
+            # skip animals that lost a battle earlier in this iteration
+            if not animal.is_alive:
+                continue
+            index.remove(animal)
+            animal.move()
+            prev_animal = index.occupant(animal.position)
+            if prev_animal is not None:
+                self.n_battles += 1
+                loser = _fight(animal, prev_animal, self.species_count, self.rng)[0]
+                if loser is prev_animal:
+                    index.remove(prev_animal)
+                    index.add(animal)
+            else:
+                index.add(animal)
+        self.n_moved += len(hot)
+        for i in hot:
+            self.clocks[i] = self.now + 1
+            if self.speeds[i] is not None:
+                self.speeds[i] = speed(self.animals[i])
+
+    def _due(self):
+        """finds the pairs of animals that could meet in the current
+        iteration, moving animals forward to it when one of their pairs is due
+
+        Returns
+        -------
+        hot : list of int
+            indices of the animals to play the iteration for, in the order
+            they move
+        pairs : list of tuple
+            the pairs that could meet, they are taken out of the queue
+        """
+
+        hot = set()
+        pairs = []
+        queue = self.queue
+        while queue and queue[0][0] <= self.now:
+            meeting, i, j = heapq.heappop(queue)
+            if not (self.animals[i].is_alive and self.animals[j].is_alive):
+                continue
+            # move both animals to the current iteration and look at the
+            # pair again from where they are now
+            for k in (i, j):
+                if self.clocks[k] < self.now:
+                    self._advance(k)
+            if self._meeting(i, j) > self.now:
+                self._push(i, j)
+                continue
+            hot.update((i, j))
+            pairs.append((i, j))
+        return sorted(hot), pairs
+
+    def play(self):
+        """plays the game until only one species is left or the number of
+        iterations is reached
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        eagles = self.species_count.get('eagle', 0) > 0
+        if not eagles:
+            self._rebuild()
+
+        while self.now < self.n_iter:
+            # Check if a species has won
+            if len(self.species_count) == 1:
+                for winner in self.species_count.keys():
+                    return GameResult(winner, self.now, self.species_count, self.n_battles)
+
+            if eagles:
+                # eagles can meet anyone, so play the iteration for everyone
+                alive = [i for i, animal in enumerate(self.animals) if animal.is_alive]
+                self._step(alive)
+                self.now += 1
+                if self.species_count.get('eagle', 0) == 0:
+                    eagles = False
+                    self._rebuild()
+                continue
+
+            hot, pairs = self._due()
+            if hot:
+                self._step(hot)
+                self.now += 1
+                # put the pairs that could meet back in the queue
+                for i, j in pairs:
+                    if self.animals[i].is_alive and self.animals[j].is_alive:
+                        self._push(i, j)
+            else:
+                # no pair can meet before the next entry of the queue
+                self.now = self.queue[0][0] if self.queue else self.n_iter
+
+        return GameResult(None, self.n_iter, self.species_count, self.n_battles)
+
+
+def run_fast_forward(animals, n_iter = 25, grid_size = (5, 5), seed = None):
+    """ plays the board like run_simulation, but jumps over the iterations
+    in which no animals can meet
+
+    Parameters
+    ----------
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the list
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        seed for the random numbers of this game, default = None
+
+    Returns
+    -------
+    GameResult
+        the outcome of the game
+    """
+
+    animals = _to_collection(animals)
+    if len(animals) == 0:
+        raise ValueError('No animals provided')
+
+    return FastForward(list(animals), n_iter, grid_size, _make_rng(seed)).play()
@@ -3,64 +3,82 @@ for playing the board.
 """
 
 import random
-import string
+from time import perf_counter
 from modules.classes import *
+from modules.board import OccupancyIndex, Population, SpatialIndex
+from modules.grid import add_lists, check_position, valid_moves
 
-from time import sleep
-from IPython.display import clear_output
 
+# attacks encoded as small ints, 'roar', 'bump' and 'bite' keep the order
+# of Animal.attacks
+ATTACKS = ('none', 'roar', 'bump', 'bite')
+ATTACK_CODES = {attack : i for i, attack in enumerate(ATTACKS)}
 
-def add_lists(list1, list2):
-    """Add two lists by adding the elements with the
-    same index
-    
-    Code written by me from previous assignment
+# BATTLE_TABLE[attack_one][attack_two] is 0 when the first animal loses,
+# 1 when the second animal loses and 2 when the loser is chosen by random
+BATTLE_TABLE = (
+    (2, 0, 0, 0),
+    (1, 2, 0, 1),
+    (1, 1, 2, 0),
+    (1, 0, 1, 2),
+)
+
+
+def _fight(animal_one, animal_two, species_count, rng):
+    """lets two animals attack each other, kills the loser and removes it
+    from species_count
     
     Parameters
     ----------
-    list1 : list of int
-        first list to add
-    list2 : list of int
-        second list to add
+    animal_one : Animal
+        first animal in battle
+    animal_two : Animal
+        second animal in battle
+    species_count : dict
+        dictionary that maps the species name to the remaining count
+    rng : random.Random or module
+        random number generator used to break ties
         
     Returns
     -------
-    output : list of int
-        sum of two lists
+    to_remove : Animal
+        the animal that has lost the battle
+    attack_one : int
+        code of the attack of the first animal
+    attack_two : int
+        code of the attack of the second animal
     """
     
-    output = []
+    # get the attacks of both animals
+    attack_one = ATTACK_CODES[animal_one.attack(animal_two)]
+    attack_two = ATTACK_CODES[animal_two.attack(animal_one)]
     
-    # concurrently loop through elements in both lists
-    for i, j in zip(list1, list2):
-        output.append(i + j) # append the sum to output
-    return output
-
-
-def check_position(position, grid_size):
-    """check whether position is valid given the grid size
+    # look up which animal to remove
+    # If the attacks are the same, choose animal by random
+    outcome = BATTLE_TABLE[attack_one][attack_two]
+    if outcome == 0:
+        to_remove = animal_one
+    elif outcome == 1:
+        to_remove = animal_two
+    else:
+        to_remove = rng.choice([animal_one, animal_two])
     
-    Parameters
-    ----------
-    position : array of length 2 containing int
-        contains the row and column position of the animal to check
-    grid_size : tuple of length 2 containing int
-        contains the total rows and columns of the board
-        
-    Returns
-    -------
-    bool
-        boolean of whether the position is valid
-    """
+    # set is_alive attribute to false so that it is skipped when
+    # loading the board
+    to_remove.is_alive = False
     
-    # check if the position is valid for both rows and columns
-    for i in range(0, 2):
-        if not (0 <= position[i] < grid_size[i]):
-            return False
-    return True
+    # subtract the count of the species to remove by 1 and remove the
+    # species from the dict when none are left
+    species = to_remove.species
+    curr_count = species_count.get(species, 1) - 1
+    if curr_count == 0:
+        species_count.pop(species, None)
+    else:
+        species_count[species] = curr_count
+    return to_remove, attack_one, attack_two
 
 
-def battle(animal_one, animal_two, species_count):
+def battle(animal_one, animal_two, species_count, rng = random):
     """starts a battle between two animals and mutates animals and 
     species_count depending o nthe result of the battle.
     
@@ -75,6 +93,8 @@ def battle(animal_one, animal_two, species_count):
         second animal in battle
     species_count : dict
         dictionary that maps the species name to the remaining count
+    rng : random.Random or module
+        random number generator used to break ties, default = random
         
     Returns
     -------
@@ -82,51 +102,7 @@ def battle(animal_one, animal_two, species_count):
         the animal that has won the battle
     """
     
-    # get the attacks of both animals
-    attack_one = animal_one.attack(animal_two)
-    attack_two = animal_two.attack(animal_one)
-    to_remove = None
-    
-    # Compare the two attacks to decide which animal to remove
-    # If the attacks are the same, choose animal by random
-    if attack_one == 'roar':
-        if attack_two == 'bump':
-            to_remove = animal_one
-        elif attack_two == 'roar':
-            to_remove = random.choice([animal_one, animal_two])
-        else:
-            to_remove = animal_two
-    elif attack_one == 'bump':
-        if attack_two == 'bite':
-            to_remove = animal_one
-        elif attack_two == 'bump':
-            to_remove = random.choice([animal_one, animal_two])
-        else:
-            to_remove = animal_two
-    elif attack_one == 'bite':
-        if attack_two == 'roar':
-            to_remove = animal_one
-        elif attack_two == 'bite':
-            to_remove = random.choice([animal_one, animal_two])
-        else:
-            to_remove = animal_two
-    elif attack_one == 'none':
-        if attack_two == 'none':
-            to_remove = random.choice([animal_one, animal_two])
-        else:
-            to_remove = animal_one
-    
-    # set is_alive attribute to false so that it is skipped when
-    # loading the board
-    to_remove.is_alive = False
-    
-    # get the count of the species to remove and subtract it by 1
-    curr_count = species_count.get(to_remove.species, 1) - 1
-    if curr_count == 0: # if count is 0 remove species from dict
-        if to_remove.species in species_count:
-            species_count.pop(to_remove.species)
-    else: # else update the species with the new count
-        species_count.update({to_remove.species : curr_count})
+    to_remove = _fight(animal_one, animal_two, species_count, rng)[0]
     
     # return the winner animal
     if to_remove is animal_one:
@@ -134,101 +110,459 @@ def battle(animal_one, animal_two, species_count):
     else:
         return animal_one
 
+
+class GameResult():
+    """This class stores the outcome of a game played on the board
     
-def play_board(animals, n_iter = 25, grid_size = (5, 5), sleep_time = 0.3):
-    """ plays the board using the animals provided
+    Attributes
+    ----------
+    winner : str or None
+        species that won the game, None if the game was a tie
+    is_tie : bool
+        whether the game ended without a winner
+    n_iter : int
+        number of iterations played before the game ended
+    species_count : dict
+        dictionary that maps the species name to the remaining count
+    n_battles : int
+        number of battles fought during the game
+    """
     
-    This function was significantly modified from the provided function in previous
-    assignment.
+    def __init__(self, winner, n_iter, species_count, n_battles):
+        """Constructor of GameResult
+        
+        Parameters
+        ----------
+        winner : str or None
+            species that won the game, None if the game was a tie
+        n_iter : int
+            number of iterations played before the game ended
+        species_count : dict
+            dictionary that maps the species name to the remaining count
+        n_battles : int
+            number of battles fought during the game
+        """
+        
+        self.winner = winner
+        self.is_tie = winner is None
+        self.n_iter = n_iter
+        self.species_count = species_count
+        self.n_battles = n_battles
+        
+    def __repr__(self):
+        return ('GameResult(winner=' + repr(self.winner) + ', n_iter=' + str(self.n_iter)
+                + ', species_count=' + repr(self.species_count)
+                + ', n_battles=' + str(self.n_battles) + ')')
+
+
+def _make_rng(seed):
+    """creates the random number generator of a game
     
     Parameters
     ----------
-    animals : set of Animal
-        set containing all of the animals
-    n_iter : int
-        the number of iterations to run for this game. default = 25
-    grid_size : tuple of length 2 containing int
-        dimension of the grid, default = (5, 5)
-    sleep_time : int
-        the time between each iteration
+    seed : int or None
+        seed of the generator
+        
+    Returns
+    -------
+    random.Random
+        the new generator
     """
     
-    # check if no animals are provided
-    if len(animals) == 0:
-        print("No animals provided!!!")
-        return
+    return random.Random(seed)
+
+
+class IterationDelta():
+    """This class stores what changed on the board between two iterations
+    of a game. Animals are identified by their index in the order they
+    were given to the game
     
-    # If input is a single animal, put it in a list so that procedures work
-    if not type(animals) == set:
-        animals = {animals}
+    Attributes
+    ----------
+    iteration : int
+        the iteration that is about to start
+    spawns : list of tuple
+        (animal, species, position) of every animal placed on the board,
+        only filled for iteration 0
+    moves : list of tuple
+        (animal, old position, new position) of every animal that changed cells
+    battles : list of tuple
+        (animal_one, animal_two, attack_one, attack_two, loser) of every
+        battle, attacks are codes of ATTACKS
+    deaths : list of int
+        animals that lost a battle
+    species_count : dict
+        dictionary that maps the species name to the remaining count
+    """
+    
+    def __init__(self, iteration, species_count):
+        """Constructor of IterationDelta
+        
+        Parameters
+        ----------
+        iteration : int
+            the iteration that is about to start
+        species_count : dict
+            dictionary that maps the species name to the remaining count
+        """
+        
+        self.iteration = iteration
+        self.spawns = []
+        self.moves = []
+        self.battles = []
+        self.deaths = []
+        self.species_count = species_count
+        
+    def __repr__(self):
+        return ('IterationDelta(iteration=' + str(self.iteration) + ', moves=' + str(len(self.moves))
+                + ', battles=' + str(len(self.battles)) + ', species_count='
+                + repr(self.species_count) + ')')
+
+
+def _play(animals, n_iter, grid_size, result, rng, record = False, instrument = None,
+          distinct = False):
+    """plays the board without any output. At the start of every iteration,
+    and once more after the last iteration when no species has won, it
+    yields the occupancy index of the board so that callers can render it,
+    together with the IterationDelta of the changes since the last yield.
+    The outcome of the game is stored in result once the generator is
+    exhausted.
+    
+    Parameters
+    ----------
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the
+        list. The game keeps its own Population, animals is not changed
+    n_iter : int
+        the number of iterations to run for this game
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    result : dict
+        dictionary that is filled with the keyword arguments of GameResult
+    rng : random.Random or BlockRandom
+        random number generator shared by the animals and battles
+    record : bool
+        whether to fill the events of the deltas, default = False
+    instrument : Instrumentation or None
+        collects the timers and counters of the game, default = None
+    distinct : bool
+        whether to place every animal on a cell of its own, default = False
+    """
     
     # Update each animal to know about the grid_size they are on and set species_count
     # to check which species are left
     species_count = {} # map the species to its total count
     for animal in animals:
-        # set grid size
+        # set grid size and random number generator
         animal.set_grid_size(grid_size)
+        animal.set_rng(rng)
+        # only instrumented games count the wander retries of the animals
+        animal.set_counters(None if instrument is None else instrument.counters)
         
         # randomize the position of each animal
-        animal.random_pos()
+        if not distinct:
+            animal.random_pos()
         
         # get previous count and increment by 1
         curr_count = 1 + species_count.get(animal.species, 0) 
         # update with the new count
         species_count.update({animal.species : curr_count})
+    
+    if distinct:
+        # NumPy is only needed to place the animals on distinct cells
+        from modules.spawn import place_animals
+        place_animals(animals, grid_size, rng.randrange(2 ** 63))
+    
+    result.update(winner=None, n_iter=n_iter, species_count=species_count, n_battles=0)
+    
+    # the animals in the order they move, dead animals are compacted away
+    population = Population(animals)
+    
+    # store the animals by cell, it is updated as animals move and die
+    # instead of building the whole grid again every iteration
+    if any(animal.senses for animal in animals):
+        # species that sense the board get the neighbourhood queries
+        index = SpatialIndex(animals)
+        for animal in animals:
+            animal.set_board(index)
+    else:
+        index = OccupancyIndex(animals)
+    
+    delta = IterationDelta(0, dict(species_count))
+    if record:
+        # number the animals so that events don't hold on to Animal objects
+        ids = {animal : i for i, animal in enumerate(animals)}
+        delta.spawns = [(ids[animal], animal.species, animal.position) for animal in animals]
+
+    # only look at the clock when the game is instrumented
+    timing = instrument is not None
 
     # loop through the iterations
     for it in range(n_iter):
 
-        # initialize grid that only contains '.' for this iteration
-        grid_list = [['.' for i in range(grid_size[1])] for j in range(grid_size[0])]
-        # initialize grid that only contains None to store position of animal
-        animal_grid = [[None for i in range(grid_size[1])] for j in range(grid_size[0])]
-
-        animals_copy = animals.copy()
-        # loop through all animals and update grids
-        for animal in animals_copy:
-            # skip animal and remove from set if not alive
-            if not animal.is_alive:
-                animals.remove(animal)
-                continue
-                
-            # update with animal character for display
-            grid_list[animal.position[0]][animal.position[1]] = animal.character
-            # update with Animal object to store position
-            animal_grid[animal.position[0]][animal.position[1]] = animal
+        if timing:
+            start = perf_counter()
+        
+        # remove the animals that are not alive anymore, only when some
+        # animals died in the last iteration
+        n_dead = 0
+        if len(population) != sum(species_count.values()):
+            n_dead = population.compact()
+        
+        if timing:
+            instrument.timers['purge'] += perf_counter() - start
+            instrument.counters['purged'] += n_dead
 
-        # Clear the previous iteration, print the new grid (as a string), and wait
-        clear_output(True)
-        print('\n'.join([' '.join(lst) for lst in grid_list]))
-        sleep(sleep_time)
+        # let the caller look at the board before anything moves
+        yield index, delta
         
         # Check if a species has won
         if len(species_count) == 1:
-            # print the only remaining species in species_count
+            # store the only remaining species in species_count
             for winner in species_count.keys():
-                print('\nWinner: ' + winner + '!!!!')
-            # terminate the program
+                result.update(winner=winner, n_iter=it)
             return
+        
+        delta = IterationDelta(it + 1, None)
+        
+        if timing:
+            start = perf_counter()
+            battle_time = 0.0
+            n_battles = result['n_battles']
 
         # Update animal position(s) for next turn
-        for animal in animals:
-            # clear animal from current location in animal_grid
-            animal_grid[animal.position[0]][animal.position[1]] = None
+        for animal in population:
+            # skip animals that lost a battle earlier in this iteration
+            if not animal.is_alive:
+                continue
+            
+            # clear animal from current location in index
+            index.remove(animal)
             
             # move the animal to new location
+            old_position = animal.position
             animal.move()
-            row = animal.position[0]
-            col = animal.position[1]
+            if record and animal.position != old_position:
+                delta.moves.append((ids[animal], old_position, animal.position))
 
             # battle with animal in new location if there is an animal
-            prev_animal = animal_grid[row][col]
+            prev_animal = index.occupant(animal.position)
             if not prev_animal == None:
+                result['n_battles'] += 1
+                if timing:
+                    battle_start = perf_counter()
+                loser, attack_one, attack_two = _fight(animal, prev_animal, species_count, rng)
+                if timing:
+                    battle_time += perf_counter() - battle_start
+                if record:
+                    delta.battles.append((ids[animal], ids[prev_animal], attack_one, attack_two, ids[loser]))
+                    delta.deaths.append(ids[loser])
                 # store winner of battle in new location 
-                animal_grid[row][col] = battle(animal, prev_animal, species_count)
+                if loser is prev_animal:
+                    index.remove(prev_animal)
+                    index.add(animal)
             else:
                 # store animal in new location since there was no other animal on this location
-                animal_grid[row][col] = animal
-                
-    # print tie since winner was not found after iterations
-    print("\nIts a tie!!!! The game didn't end in " + str(n_iter) + " iterations!!" )
\ No newline at end of file
+                index.add(animal)
+        
+        delta.species_count = dict(species_count)
+        
+        if timing:
+            # the battles are timed on their own, the rest of the loop is moving
+            instrument.timers['move'] += perf_counter() - start - battle_time
+            instrument.timers['battle'] += battle_time
+            instrument.end_iteration(it, result['n_battles'] - n_battles)
+    
+    # let the caller see the moves of the last iteration
+    yield index, delta
+
+
+def _to_collection(animals):
+    """puts a single animal in a set so that procedures work
+    
+    Parameters
+    ----------
+    animals : Animal or set or list of Animal
+        the animals of a game
+        
+    Returns
+    -------
+    set or list of Animal
+        the animals of the game
+    """
+    
+    if not isinstance(animals, (set, list)):
+        return {animals}
+    return animals
+
+
+def iter_game(animals, n_iter = 25, grid_size = (5, 5), seed = None,
+              instrument = None, distinct = False):
+    """ plays the board using the animals provided and yields the changes
+    of every iteration as they happen. Only one iteration is kept in memory,
+    and the game stops early when the caller stops pulling
+    
+    Parameters
+    ----------
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the list
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        seed for the random numbers of this game, default = None
+    instrument : Instrumentation or None
+        collects the timers and counters of the game, default = None
+    distinct : bool
+        whether to place every animal on a cell of its own, default = False
+        
+    Yields
+    ------
+    IterationDelta
+        the changes that lead to the start of every iteration, the first
+        delta holds the starting positions
+        
+    Returns
+    -------
+    GameResult
+        the outcome of the game, as the value of StopIteration
+    """
+    
+    animals = _to_collection(animals)
+    if len(animals) == 0:
+        raise ValueError('No animals provided')
+    
+    result = {}
+    for index, delta in _play(animals, n_iter, grid_size, result, _make_rng(seed), True,
+                              instrument, distinct):
+        yield delta
+    return GameResult(**result)
+
+
+def run_simulation(animals, n_iter = 25, grid_size = (5, 5), seed = None,
+                   instrument = None, distinct = False):
+    """ plays the board using the animals provided without printing or
+    waiting between iterations
+    
+    Parameters
+    ----------
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the list
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        seed for the random numbers of this game, default = None
+    instrument : Instrumentation or None
+        collects the timers and counters of the game, default = None
+    distinct : bool
+        whether to place every animal on a cell of its own, default = False
+        
+    Returns
+    -------
+    GameResult
+        the outcome of the game
+    """
+    
+    animals = _to_collection(animals)
+    if len(animals) == 0:
+        raise ValueError('No animals provided')
+    
+    result = {}
+    # run the game to the end without looking at the board
+    for _ in _play(animals, n_iter, grid_size, result, _make_rng(seed), False, instrument,
+                   distinct):
+        pass
+    return GameResult(**result)
+
+
+def play_board(animals, n_iter = 25, grid_size = (5, 5), sleep_time = 0.3, seed = None,
+               instrument = None, fps = None, distinct = False):
+    """ plays the board using the animals provided and prints the board
+    after every iteration
+    
+    This function was significantly modified from the provided function in previous
+    assignment.
+    
+    Parameters
+    ----------
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the list
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    sleep_time : int
+        the time between each iteration
+    seed : int or None
+        seed for the random numbers of this game, default = None
+    instrument : Instrumentation or None
+        collects the timers and counters of the game, its summary is
+        printed at the end of the game, default = None
+    fps : float or None
+        number of boards drawn per second in a terminal. The boards are
+        drawn by a FrameRenderer while the game runs at full speed and
+        boards are skipped when the game is faster, sleep_time is not used.
+        default = None to print every board and wait sleep_time in between
+    distinct : bool
+        whether to place every animal on a cell of its own, default = False
+        
+    Returns
+    -------
+    GameResult
+        the outcome of the game
+    """
+    
+    # check if no animals are provided
+    if len(animals) == 0:
+        print("No animals provided!!!")
+        return
+    
+    animals = _to_collection(animals)
+    
+    # only import the display when a board is displayed
+    from modules.display import show_frame, FrameRenderer
+    
+    renderer = None
+    if fps is not None:
+        renderer = FrameRenderer(grid_size, fps)
+        renderer.start()
+    
+    result = {}
+    for index, delta in _play(animals, n_iter, grid_size, result, _make_rng(seed), False,
+                              instrument, distinct):
+        if renderer is not None:
+            # only take a snapshot of the board when the renderer wants one
+            if not renderer.ready():
+                continue
+        # the board after the last iteration is not shown
+        elif delta.iteration == n_iter:
+            continue
+        
+        if instrument is not None:
+            start = perf_counter()
+        if renderer is not None:
+            renderer.submit(index.characters())
+        else:
+            # build the grid of characters only when it is displayed
+            show_frame(index.to_grid(grid_size), sleep_time)
+        if instrument is not None:
+            instrument.timers['render'] += perf_counter() - start
+            instrument.counters['grid_builds'] += 1
+    
+    if renderer is not None:
+        # always draw the board the game ended on
+        renderer.submit(index.characters())
+        renderer.close()
+    
+    result = GameResult(**result)
+    if result.is_tie:
+        # print tie since winner was not found after iterations
+        print("\nIts a tie!!!! The game didn't end in " + str(n_iter) + " iterations!!" )
+    else:
+        print('\nWinner: ' + result.winner + '!!!!')
+    if instrument is not None:
+        print('\n' + instrument.summary())
+    return result
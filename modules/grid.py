@@ -0,0 +1,106 @@
+"""This is the grid module. This module contains functions for
+positions and moves on the board. It has no imports so that the classes
+and functions modules can both use it.
+"""
+
+
+def add_lists(list1, list2):
+    """Add two lists by adding the elements with the
+    same index
+    
+    Code written by me from previous assignment
+    
+    Parameters
+    ----------
+    list1 : list of int
+        first list to add
+    list2 : list of int
+        second list to add
+        
+    Returns
+    -------
+    output : list of int
+        sum of two lists
+    """
+    
+    output = []
+    
+    # concurrently loop through elements in both lists
+    for i, j in zip(list1, list2):
+        output.append(i + j) # append the sum to output
+    return output
+
+
+def check_position(position, grid_size):
+    """check whether position is valid given the grid size
+    
+    Parameters
+    ----------
+    position : array of length 2 containing int
+        contains the row and column position of the animal to check
+    grid_size : tuple of length 2 containing int
+        contains the total rows and columns of the board
+        
+    Returns
+    -------
+    bool
+        boolean of whether the position is valid
+    """
+    
+    # check if the position is valid for both rows and columns
+    for i in range(0, 2):
+        if not (0 <= position[i] < grid_size[i]):
+            return False
+    return True
+
+
+# maps a set of moves to its longest step, and a set of moves together with
+# the class of a cell to the indices of the moves that stay on the board
+_move_steps = {}
+_valid_move_table = {}
+
+
+def valid_moves(moves, position, grid_size):
+    """returns the indices of the moves that keep position on the board.
+    
+    Cells only differ in how close they are to each edge, up to the longest
+    step of the moves, so the valid moves are computed once for every class
+    of cells and looked up after that.
+    
+    Parameters
+    ----------
+    moves : tuple of tuple of int
+        the possible moves
+    position : array of length 2 containing int
+        contains the row and column position of the animal
+    grid_size : tuple of length 2 containing int
+        contains the total rows and columns of the board
+        
+    Returns
+    -------
+    tuple of int
+        indices of the valid moves in moves
+    """
+    
+    # the moves are used as a dictionary key, so lists are turned into tuples
+    if not type(moves) == tuple:
+        moves = tuple(map(tuple, moves))
+    step = _move_steps.get(moves)
+    if step is None:
+        step = max(max(abs(i) for i in move) for move in moves)
+        _move_steps[moves] = step
+    
+    # distances to the top, bottom, left and right edge, capped by the step
+    row = position[0]
+    col = position[1]
+    cell_class = (min(row, step), min(grid_size[0] - 1 - row, step),
+                  min(col, step), min(grid_size[1] - 1 - col, step))
+    
+    key = (moves, cell_class)
+    valid = _valid_move_table.get(key)
+    if valid is None:
+        valid = tuple(i for i, move in enumerate(moves)
+                      if -cell_class[0] <= move[0] <= cell_class[1]
+                      and -cell_class[2] <= move[1] <= cell_class[3])
+        _valid_move_table[key] = valid
+    return valid
@@ -0,0 +1,103 @@
+"""This is the instrument module. This module contains the class that
+collects timers and counters while a game is played, to find out where
+the time of a slow game goes.
+"""
+
+
+# number of bins of the histogram of battles per iteration, bin 0 counts
+# iterations without battles and bin k iterations with 2 ** (k - 1) up to
+# 2 ** k - 1 battles, the last bin also counts everything above it
+BATTLE_BINS = 24
+
+
+class Instrumentation():
+    """This class collects the time spent in every phase of a game and
+    counts what happened, and hands them to a callback every few iterations.
+    Pass it as the instrument of run_simulation, iter_game or play_board,
+    games without an instrument skip all of this.
+
+    Attributes
+    ----------
+    timers : dict
+        dictionary that maps every phase ('purge', 'move', 'battle',
+        'render') to the seconds spent in it
+    counters : dict
+        dictionary that maps every counter ('iterations', 'battles',
+        'max_battles', 'purged', 'grid_builds', 'wander_retries_avoided')
+        to its value, 'max_battles' is the most battles of one iteration
+    battle_histogram : list of int
+        number of iterations in every bin of battles per iteration, see
+        BATTLE_BINS. It does not grow with the game
+    callback : callable or None
+        function called with this object and the iteration number
+    every : int
+        number of iterations between calls of callback
+
+    Methods
+    -------
+    end_iteration(iteration, battles)
+        records the end of an iteration and calls the callback when due
+    summary()
+        returns a report of the timers and counters
+    """
+
+    def __init__(self, callback = None, every = 1):
+        """Constructor of Instrumentation
+
+        Parameters
+        ----------
+        callback : callable or None
+            function called with this object and the iteration number,
+            default = None
+        every : int
+            number of iterations between calls of callback, default = 1
+        """
+
+        self.timers = {'purge' : 0.0, 'move' : 0.0, 'battle' : 0.0, 'render' : 0.0}
+        self.counters = {'iterations' : 0, 'battles' : 0, 'max_battles' : 0, 'purged' : 0,
+                         'grid_builds' : 0, 'wander_retries_avoided' : 0.0}
+        self.battle_histogram = [0] * BATTLE_BINS
+        self.callback = callback
+        self.every = every
+
+    def end_iteration(self, iteration, battles):
+        """records the end of an iteration and calls the callback every
+        `every` iterations
+
+        Parameters
+        ----------
+        iteration : int
+            the iteration that ended
+        battles : int
+            number of battles in the iteration
+        """
+
+        self.counters['iterations'] += 1
+        self.counters['battles'] += battles
+        if battles > self.counters['max_battles']:
+            self.counters['max_battles'] = battles
+        self.battle_histogram[min(battles.bit_length(), BATTLE_BINS - 1)] += 1
+        if self.callback is not None and self.counters['iterations'] % self.every == 0:
+            self.callback(self, iteration)
+
+    def summary(self):
+        """returns a report of the timers and counters
+
+        Returns
+        -------
+        str
+            one line for every timer and counter
+        """
+
+        total = sum(self.timers.values())
+        lines = ['phase          seconds   share']
+        for phase, seconds in self.timers.items():
+            share = seconds / total if total > 0 else 0.0
+            lines.append('%-12s %9.4f %6.1f%%' % (phase, seconds, 100 * share))
+        lines.append('')
+        for name, value in self.counters.items():
+            lines.append('%-24s %g' % (name, value))
+        iterations = self.counters['iterations']
+        if iterations > 0:
+            lines.append('%-24s %g' % ('battles_per_iteration', self.counters['battles'] / iterations))
+        return '\n'.join(lines)
@@ -0,0 +1,350 @@
+"""This is the matchup module. This module works out the exact probability
+that a species wins a battle against another species, from the attack
+methods of the classes and the battle rules.
+
+The matrix is computed by playing a battle with every script of random
+choices, see modules.solver.enumerate_outcomes. It can be saved as JSON
+together with a fingerprint of the source code of the classes and the
+battle rules, and a saved matrix is computed again when the fingerprint
+does not match anymore. The matrix also drives mean_field, an
+approximate game that follows the expected number of animals of every
+species instead of playing the board.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from fractions import Fraction
+
+from modules.classes import Animal, Bear, SPECIES_CLASSES
+from modules.functions import BATTLE_TABLE, _fight
+from modules.solver import enumerate_outcomes
+
+
+# matrices computed in this process, by fingerprint
+_matrices = {}
+
+
+def fingerprint():
+    """returns a hash of the source code the outcome of a battle depends on
+
+    Returns
+    -------
+    str
+        sha256 of the animal classes, _fight and BATTLE_TABLE
+    """
+
+    parts = [inspect.getsource(Animal)]
+    for name, cls in sorted(SPECIES_CLASSES.items()):
+        parts.append(name + inspect.getsource(cls))
+    parts.append(inspect.getsource(_fight))
+    parts.append(repr(BATTLE_TABLE))
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def fighter_states(species):
+    """returns the states of a species that change its attack
+
+    Parameters
+    ----------
+    species : str
+        name of the species
+
+    Returns
+    -------
+    tuple of int
+        the attack_index of every state for bears, (0,) for the others
+    """
+
+    if issubclass(SPECIES_CLASSES[species], Bear):
+        return tuple(range(len(Animal.attacks)))
+    return (0,)
+
+
+def _fighter(species, state, rng):
+    """creates an animal for a battle
+
+    Parameters
+    ----------
+    species : str
+        name of the species
+    state : int
+        attack_index for bears, ignored for the others
+    rng : ScriptedRandom
+        random number generator of the battle
+
+    Returns
+    -------
+    Animal
+        the new animal
+    """
+
+    animal = SPECIES_CLASSES[species]()
+    animal.set_rng(rng)
+    if isinstance(animal, Bear):
+        animal.attack_index = state
+    return animal
+
+
+def fight_odds(species_one, species_two, state_one = 0, state_two = 0):
+    """returns the exact probability that the first animal wins a battle,
+    the first animal is the one that moved onto the cell of the second
+
+    Parameters
+    ----------
+    species_one : str
+        species of the first animal
+    species_two : str
+        species of the second animal
+    state_one : int
+        attack_index of the first animal when it is a bear, default = 0
+    state_two : int
+        attack_index of the second animal when it is a bear, default = 0
+
+    Returns
+    -------
+    Fraction
+        the probability that the second animal loses
+    """
+
+    def fight(rng):
+        one = _fighter(species_one, state_one, rng)
+        two = _fighter(species_two, state_two, rng)
+        return _fight(one, two, {}, rng)[0] is two
+
+    return enumerate_outcomes(fight).get(True, Fraction(0))
+
+
+class MatchupMatrix():
+    """This class holds the probability that every species wins a battle
+    against every other species
+
+    Attributes
+    ----------
+    species : tuple of str
+        names of the species
+    state_odds : dict
+        dictionary that maps (species_one, state_one, species_two,
+        state_two) to the probability that the first animal wins
+    odds : dict
+        dictionary that maps (species_one, species_two) to the probability
+        that the first animal wins, averaged over the states of bears
+    fingerprint : str
+        fingerprint of the source code the matrix was computed from
+
+    Methods
+    -------
+    win_probability(species_one, species_two)
+        returns the probability that the moving animal wins
+    duel(species_one, species_two)
+        returns the probability that species_one wins when both are as
+        likely to move
+    to_dict()
+        returns the matrix as a dictionary that can be saved as JSON
+    """
+
+    def __init__(self, state_odds, fingerprint):
+        """Constructor of MatchupMatrix
+
+        Parameters
+        ----------
+        state_odds : dict
+            dictionary that maps (species_one, state_one, species_two,
+            state_two) to the probability that the first animal wins
+        fingerprint : str
+            fingerprint of the source code the matrix was computed from
+        """
+
+        self.state_odds = state_odds
+        self.fingerprint = fingerprint
+        self.species = tuple(dict.fromkeys(key[0] for key in state_odds))
+
+        # the attack_index of a bear goes through every state in turn, so
+        # over a game every state is about as likely
+        self.odds = {}
+        for one in self.species:
+            for two in self.species:
+                states = [(i, j) for i in fighter_states(one) for j in fighter_states(two)]
+                total = sum(state_odds[(one, i, two, j)] for i, j in states)
+                self.odds[(one, two)] = total / len(states)
+
+    @classmethod
+    def compute(cls):
+        """computes the matrix for every species of SPECIES_CLASSES
+
+        Returns
+        -------
+        MatchupMatrix
+            the new matrix
+        """
+
+        state_odds = {}
+        for one in SPECIES_CLASSES:
+            for two in SPECIES_CLASSES:
+                for i in fighter_states(one):
+                    for j in fighter_states(two):
+                        state_odds[(one, i, two, j)] = fight_odds(one, two, i, j)
+        return cls(state_odds, fingerprint())
+
+    @classmethod
+    def from_dict(cls, data):
+        """creates a matrix from the output of to_dict
+
+        Parameters
+        ----------
+        data : dict
+            the matrix as returned by to_dict
+
+        Returns
+        -------
+        MatchupMatrix
+            the matrix
+        """
+
+        state_odds = {(one, i, two, j) : Fraction(p) for one, i, two, j, p in data['odds']}
+        return cls(state_odds, data['fingerprint'])
+
+    def to_dict(self):
+        """returns the matrix as a dictionary that can be saved as JSON,
+        the probabilities are exact fractions written as strings
+
+        Returns
+        -------
+        dict
+            dictionary with the keys 'fingerprint' and 'odds'
+        """
+
+        return {'fingerprint' : self.fingerprint,
+                'odds' : [[one, i, two, j, str(p)] for (one, i, two, j), p in self.state_odds.items()]}
+
+    def win_probability(self, species_one, species_two):
+        """returns the probability that an animal of species_one wins when
+        it moves onto the cell of an animal of species_two
+
+        Parameters
+        ----------
+        species_one : str
+            species of the moving animal
+        species_two : str
+            species of the animal on the cell
+
+        Returns
+        -------
+        Fraction
+            the probability
+        """
+
+        return self.odds[(species_one, species_two)]
+
+    def duel(self, species_one, species_two):
+        """returns the probability that species_one wins a battle when both
+        animals are as likely to be the one that moved
+
+        Parameters
+        ----------
+        species_one : str
+            species of the first animal
+        species_two : str
+            species of the second animal
+
+        Returns
+        -------
+        Fraction
+            the probability
+        """
+
+        return (self.odds[(species_one, species_two)] + 1 - self.odds[(species_two, species_one)]) / 2
+
+
+def load_matrix(path = None):
+    """returns the matchup matrix of the current classes. A saved matrix is
+    used when its fingerprint matches, otherwise the matrix is computed and
+    saved again
+
+    Parameters
+    ----------
+    path : str or None
+        path of the JSON file of the matrix, default = None to only keep
+        it in memory
+
+    Returns
+    -------
+    MatchupMatrix
+        the matrix
+    """
+
+    current = fingerprint()
+    matrix = _matrices.get(current)
+    if path is not None:
+        saved = None
+        if os.path.exists(path):
+            try:
+                with open(path) as file:
+                    saved = json.load(file)
+            except ValueError:
+                # a broken file is computed again like an old one
+                saved = None
+        if saved is not None and saved.get('fingerprint') == current:
+            if matrix is None:
+                matrix = MatchupMatrix.from_dict(saved)
+        else:
+            if matrix is None:
+                matrix = MatchupMatrix.compute()
+            with open(path, 'w') as file:
+                json.dump(matrix.to_dict(), file)
+    if matrix is None:
+        matrix = MatchupMatrix.compute()
+    _matrices[current] = matrix
+    return matrix
+
+
+# share of the iterations in which an animal of the species moves
+MOVE_RATE = {'snake' : 0, 'turtle' : 0.5}
+
+
+def mean_field(mix, n_iter = 25, grid_size = (5, 5), matrix = None):
+    """plays an approximate game that follows the expected number of animals
+    of every species. In every iteration a moving animal is taken to land on
+    a random cell, so it battles an animal of a species with probability of
+    the number of those animals over the number of cells. Animals wander one
+    cell at a time on the real board, so this is only close when the
+    animals are well mixed
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+    n_iter : int
+        the number of iterations, default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    matrix : MatchupMatrix or None
+        matchup matrix, default = None for load_matrix()
+
+    Returns
+    -------
+    history : list of dict
+        expected number of animals of every species at the start of every
+        iteration and after the last one
+    """
+
+    if matrix is None:
+        matrix = load_matrix()
+    odds = {key : float(p) for key, p in matrix.odds.items()}
+    n_cells = grid_size[0] * grid_size[1]
+
+    counts = {species : float(count) for species, count in mix.items()}
+    history = [dict(counts)]
+    for it in range(n_iter):
+        losses = dict.fromkeys(counts, 0.0)
+        for one, count_one in counts.items():
+            movers = count_one * MOVE_RATE.get(one, 1)
+            for two, count_two in counts.items():
+                # expected battles of the movers of one with animals of two
+                battles = movers * count_two / n_cells
+                losses[two] += battles * odds[(one, two)]
+                losses[one] += battles * (1 - odds[(one, two)])
+        counts = {species : max(0.0, count - losses[species]) for species, count in counts.items()}
+        history.append(dict(counts))
+    return history
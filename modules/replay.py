@@ -0,0 +1,406 @@
+"""This is the replay module. This module contains a writer that records
+the deltas of a game in a compact binary file, and a reader that can jump
+to the board of any iteration of a recorded game.
+
+A replay file starts with a header (the seed, the grid size and the
+species of every animal), followed by fixed-width records:
+
+- an iteration record at the start of every delta
+- a move record for every animal that changed cells
+- a battle record for every battle, holding both attacks and the loser
+- every checkpoint_every iterations, a checkpoint record followed by one
+  state record (position and alive flag) for every animal
+
+It ends with an index of the checkpoints, so a reader loads the nearest
+checkpoint before an iteration and applies the records after it instead of
+playing the game again from the start.
+"""
+
+import bisect
+import mmap
+import random
+import struct
+
+from modules.classes import SPECIES_CLASSES
+from modules.functions import iter_game
+
+
+MAGIC = b'ABRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBxxIIIQI')
+INDEX_ENTRY = struct.Struct('<QQ')
+FOOTER = struct.Struct('<QQ4s')
+
+# the low two bits of the kind byte of every record, the two attacks of a
+# battle and the alive flag of a state are stored in the bits above them.
+# A checkpoint is an iteration record with the bit above the kind set
+ITERATION, MOVE, BATTLE, STATE = range(4)
+CHECKPOINT = ITERATION | 4
+SPECIES = tuple(SPECIES_CLASSES)
+
+
+def _record_struct(width):
+    """returns the struct of a record with fields of the given width
+
+    Parameters
+    ----------
+    width : int
+        number of bytes of every field, 2 or 4
+
+    Returns
+    -------
+    struct.Struct
+        kind byte followed by three unsigned fields
+    """
+
+    field = 'H' if width == 2 else 'I'
+    return struct.Struct('<B' + 3 * field)
+
+
+class ReplayState():
+    """This class stores the board of a recorded game at one iteration
+
+    Attributes
+    ----------
+    iteration : int
+        the iteration of this board
+    positions : list of tuple
+        (row, col) of every animal
+    alive : list of bool
+        whether every animal is alive
+    species : tuple of str
+        species of every animal
+    """
+
+    def __init__(self, iteration, positions, alive, species):
+        """Constructor of ReplayState
+
+        Parameters
+        ----------
+        iteration : int
+            the iteration of this board
+        positions : list of tuple
+            (row, col) of every animal
+        alive : list of bool
+            whether every animal is alive
+        species : tuple of str
+            species of every animal
+        """
+
+        self.iteration = iteration
+        self.positions = positions
+        self.alive = alive
+        self.species = species
+
+    def species_count(self):
+        """returns the number of remaining animals of every species
+
+        Returns
+        -------
+        species_count : dict
+            dictionary that maps the species name to the remaining count
+        """
+
+        species_count = {}
+        for species, alive in zip(self.species, self.alive):
+            if alive:
+                species_count[species] = species_count.get(species, 0) + 1
+        return species_count
+
+
+class ReplayWriter():
+    """This class writes the deltas of a game to a replay file
+
+    Methods
+    -------
+    write(delta)
+        appends the records of a delta
+    close()
+        writes the checkpoint index and closes the file
+    """
+
+    def __init__(self, path, grid_size, seed, checkpoint_every = 1000):
+        """Constructor of ReplayWriter
+
+        Parameters
+        ----------
+        path : str
+            path of the replay file
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        seed : int
+            seed the game was played with, from 0 to 2 ** 64 - 1
+        checkpoint_every : int
+            number of iterations between checkpoints, at least 1,
+            default = 1000
+        """
+
+        if checkpoint_every <= 0:
+            raise ValueError('checkpoint_every must be positive, not ' + str(checkpoint_every))
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError('the seed of a replay must be from 0 to 2 ** 64 - 1, not ' + str(seed))
+        self.file = open(path, 'wb')
+        self.grid_size = grid_size
+        self.seed = seed
+        self.checkpoint_every = checkpoint_every
+        self.record = None
+        self.checkpoints = []
+        self.positions = None
+        self.alive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write_header(self, spawns):
+        """writes the header from the first delta of the game
+
+        Parameters
+        ----------
+        spawns : list of tuple
+            (animal, species, position) of every animal
+        """
+
+        n_animals = len(spawns)
+        # use two byte fields whenever the ids and positions fit
+        width = 2 if max(n_animals, self.grid_size[0], self.grid_size[1]) < 2 ** 16 else 4
+        self.record = _record_struct(width)
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, n_animals, self.grid_size[0],
+                                    self.grid_size[1], self.seed, self.checkpoint_every))
+        self.file.write(bytes(SPECIES.index(species) for _, species, _ in spawns))
+
+        self.positions = [position for _, _, position in spawns]
+        self.alive = [True] * n_animals
+
+    def _write_checkpoint(self, iteration):
+        """writes the position and alive flag of every animal
+
+        Parameters
+        ----------
+        iteration : int
+            the iteration of the checkpoint
+        """
+
+        self.checkpoints.append((iteration, self.file.tell()))
+        pack = self.record.pack
+        records = [pack(CHECKPOINT, 0, 0, 0)]
+        for i, (row, col) in enumerate(self.positions):
+            records.append(pack(STATE | self.alive[i] << 2, i, row, col))
+        self.file.write(b''.join(records))
+
+    def write(self, delta):
+        """appends the records of a delta to the file
+
+        Parameters
+        ----------
+        delta : IterationDelta
+            the changes of one iteration of the game
+        """
+
+        if self.record is None:
+            self._write_header(delta.spawns)
+        pack = self.record.pack
+
+        records = [pack(ITERATION, 0, 0, 0)]
+        for i, old, new in delta.moves:
+            records.append(pack(MOVE, i, new[0], new[1]))
+            self.positions[i] = new
+        for one, two, attack_one, attack_two, loser in delta.battles:
+            records.append(pack(BATTLE | attack_one << 2 | attack_two << 4, one, two, loser))
+            self.alive[loser] = False
+        self.file.write(b''.join(records))
+
+        if delta.iteration % self.checkpoint_every == 0:
+            self._write_checkpoint(delta.iteration)
+
+    def close(self):
+        """writes the checkpoint index and the footer, and closes the file
+        """
+
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        for iteration, offset in self.checkpoints:
+            self.file.write(INDEX_ENTRY.pack(iteration, offset))
+        self.file.write(FOOTER.pack(index_offset, len(self.checkpoints), MAGIC))
+        self.file.close()
+
+
+class ReplayReader():
+    """This class memory-maps a replay file and loads the board of any
+    iteration of the recorded game
+
+    Attributes
+    ----------
+    seed : int
+        seed the game was played with
+    grid_size : tuple
+        dimension of the grid
+    species : tuple of str
+        species of every animal
+    checkpoint_every : int
+        number of iterations between checkpoints
+    n_iter : int
+        number of the last recorded iteration
+
+    Methods
+    -------
+    state_at(iteration)
+        returns the board at the start of an iteration
+    close()
+        closes the file
+    """
+
+    def __init__(self, path):
+        """Constructor of ReplayReader
+
+        Parameters
+        ----------
+        path : str
+            path of the replay file
+        """
+
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        magic, version, width, n_animals, rows, cols, seed, checkpoint_every = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + ' is not a replay file')
+
+        self.record = _record_struct(width)
+        self.seed = seed
+        self.grid_size = (rows, cols)
+        self.checkpoint_every = checkpoint_every
+        start = HEADER.size
+        self.species = tuple(SPECIES[i] for i in self.data[start:start + n_animals])
+        self.records_start = start + n_animals
+
+        index_offset, n_checkpoints, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        self.records_end = index_offset
+        self.checkpoints = [INDEX_ENTRY.unpack_from(self.data, index_offset + i * INDEX_ENTRY.size)
+                            for i in range(n_checkpoints)]
+        self._checkpoint_iterations = [iteration for iteration, _ in self.checkpoints]
+        self.n_iter = self._last_iteration()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _last_iteration(self):
+        """counts the iterations after the last checkpoint
+
+        Returns
+        -------
+        int
+            number of the last recorded iteration
+        """
+
+        iteration, offset = self.checkpoints[-1]
+        with memoryview(self.data)[offset:self.records_end] as records:
+            for kind, a, b, c in self.record.iter_unpack(records):
+                if kind == ITERATION:
+                    iteration += 1
+        return iteration
+
+    def state_at(self, iteration):
+        """returns the board at the start of an iteration by loading the
+        closest checkpoint before it and applying the records after it
+
+        Parameters
+        ----------
+        iteration : int
+            the iteration to load
+
+        Returns
+        -------
+        ReplayState
+            the board at the start of the iteration
+        """
+
+        if not 0 <= iteration <= self.n_iter:
+            raise IndexError('iteration ' + str(iteration) + ' was not recorded')
+
+        # find the last checkpoint at or before the iteration
+        i = bisect.bisect_right(self._checkpoint_iterations, iteration) - 1
+        current, offset = self.checkpoints[i]
+
+        # the records of the iteration come before the next checkpoint
+        if i + 1 < len(self.checkpoints):
+            end = self.checkpoints[i + 1][1]
+        else:
+            end = self.records_end
+
+        n_animals = len(self.species)
+        positions = [None] * n_animals
+        alive = [False] * n_animals
+        size = self.record.size
+        start = offset + size
+        middle = start + n_animals * size
+        # read the mapped file in place instead of copying it
+        with memoryview(self.data) as data:
+            with data[start:middle] as states:
+                for kind, animal, row, col in self.record.iter_unpack(states):
+                    positions[animal] = (row, col)
+                    alive[animal] = bool(kind >> 2)
+
+            # apply the records until the next iteration starts
+            with data[middle:end] as records:
+                for kind, a, b, c in self.record.iter_unpack(records):
+                    if kind == ITERATION:
+                        if current == iteration:
+                            break
+                        current += 1
+                    elif kind == MOVE:
+                        positions[a] = (b, c)
+                    elif kind & 3 == BATTLE:
+                        alive[c] = False
+        return ReplayState(iteration, positions, alive, self.species)
+
+    def close(self):
+        """closes the file
+        """
+
+        self.data.close()
+        self.file.close()
+
+
+def record_game(path, animals, n_iter = 25, grid_size = (5, 5), seed = None,
+                checkpoint_every = 1000):
+    """plays a game and records it to a replay file
+
+    Parameters
+    ----------
+    path : str
+        path of the replay file
+    animals : set or list of Animal
+        all of the animals, animals in a list move in the order of the list
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        seed for the random numbers of this game, default = None for a
+        random seed that is stored in the file
+    checkpoint_every : int
+        number of iterations between checkpoints, default = 1000
+
+    Returns
+    -------
+    GameResult
+        the outcome of the game
+    """
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    with ReplayWriter(path, grid_size, seed, checkpoint_every) as writer:
+        game = iter_game(animals, n_iter, grid_size, seed)
+        while True:
+            try:
+                writer.write(next(game))
+            except StopIteration as stop:
+                return stop.value
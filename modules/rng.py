@@ -0,0 +1,147 @@
+"""This is the rng module. This module contains a random number generator
+that draws its numbers in blocks from NumPy, for code that draws many
+numbers, like shuffling long lists.
+
+Games don't use it by default. A game of this repository spends less than
+a tenth of its time drawing numbers, so the blocks did not make games
+measurably faster, and random.Random is cheaper to seed for short games.
+An animal or FastForward can still be given a BlockRandom as its rng.
+"""
+
+import numpy as np
+
+
+class BlockRandom():
+    """This class is a random number generator with the methods of the
+    random module that the animals and battle use. Instead of drawing one
+    number per call it draws blocks of uniform floats from a NumPy
+    Generator and hands them out one at a time, every kind of draw scales
+    the next float of the same block.
+
+    Attributes
+    ----------
+    generator : numpy.random.Generator
+        generator used to draw the blocks
+    block_size : int
+        largest number of values drawn at once
+
+    Methods
+    -------
+    randrange(n)
+        returns a random int in range(n)
+    choice(seq)
+        returns a random element of seq
+    choices(population, k)
+        returns k random elements of population
+    random()
+        returns a random float in [0, 1)
+    shuffle(x)
+        shuffles the list x in place
+    """
+
+    def __init__(self, seed = None, block_size = 1024):
+        """Constructor of BlockRandom
+
+        Parameters
+        ----------
+        seed : int or None
+            seed of the generator, default = None
+        block_size : int
+            largest number of values drawn at once, default = 1024
+        """
+
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        # short uses only need a few values, the blocks start small and
+        # double up to block_size
+        self._next_size = min(64, block_size)
+        # one block of uniform floats is shared by every kind of draw, so
+        # the memory does not grow with the number of different ranges
+        self._floats = []
+
+    def random(self):
+        """returns a random float in [0, 1)
+
+        Returns
+        -------
+        float
+            the random value
+        """
+
+        try:
+            return self._floats.pop()
+        except IndexError:
+            # draw a new block of values when there is none left
+            self._floats = self.generator.random(self._next_size).tolist()
+            self._next_size = min(2 * self._next_size, self.block_size)
+            return self._floats.pop()
+
+    def randrange(self, n):
+        """returns a random int in range(n)
+
+        Parameters
+        ----------
+        n : int
+            number of possible values
+
+        Returns
+        -------
+        int
+            the random value
+        """
+
+        # a float has 53 random bits, larger ranges are drawn on their own
+        if n > 2 ** 32:
+            return int(self.generator.integers(n))
+        try:
+            return int(self._floats.pop() * n)
+        except IndexError:
+            return int(self.random() * n)
+
+    def choice(self, seq):
+        """returns a random element of seq
+
+        Parameters
+        ----------
+        seq : sequence
+            sequence to choose from
+
+        Returns
+        -------
+        object
+            the chosen element
+        """
+
+        try:
+            return seq[int(self._floats.pop() * len(seq))]
+        except IndexError:
+            return seq[int(self.random() * len(seq))]
+
+    def choices(self, population, k = 1):
+        """returns k random elements of population, chosen with replacement
+
+        Parameters
+        ----------
+        population : sequence
+            sequence to choose from
+        k : int
+            number of elements, default = 1
+
+        Returns
+        -------
+        list
+            the chosen elements
+        """
+
+        return [population[i] for i in self.generator.integers(len(population), size = k).tolist()]
+
+    def shuffle(self, x):
+        """shuffles the list x in place
+
+        Parameters
+        ----------
+        x : list
+            list to shuffle
+        """
+
+        x[:] = [x[i] for i in self.generator.permutation(len(x)).tolist()]
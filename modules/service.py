@@ -0,0 +1,852 @@
+"""This is the service module. This module runs games for other programs
+from a long running process, so that they don't have to start a pool of
+workers for every game.
+
+The server listens on a Unix socket or a localhost port and reads one
+JSON request per line, it answers every request with one JSON line.
+Games of all connections are collected into batches and played on a
+process pool that is started once, and the outcome of a game with a seed
+is kept in a least recently used cache. SimulationClient sends the
+requests from Python.
+
+Requests are dictionaries with a 'type':
+
+    {"type": "game", "mix": {"dog": 2, "lion": 1}, "n_iter": 25,
+     "grid_size": [5, 5], "seed": 1}
+    {"type": "tournament", "mix": {"dog": 2, "lion": 1}, "n_games": 1000,
+     "n_iter": 25, "grid_size": [5, 5], "seed": 1}
+    {"type": "metrics"}
+
+A game can also list the species of its animals in the order they move
+with "animals": ["dog", "lion", "dog"] instead of a mix.
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import random
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+
+from modules.classes import SPECIES_CLASSES
+from modules.functions import run_simulation, GameResult, _to_collection
+from modules.sweep import cell_key
+from modules.tournament import game_seeds, play_games, TournamentResult
+
+
+def game_config(request):
+    """returns the configuration of a game request with the defaults of
+    run_simulation filled in
+
+    Parameters
+    ----------
+    request : dict
+        the request
+
+    Returns
+    -------
+    dict
+        configuration with the keys 'animals', 'n_iter' and 'grid_size'
+
+    Raises
+    ------
+    ValueError
+        when the request does not describe a game that can be played
+    """
+
+    if 'animals' in request:
+        animals = list(request['animals'])
+    else:
+        animals = []
+        for species, count in request['mix'].items():
+            if int(count) < 0:
+                raise ValueError('the count of ' + repr(species) + ' is negative')
+            animals += [species] * int(count)
+    for species in animals:
+        if species not in SPECIES_CLASSES:
+            raise ValueError('unknown species ' + repr(species))
+    if not animals:
+        raise ValueError('No animals provided')
+
+    n_iter = int(request.get('n_iter', 25))
+    grid_size = [int(size) for size in request.get('grid_size', (5, 5))]
+    if n_iter < 0:
+        raise ValueError('n_iter must not be negative')
+    if len(grid_size) != 2 or min(grid_size) <= 0:
+        raise ValueError('grid_size must be two positive sizes, not ' + str(grid_size))
+    return {'animals' : animals, 'n_iter' : n_iter, 'grid_size' : grid_size}
+
+
+def result_dict(result):
+    """turns a GameResult into a dictionary that can be sent as JSON
+
+    Parameters
+    ----------
+    result : GameResult
+        the outcome of a game
+
+    Returns
+    -------
+    dict
+        the attributes of the GameResult
+    """
+
+    return {'winner' : result.winner, 'n_iter' : result.n_iter,
+            'species_count' : result.species_count, 'n_battles' : result.n_battles}
+
+
+def play_specs(cells):
+    """plays a batch of games, this runs in the worker processes
+
+    Parameters
+    ----------
+    cells : list of tuple
+        (key, config, seed) of every game, see game_config
+
+    Returns
+    -------
+    list of tuple
+        (key, outcome as a dictionary, None) of every game, or (key, None,
+        exception) of a game that failed, so that it does not fail the
+        other games of the batch
+    """
+
+    played = []
+    for key, config, seed in cells:
+        try:
+            animals = [SPECIES_CLASSES[species]() for species in config['animals']]
+            result = run_simulation(animals, config['n_iter'], tuple(config['grid_size']), seed)
+        except Exception as exception:
+            played.append((key, None, exception))
+        else:
+            played.append((key, result_dict(result), None))
+    return played
+
+
+def _warm(i):
+    """does nothing, submitted once per worker so that the pool has started
+    every process before the first request
+    """
+
+    return i
+
+
+class SimulationService():
+    """This class plays the games of the requests on a pool of worker
+    processes, independent of how the requests arrive
+
+    Attributes
+    ----------
+    workers : int
+        number of worker processes
+    cache_size : int
+        number of outcomes kept in the cache
+    batch_size : int
+        largest number of games sent to a worker at once
+    batch_wait : float
+        seconds to wait for more games before a batch is sent
+    timeout : float or None
+        seconds a request waits for its games at most
+
+    Methods
+    -------
+    start()
+        starts the worker processes and the batching thread
+    handle(request)
+        answers a request
+    metrics()
+        returns the counters of the service
+    close()
+        stops the workers
+    """
+
+    def __init__(self, workers = None, cache_size = 1024, batch_size = 64, batch_wait = 0.005,
+                 timeout = 600):
+        """Constructor of SimulationService
+
+        Parameters
+        ----------
+        workers : int or None
+            number of worker processes, default = None for the number of
+            cores
+        cache_size : int
+            number of outcomes kept in the cache, default = 1024
+        batch_size : int
+            largest number of games sent to a worker at once, default = 64
+        batch_wait : float
+            seconds to wait for more games before a batch is sent,
+            default = 0.005
+        timeout : float or None
+            seconds a request waits for its games at most, the request
+            fails after that. default = 600, None waits forever
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+
+        self.executor = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        # outcomes by key, the most recently used last
+        self.cache = OrderedDict()
+        # futures of the games that are queued or played, by key
+        self.pending = {}
+        self.counters = {'requests' : 0, 'games' : 0, 'batches' : 0, 'cache_hits' : 0,
+                         'cache_misses' : 0, 'in_flight' : 0, 'errors' : 0, 'restarts' : 0}
+        self.started = perf_counter()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        """starts the worker processes and the batching thread
+        """
+
+        self.executor = ProcessPoolExecutor(max_workers = self.workers)
+        list(self.executor.map(_warm, range(self.workers)))
+        self.thread = threading.Thread(target = self._dispatch, daemon = True)
+        self.thread.start()
+        self.started = perf_counter()
+
+    def close(self):
+        """stops the batching thread and the workers, after the queued games
+        are played
+        """
+
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown(wait = True)
+            self.executor = None
+
+    def _dispatch(self):
+        """sends the queued games to the workers in batches, this runs in
+        the batching thread
+        """
+
+        while True:
+            cell = self.queue.get()
+            if cell is None:
+                return
+            batch = [cell]
+            # collect the games that arrive shortly after the first one
+            deadline = perf_counter() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    cell = self.queue.get(timeout = remaining)
+                except queue.Empty:
+                    break
+                if cell is None:
+                    # stop after sending this batch
+                    self.queue.put(None)
+                    break
+                batch.append(cell)
+            self._submit(batch)
+
+    def _submit(self, batch):
+        """sends a batch of games to the workers, the games of the batch
+        fail when the workers can not take it
+
+        Parameters
+        ----------
+        batch : list of tuple
+            (key, config, seed, cacheable) of every game
+        """
+
+        with self.lock:
+            self.counters['batches'] += 1
+            self.counters['in_flight'] += len(batch)
+        cacheable = {key : keep for key, config, seed, keep in batch}
+        executor = self.executor
+        try:
+            future = executor.submit(play_specs, [(key, config, seed) for key, config, seed, keep in batch])
+        except Exception as exception:
+            self._fail(executor, [(key, None, exception) for key in cacheable])
+            return
+
+        def done(future):
+            try:
+                played = future.result()
+            except Exception as exception:
+                # a worker died or the batch could not be sent back
+                self._fail(executor, [(key, None, exception) for key in cacheable])
+                return
+            with self.lock:
+                self.counters['in_flight'] -= len(played)
+                for key, outcome, error in played:
+                    waiting = self.pending.pop(key)
+                    if error is not None:
+                        self.counters['errors'] += 1
+                        waiting.set_exception(error)
+                        continue
+                    self.counters['games'] += 1
+                    if cacheable[key]:
+                        self._store(key, outcome)
+                    waiting.set_result(outcome)
+
+        future.add_done_callback(done)
+
+    def _fail(self, executor, failed):
+        """fails the games of a batch that was not played, and starts new
+        workers when the pool broke
+
+        Parameters
+        ----------
+        executor : ProcessPoolExecutor
+            the pool the batch was sent to
+        failed : list of tuple
+            (key, None, exception) of every game of the batch
+        """
+
+        if any(isinstance(error, BrokenProcessPool) for key, outcome, error in failed):
+            self._restart(executor)
+        with self.lock:
+            self.counters['in_flight'] -= len(failed)
+            for key, outcome, error in failed:
+                self.pending.pop(key).set_exception(error)
+
+    def _restart(self, executor):
+        """replaces a broken pool of workers with a new one, so that later
+        games are played again
+
+        Parameters
+        ----------
+        executor : ProcessPoolExecutor
+            the broken pool, nothing happens when it was replaced already
+        """
+
+        with self.lock:
+            if self.executor is not executor:
+                return
+            self.counters['restarts'] += 1
+            self.executor = ProcessPoolExecutor(max_workers = self.workers)
+        executor.shutdown(wait = False)
+
+    def _store(self, key, outcome):
+        """puts an outcome in the cache and drops the least recently used
+        outcomes, the lock must be held
+
+        Parameters
+        ----------
+        key : str
+            key of the game
+        outcome : dict
+            the outcome of the game
+        """
+
+        self.cache[key] = outcome
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last = False)
+
+    def play(self, config, seed = None):
+        """plays a game, or looks it up in the cache when it was played with
+        the same seed before
+
+        Parameters
+        ----------
+        config : dict
+            configuration of the game, see game_config
+        seed : int or None
+            seed of the game, default = None for a new random seed that is
+            not cached
+
+        Returns
+        -------
+        outcome : dict
+            the outcome of the game, see result_dict
+        seed : int
+            the seed of the game
+        """
+
+        if self.thread is None or not self.thread.is_alive():
+            raise RuntimeError('the service is not running')
+        cacheable = seed is not None
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        key = cell_key(config, seed)
+
+        with self.lock:
+            if key in self.cache:
+                self.counters['cache_hits'] += 1
+                self.cache.move_to_end(key)
+                return self.cache[key], seed
+            self.counters['cache_misses'] += 1
+            # the same game asked for twice at once is only played once
+            waiting = self.pending.get(key)
+            if waiting is None:
+                waiting = Future()
+                self.pending[key] = waiting
+                self.queue.put((key, config, seed, cacheable))
+        return waiting.result(self.timeout), seed
+
+    def tournament(self, request):
+        """plays the games of a tournament request on the workers
+
+        Parameters
+        ----------
+        request : dict
+            the request with 'mix', 'n_games' and optionally 'n_iter',
+            'grid_size', 'seed' and 'chunk_size'
+
+        Returns
+        -------
+        dict
+            the outcome of the tournament
+        """
+
+        # the games of the tournament must be valid games
+        game = game_config({'mix' : request['mix'], 'n_iter' : request.get('n_iter', 25),
+                            'grid_size' : request.get('grid_size', (5, 5))})
+        mix = dict(request['mix'])
+        n_games = int(request['n_games'])
+        n_iter = game['n_iter']
+        grid_size = tuple(game['grid_size'])
+        seed = request.get('seed')
+        chunk_size = request.get('chunk_size') or max(1, math.ceil(n_games / (4 * self.workers)))
+        if n_games <= 0:
+            raise ValueError('n_games must be positive')
+
+        # the mix is kept in its order by cell_key, it is the order of the
+        # animals before they are shuffled
+        config = {'type' : 'tournament', 'mix' : mix, 'n_games' : n_games, 'n_iter' : n_iter,
+                  'grid_size' : list(grid_size), 'chunk_size' : chunk_size}
+        key = None
+        if seed is not None:
+            key = cell_key(config, seed)
+            with self.lock:
+                if key in self.cache:
+                    self.counters['cache_hits'] += 1
+                    self.cache.move_to_end(key)
+                    return self.cache[key]
+                self.counters['cache_misses'] += 1
+        else:
+            seed = random.SystemRandom().getrandbits(64)
+
+        # the chunks of a tournament are batches already
+        executor = self.executor
+        with self.lock:
+            self.counters['batches'] += 1
+            self.counters['in_flight'] += n_games
+        futures = []
+        winners = []
+        try:
+            for seeds in game_seeds(seed, n_games, chunk_size):
+                futures.append(executor.submit(play_games, mix, n_iter, grid_size, seeds))
+            deadline = None if self.timeout is None else perf_counter() + self.timeout
+            for future in futures:
+                remaining = None if deadline is None else max(0.0, deadline - perf_counter())
+                winners.extend(future.result(remaining))
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            with self.lock:
+                self.counters['in_flight'] -= n_games
+        result = TournamentResult(mix, n_games, seed, winners)
+        outcome = {'n_games' : n_games, 'seed' : seed, 'wins' : result.wins, 'ties' : result.ties,
+                   'win_rates' : result.win_rates, 'tie_rate' : result.tie_rate}
+        with self.lock:
+            self.counters['games'] += n_games
+            if key is not None:
+                self._store(key, outcome)
+        return outcome
+
+    def metrics(self):
+        """returns the counters of the service
+
+        Returns
+        -------
+        dict
+            the counters, the number of games waiting for a batch
+            (queue_depth), the number of cached outcomes and the games
+            played per second since the start
+        """
+
+        with self.lock:
+            metrics = dict(self.counters)
+            metrics['cache_size'] = len(self.cache)
+        metrics['queue_depth'] = self.queue.qsize()
+        metrics['uptime'] = perf_counter() - self.started
+        metrics['games_per_sec'] = metrics['games'] / max(metrics['uptime'], 1e-9)
+        return metrics
+
+    def handle(self, request):
+        """answers a request
+
+        Parameters
+        ----------
+        request : dict
+            the request, see the module docstring
+
+        Returns
+        -------
+        dict
+            the answer, 'ok' is False and 'error' holds the message when
+            the request failed
+        """
+
+        with self.lock:
+            self.counters['requests'] += 1
+        try:
+            kind = request.get('type')
+            if kind == 'game':
+                outcome, seed = self.play(game_config(request), request.get('seed'))
+                return {'ok' : True, 'result' : outcome, 'seed' : seed}
+            elif kind == 'tournament':
+                return {'ok' : True, 'result' : self.tournament(request)}
+            elif kind == 'metrics':
+                return {'ok' : True, 'result' : self.metrics()}
+            raise ValueError('unknown request type ' + repr(kind))
+        except Exception as exception:
+            with self.lock:
+                self.counters['errors'] += 1
+            return {'ok' : False, 'error' : type(exception).__name__ + ': ' + str(exception)}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """answers the JSON lines of a connection
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as exception:
+                answer = {'ok' : False, 'error' : 'invalid JSON: ' + str(exception)}
+            else:
+                answer = self.server.service.handle(request)
+            self.wfile.write((json.dumps(answer) + '\n').encode())
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SimulationServer():
+    """This class serves a SimulationService on a Unix socket or a
+    localhost port, every connection is answered by its own thread
+
+    Attributes
+    ----------
+    address : str or tuple
+        path of the Unix socket or (host, port)
+    service : SimulationService
+        the service that answers the requests
+
+    Methods
+    -------
+    start()
+        starts the service and answers connections in a thread
+    serve_forever()
+        starts the service and answers connections until interrupted
+    close()
+        stops the server and the service
+    """
+
+    def __init__(self, address, service = None):
+        """Constructor of SimulationServer, binds the address
+
+        Parameters
+        ----------
+        address : str or tuple
+            path of the Unix socket or (host, port), port 0 picks a free
+            port
+        service : SimulationService or None
+            the service, default = None for a SimulationService with the
+            default settings
+        """
+
+        self.service = service or SimulationService()
+        if isinstance(address, str):
+            self.server = _UnixServer(address, _RequestHandler)
+        else:
+            self.server = _TCPServer(tuple(address), _RequestHandler)
+        self.server.service = self.service
+        self.address = self.server.server_address
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        """starts the service and answers connections in a thread
+        """
+
+        self.service.start()
+        self.thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+        self.thread.start()
+
+    def serve_forever(self):
+        """starts the service and answers connections until interrupted
+        """
+
+        self.service.start()
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """stops the server and the service, and removes the Unix socket
+        """
+
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+        self.service.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class SimulationClient():
+    """This class sends requests to a SimulationServer
+
+    Methods
+    -------
+    request(request)
+        sends a request and returns the answer
+    run_simulation(animals, n_iter, grid_size, seed)
+        plays a game on the server and returns its GameResult
+    play_board(animals, n_iter, grid_size, seed)
+        plays a game on the server and prints its outcome
+    tournament(mix, n_games, n_iter, grid_size, seed, chunk_size)
+        plays a tournament on the server
+    metrics()
+        returns the metrics of the server
+    close()
+        closes the connection
+    """
+
+    def __init__(self, address):
+        """Constructor of SimulationClient, connects to the server
+
+        Parameters
+        ----------
+        address : str or tuple
+            path of the Unix socket or (host, port) of the server
+        """
+
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(address)
+        self.socket.connect(address)
+        self.file = self.socket.makefile('rwb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """closes the connection
+        """
+
+        self.file.close()
+        self.socket.close()
+
+    def request(self, request):
+        """sends a request and returns the answer
+
+        Parameters
+        ----------
+        request : dict
+            the request, see the module docstring
+
+        Returns
+        -------
+        dict
+            the result of the answer
+
+        Raises
+        ------
+        RuntimeError
+            when the server could not answer the request
+        """
+
+        self.file.write((json.dumps(request) + '\n').encode())
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise RuntimeError('the server closed the connection')
+        answer = json.loads(line)
+        if not answer['ok']:
+            raise RuntimeError(answer['error'])
+        return answer
+
+    def run_simulation(self, animals, n_iter = 25, grid_size = (5, 5), seed = None):
+        """plays a game on the server like modules.functions.run_simulation,
+        the animals only give the species and the order, they are not
+        changed
+
+        Parameters
+        ----------
+        animals : Animal or set or list of Animal or dict
+            the animals, or a dictionary that maps the species name to the
+            number of animals
+        n_iter : int
+            the number of iterations to run for this game. default = 25
+        grid_size : tuple of length 2 containing int
+            dimension of the grid, default = (5, 5)
+        seed : int or None
+            seed for the random numbers of this game, default = None
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        request = {'type' : 'game', 'n_iter' : n_iter, 'grid_size' : list(grid_size), 'seed' : seed}
+        if isinstance(animals, dict):
+            request['mix'] = animals
+        else:
+            request['animals'] = [animal.species for animal in _to_collection(animals)]
+        outcome = self.request(request)['result']
+        return GameResult(outcome['winner'], outcome['n_iter'], outcome['species_count'],
+                          outcome['n_battles'])
+
+    def play_board(self, animals, n_iter = 25, grid_size = (5, 5), seed = None):
+        """plays a game on the server and prints the outcome like
+        modules.functions.play_board, the boards are not shown
+
+        Parameters
+        ----------
+        animals : Animal or set or list of Animal or dict
+            the animals, see run_simulation
+        n_iter : int
+            the number of iterations to run for this game. default = 25
+        grid_size : tuple of length 2 containing int
+            dimension of the grid, default = (5, 5)
+        seed : int or None
+            seed for the random numbers of this game, default = None
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        if not isinstance(animals, dict):
+            animals = _to_collection(animals)
+        if len(animals) == 0:
+            print("No animals provided!!!")
+            return
+
+        result = self.run_simulation(animals, n_iter, grid_size, seed)
+        if result.is_tie:
+            print("\nIts a tie!!!! The game didn't end in " + str(n_iter) + " iterations!!" )
+        else:
+            print('\nWinner: ' + result.winner + '!!!!')
+        return result
+
+    def tournament(self, mix, n_games, n_iter = 25, grid_size = (5, 5), seed = None, chunk_size = None):
+        """plays a tournament on the server like
+        modules.tournament.run_tournament
+
+        Parameters
+        ----------
+        mix : dict
+            dictionary that maps the species name to the number of animals
+        n_games : int
+            number of games to play
+        n_iter : int
+            the number of iterations of every game. default = 25
+        grid_size : tuple of length 2 containing int
+            dimension of the grid, default = (5, 5)
+        seed : int or None
+            master seed of the tournament, default = None for a random seed
+        chunk_size : int or None
+            number of games submitted to a worker at once, default = None
+            for four chunks per worker of the server
+
+        Returns
+        -------
+        dict
+            the outcome with the keys 'n_games', 'seed', 'wins', 'ties',
+            'win_rates' and 'tie_rate'
+        """
+
+        return self.request({'type' : 'tournament', 'mix' : mix, 'n_games' : n_games,
+                             'n_iter' : n_iter, 'grid_size' : list(grid_size), 'seed' : seed,
+                             'chunk_size' : chunk_size})['result']
+
+    def metrics(self):
+        """returns the metrics of the server
+
+        Returns
+        -------
+        dict
+            see SimulationService.metrics
+        """
+
+        return self.request({'type' : 'metrics'})['result']
+
+
+def main(argv = None):
+    """runs the server from the command line until it is interrupted
+
+    Parameters
+    ----------
+    argv : list of str or None
+        command line arguments, default = None for sys.argv
+    """
+
+    parser = argparse.ArgumentParser(description = 'Serve animal battle royale games.')
+    parser.add_argument('--socket', help = 'path of a Unix socket to listen on')
+    parser.add_argument('--port', type = int, default = 8765,
+                        help = 'localhost port to listen on when no socket is given')
+    parser.add_argument('--workers', type = int, help = 'number of worker processes')
+    parser.add_argument('--cache-size', type = int, default = 1024,
+                        help = 'number of game outcomes to keep')
+    args = parser.parse_args(argv)
+
+    address = args.socket or ('127.0.0.1', args.port)
+    server = SimulationServer(address, SimulationService(args.workers, args.cache_size))
+    print('serving on ' + str(server.address))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
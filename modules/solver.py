@@ -0,0 +1,451 @@
+"""This is the solver module. This module works out the exact probability
+that every species wins a game on a small board, instead of estimating it
+from many random games.
+
+The solver plays an iteration with the real animal classes, but gives them
+a random number generator that follows a script of choices. Playing the
+iteration again for every script lists every way the iteration can go
+together with its probability, so the solver always follows the rules of
+the classes. The outcome of a board is memoized, and boards that are
+mirror images or rotations of each other share one entry.
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+
+from modules.board import OccupancyIndex
+from modules.classes import SPECIES_CLASSES
+from modules.functions import _fight
+
+
+class ScriptedRandom():
+    """This class is a random number generator that returns the choices of
+    a script, and the first option after the end of the script. It records
+    the number of options of every draw
+
+    Attributes
+    ----------
+    script : list of int
+        index of the option to return for every draw
+    sizes : list of int
+        number of options of every draw so far
+
+    Methods
+    -------
+    randrange(n)
+        returns the next choice of the script
+    choice(seq)
+        returns the element of seq at the next choice of the script
+    """
+
+    def __init__(self, script):
+        """Constructor of ScriptedRandom
+
+        Parameters
+        ----------
+        script : list of int
+            index of the option to return for every draw
+        """
+
+        self.script = script
+        self.sizes = []
+
+    def randrange(self, n):
+        """returns the next choice of the script
+
+        Parameters
+        ----------
+        n : int
+            number of options
+
+        Returns
+        -------
+        int
+            the choice, 0 after the end of the script
+        """
+
+        i = len(self.sizes)
+        self.sizes.append(n)
+        return self.script[i] if i < len(self.script) else 0
+
+    def choice(self, seq):
+        """returns the element of seq at the next choice of the script
+
+        Parameters
+        ----------
+        seq : sequence
+            sequence to choose from
+
+        Returns
+        -------
+        object
+            the chosen element
+        """
+
+        return seq[self.randrange(len(seq))]
+
+
+def enumerate_outcomes(function):
+    """calls a function with every possible script of random choices and
+    adds up the probability of every result
+
+    Parameters
+    ----------
+    function : callable
+        function that takes a random number generator and returns a
+        hashable result
+
+    Returns
+    -------
+    outcomes : dict
+        dictionary that maps every result to its probability as a Fraction
+    """
+
+    outcomes = {}
+    script = []
+    while True:
+        rng = ScriptedRandom(script)
+        result = function(rng)
+        sizes = rng.sizes
+
+        probability = Fraction(1)
+        for size in sizes:
+            probability /= size
+        outcomes[result] = outcomes.get(result, 0) + probability
+
+        # go to the next script like an odometer, the draws after a changed
+        # choice can be different so they are dropped
+        script = script + [0] * (len(sizes) - len(script))
+        while script and script[-1] + 1 >= sizes[len(script) - 1]:
+            script.pop()
+        if not script:
+            return outcomes
+        script[-1] += 1
+
+
+def _state_of(animal):
+    """returns the state of an animal as a tuple
+
+    Parameters
+    ----------
+    animal : Animal
+        the animal
+
+    Returns
+    -------
+    tuple
+        (species, position, state of the species)
+    """
+
+    if animal.species == 'turtle':
+        extra = animal.can_move
+    elif animal.species == 'bear':
+        extra = animal.attack_index
+    elif animal.species == 'lion':
+        extra = (animal.move_index, animal.move_count)
+    else:
+        extra = 0
+    return (animal.species, animal.position, extra)
+
+
+def _animal_of(state, grid_size, rng):
+    """creates an animal from its state
+
+    Parameters
+    ----------
+    state : tuple
+        (species, position, state of the species)
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    rng : ScriptedRandom
+        random number generator of the animal
+
+    Returns
+    -------
+    Animal
+        the new animal
+    """
+
+    species, position, extra = state
+    animal = SPECIES_CLASSES[species]()
+    animal.set_grid_size(grid_size)
+    animal.set_rng(rng)
+    animal.position = position
+    if species == 'turtle':
+        animal.can_move = extra
+    elif species == 'bear':
+        animal.attack_index = extra
+    elif species == 'lion':
+        animal.move_index, animal.move_count = extra
+    return animal
+
+
+def _symmetries(grid_size):
+    """returns the mirror images and rotations of the board
+
+    Parameters
+    ----------
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+
+    Returns
+    -------
+    list of callable
+        functions that map a (row, col) tuple to its image
+    """
+
+    rows, cols = grid_size
+    symmetries = [
+        lambda p: p,
+        lambda p: (rows - 1 - p[0], p[1]),
+        lambda p: (p[0], cols - 1 - p[1]),
+        lambda p: (rows - 1 - p[0], cols - 1 - p[1]),
+    ]
+    # square boards can also be turned by a quarter
+    if rows == cols:
+        symmetries += [
+            lambda p: (p[1], p[0]),
+            lambda p: (cols - 1 - p[1], p[0]),
+            lambda p: (p[1], rows - 1 - p[0]),
+            lambda p: (cols - 1 - p[1], rows - 1 - p[0]),
+        ]
+    return symmetries
+
+
+class ExactSolver():
+    """This class works out the exact outcome probabilities of games on a
+    small board
+
+    Attributes
+    ----------
+    grid_size : tuple
+        dimension of the grid
+    n_iter : int
+        the number of iterations of every game
+
+    Methods
+    -------
+    solve(animals)
+        returns the probability that every species wins and of a tie
+    cache_info()
+        returns the statistics of the memoized outcomes
+    """
+
+    def __init__(self, grid_size = (3, 3), n_iter = 25, max_states = 100000):
+        """Constructor of ExactSolver
+
+        Parameters
+        ----------
+        grid_size : tuple of length 2 containing int
+            dimension of the grid, default = (3, 3)
+        n_iter : int
+            the number of iterations of every game, default = 25
+        max_states : int
+            number of boards whose outcome is kept, the least recently
+            used ones are dropped, default = 100000
+        """
+
+        self.grid_size = grid_size
+        self.n_iter = n_iter
+
+        # how every symmetry maps the moves of the lion
+        moves = SPECIES_CLASSES['lion'].moves
+        self._symmetries = []
+        for symmetry in _symmetries(grid_size):
+            origin = symmetry((0, 0))
+            directions = []
+            for move in moves:
+                image = symmetry(move)
+                directions.append(moves.index((image[0] - origin[0], image[1] - origin[1])))
+            self._symmetries.append((symmetry, directions))
+
+        self._transitions = lru_cache(maxsize = max_states)(self._transitions)
+        self._value = lru_cache(maxsize = max_states)(self._value)
+
+    def _canonical(self, state):
+        """returns the smallest of the images of a board, so that boards
+        that are images of each other share an entry
+
+        Parameters
+        ----------
+        state : tuple
+            state of every alive animal in the order they move
+
+        Returns
+        -------
+        tuple
+            the smallest image
+        """
+
+        images = []
+        for symmetry, directions in self._symmetries:
+            image = []
+            for species, position, extra in state:
+                if species == 'lion':
+                    extra = (directions[extra[0]], extra[1])
+                image.append((species, symmetry(position), extra))
+            images.append(tuple(image))
+        return min(images)
+
+    def _iteration(self, state, rng):
+        """plays one iteration of a board, like the loop of
+        modules.functions._play
+
+        Parameters
+        ----------
+        state : tuple
+            state of every alive animal in the order they move
+        rng : ScriptedRandom
+            random number generator of the iteration
+
+        Returns
+        -------
+        tuple
+            state of every alive animal after the iteration
+        """
+
+        animals = [_animal_of(animal, self.grid_size, rng) for animal in state]
+        species_count = {}
+        for animal in animals:
+            species_count[animal.species] = species_count.get(animal.species, 0) + 1
+
+        index = OccupancyIndex(animals)
+        for animal in animals:
+            # skip animals that lost a battle earlier in this iteration
+            if not animal.is_alive:
+                continue
+            index.remove(animal)
+            animal.move()
+            prev_animal = index.occupant(animal.position)
+            if prev_animal is not None:
+                loser = _fight(animal, prev_animal, species_count, rng)[0]
+                if loser is prev_animal:
+                    index.remove(prev_animal)
+                    index.add(animal)
+            else:
+                index.add(animal)
+        return tuple(_state_of(animal) for animal in animals if animal.is_alive)
+
+    def _transitions(self, state):
+        """returns every board after an iteration with its probability
+
+        Parameters
+        ----------
+        state : tuple
+            state of every alive animal in the order they move
+
+        Returns
+        -------
+        list of tuple
+            (state, probability) of every board after the iteration
+        """
+
+        outcomes = {}
+        for after, probability in enumerate_outcomes(lambda rng: self._iteration(state, rng)).items():
+            after = self._canonical(after)
+            outcomes[after] = outcomes.get(after, 0) + probability
+        return list(outcomes.items())
+
+    def _value(self, state, remaining):
+        """returns the outcome probabilities of a board at the start of an
+        iteration
+
+        Parameters
+        ----------
+        state : tuple
+            state of every alive animal in the order they move
+        remaining : int
+            the number of iterations left
+
+        Returns
+        -------
+        dict
+            dictionary that maps the winning species, or 'tie', to its
+            probability
+        """
+
+        if remaining == 0:
+            return {'tie' : Fraction(1)}
+        species = {animal[0] for animal in state}
+        if len(species) == 1:
+            return {species.pop() : Fraction(1)}
+
+        outcome = {}
+        for after, probability in self._transitions(state):
+            for result, p in self._value(after, remaining - 1).items():
+                outcome[result] = outcome.get(result, 0) + probability * p
+        return outcome
+
+    def solve(self, animals):
+        """returns the exact probability that every species wins a game of
+        the animals, and of a tie. Every animal starts on a random cell like
+        in run_simulation
+
+        Parameters
+        ----------
+        animals : list of Animal
+            all of the animals in the order they move
+
+        Returns
+        -------
+        outcome : dict
+            dictionary that maps the winning species, or 'tie', to its
+            probability as a Fraction
+        """
+
+        # the animals of the caller are not changed, copies are placed instead
+        states = [_state_of(animal) for animal in animals]
+
+        def place(rng):
+            # place the animals with their own random_pos
+            copies = [_animal_of(state, self.grid_size, rng) for state in states]
+            for animal in copies:
+                animal.random_pos()
+            return tuple(_state_of(animal) for animal in copies)
+
+        starts = {}
+        for state, probability in enumerate_outcomes(place).items():
+            state = self._canonical(state)
+            starts[state] = starts.get(state, 0) + probability
+
+        outcome = {}
+        for state, probability in starts.items():
+            for result, p in self._value(state, self.n_iter).items():
+                outcome[result] = outcome.get(result, 0) + probability * p
+        return outcome
+
+    def cache_info(self):
+        """returns the statistics of the memoized outcomes
+
+        Returns
+        -------
+        dict
+            lru_cache statistics of the transitions and the outcomes
+        """
+
+        return {'transitions' : self._transitions.cache_info(), 'values' : self._value.cache_info()}
+
+
+def solve_game(animals, n_iter = 25, grid_size = (3, 3), max_states = 100000):
+    """returns the exact probability that every species wins a game, and of
+    a tie
+
+    Parameters
+    ----------
+    animals : list of Animal
+        all of the animals in the order they move
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (3, 3)
+    max_states : int
+        number of boards whose outcome is kept, default = 100000
+
+    Returns
+    -------
+    dict
+        dictionary that maps the winning species, or 'tie', to its
+        probability as a Fraction
+    """
+
+    return ExactSolver(grid_size, n_iter, max_states).solve(list(animals))
@@ -0,0 +1,196 @@
+"""This is the spawn module. This module places whole populations on the
+board at once, every animal on a cell of its own. Animals placed with
+Animal.random_pos one at a time can land on the same cell, and placing a
+million animals that way takes longer than the game.
+
+Cells are drawn without replacement with NumPy, which takes time in the
+order of the number of animals even when the board is almost full. Every
+species can be given a region of the board to be placed in.
+"""
+
+import numpy as np
+
+from modules.classes import scale_mix
+from modules.vectorized import ArrayBoard, SPECIES_ID
+
+
+def counts_for_density(mix, grid_size, density):
+    """returns the number of animals of every species that fill the given
+    share of the cells of the board
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to its share
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    density : float
+        share of the cells that hold an animal, between 0 and 1
+
+    Returns
+    -------
+    dict
+        dictionary that maps the species name to the number of animals
+    """
+
+    if not 0 <= density <= 1:
+        raise ValueError('density must be between 0 and 1')
+    return scale_mix(mix, round(density * grid_size[0] * grid_size[1]))
+
+
+def sample_cells(n, grid_size, rng, region = None, taken = None):
+    """draws distinct cells of the board that are not taken yet
+
+    Parameters
+    ----------
+    n : int
+        number of cells
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    rng : numpy.random.Generator
+        random number generator
+    region : tuple of 4 int or None
+        (first row, first column, end row, end column) of the cells to draw
+        from, the end is excluded, default = None for the whole board
+    taken : numpy.ndarray of int or None
+        row * number of columns + column of the cells that are taken,
+        default = None
+
+    Returns
+    -------
+    rows : numpy.ndarray of int
+        row of every cell
+    cols : numpy.ndarray of int
+        column of every cell
+    """
+
+    row_start, col_start, row_end, col_end = region or (0, 0, grid_size[0], grid_size[1])
+    if not (0 <= row_start <= row_end <= grid_size[0] and 0 <= col_start <= col_end <= grid_size[1]):
+        raise ValueError('region ' + str(region) + ' is not on the board')
+    width = col_end - col_start
+    size = (row_end - row_start) * width
+
+    # taken cells in the region, numbered inside the region
+    inside = np.zeros(0, dtype = np.int64)
+    if taken is not None and len(taken):
+        rows = taken // grid_size[1]
+        cols = taken % grid_size[1]
+        in_region = (row_start <= rows) & (rows < row_end) & (col_start <= cols) & (cols < col_end)
+        inside = (rows[in_region] - row_start) * width + cols[in_region] - col_start
+
+    if n > size - len(inside):
+        raise ValueError('there are less than ' + str(n) + ' free cells in ' + str(region))
+
+    # cells drawn without replacement come in random order, so after
+    # dropping the taken ones the first n are a random choice of the free ones
+    cells = rng.choice(size, min(size, n + len(inside)), replace = False)
+    if len(inside):
+        cells = cells[~np.isin(cells, inside)]
+    cells = cells[:n]
+    return row_start + cells // width, col_start + cells % width
+
+
+def spawn_positions(counts, grid_size, rng, regions = None):
+    """draws a cell of its own for every animal
+
+    Parameters
+    ----------
+    counts : dict
+        dictionary that maps the species name to the number of animals
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    rng : numpy.random.Generator
+        random number generator
+    regions : dict or None
+        dictionary that maps the species name to the region of its cells,
+        see sample_cells, default = None for the whole board
+
+    Returns
+    -------
+    rows : numpy.ndarray of int
+        row of every animal, grouped by species in the order of counts
+    cols : numpy.ndarray of int
+        column of every animal, grouped by species in the order of counts
+    """
+
+    regions = regions or {}
+    rows = {}
+    cols = {}
+    taken = np.zeros(0, dtype = np.int64)
+
+    # species with regions first, then all the others in one draw
+    for species in counts:
+        if species in regions:
+            rows[species], cols[species] = sample_cells(counts[species], grid_size, rng,
+                                                        regions[species], taken)
+            taken = np.concatenate([taken, rows[species] * grid_size[1] + cols[species]])
+    rest = [species for species in counts if species not in regions]
+    rest_rows, rest_cols = sample_cells(sum(counts[species] for species in rest), grid_size, rng,
+                                        None, taken)
+    start = 0
+    for species in rest:
+        rows[species] = rest_rows[start:start + counts[species]]
+        cols[species] = rest_cols[start:start + counts[species]]
+        start += counts[species]
+
+    order = list(counts)
+    if not order:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+    return (np.concatenate([rows[species] for species in order]),
+            np.concatenate([cols[species] for species in order]))
+
+
+def place_animals(animals, grid_size, seed = None, regions = None):
+    """puts every animal on a cell of its own
+
+    Parameters
+    ----------
+    animals : iterable of Animal
+        the animals to place
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    seed : int or None
+        seed of the random number generator, default = None
+    regions : dict or None
+        dictionary that maps the species name to the region of its cells,
+        see sample_cells, default = None for the whole board
+    """
+
+    by_species = {}
+    for animal in animals:
+        by_species.setdefault(animal.species, []).append(animal)
+    counts = {species : len(group) for species, group in by_species.items()}
+
+    rows, cols = spawn_positions(counts, grid_size, np.random.default_rng(seed), regions)
+    positions = zip(rows.tolist(), cols.tolist())
+    for group in by_species.values():
+        for animal, position in zip(group, positions):
+            animal.position = position
+
+
+def spawn_board(counts, grid_size, seed = None, regions = None):
+    """creates an ArrayBoard with every animal on a cell of its own
+
+    Parameters
+    ----------
+    counts : dict
+        dictionary that maps the species name to the number of animals
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    seed : int or None
+        seed of the random number generator, default = None
+    regions : dict or None
+        dictionary that maps the species name to the region of its cells,
+        see sample_cells, default = None for the whole board
+
+    Returns
+    -------
+    ArrayBoard
+        the new board
+    """
+
+    rng = np.random.default_rng(seed)
+    positions = spawn_positions(counts, grid_size, rng, regions)
+    species = np.repeat([SPECIES_ID[name] for name in counts], [counts[name] for name in counts])
+    # the board draws its own numbers from the next seed of the sequence
+    return ArrayBoard(species, grid_size, rng.integers(2 ** 63), positions)
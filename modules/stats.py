@@ -0,0 +1,373 @@
+"""This is the stats module. This module adds up statistics over a campaign
+of many games without keeping a log of every game: how many animals of
+every species are alive in every iteration, who beats whom in battles,
+when games are won and where animals die.
+
+The statistics are fixed size arrays of counts, so the memory does not
+grow with the number of games, and the statistics of games played by
+different workers are merged by adding the arrays. The statistics are
+read from the IterationDelta of every iteration, see
+modules.functions.iter_game.
+"""
+
+import csv
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules.classes import make_animals, SPECIES_CLASSES
+from modules.functions import ATTACKS, iter_game
+from modules.tournament import game_seeds
+
+
+SPECIES = tuple(SPECIES_CLASSES)
+SPECIES_INDEX = {name : i for i, name in enumerate(SPECIES)}
+
+# the count arrays of CampaignStats, they are added up when merging
+COUNTS = ('survival', 'attacks', 'species_wins', 'victories', 'ties', 'deaths')
+
+
+class CampaignStats():
+    """This class adds up the statistics of many games played on boards of
+    the same size
+
+    Attributes
+    ----------
+    grid_size : tuple
+        dimension of the grid of the games
+    n_iter : int
+        largest number of iterations of a game
+    bins : tuple of int
+        number of rows and columns of the death heatmap, every bin adds up
+        a block of cells of the board
+    n_games : int
+        number of games added
+    survival : numpy.ndarray of int
+        array of shape (len(SPECIES), n_iter + 1) of alive animals at the
+        start of every iteration, summed over the games. A game that ended
+        keeps its last count
+    attacks : numpy.ndarray of int
+        array of shape (len(ATTACKS), len(ATTACKS), 2) of battles by the
+        attack of the moving animal, the attack of the animal on the cell
+        and whether the animal on the cell lost
+    species_wins : numpy.ndarray of int
+        array of shape (len(SPECIES), len(SPECIES)) of battles by the
+        species of the winner and the species of the loser
+    victories : numpy.ndarray of int
+        array of shape (len(SPECIES), n_iter + 1) of games won by every
+        species in every iteration
+    ties : int
+        number of games without a winner
+    deaths : numpy.ndarray of int
+        array of shape bins of the animals that died in every block of cells
+
+    Methods
+    -------
+    add_game(animals, seed)
+        plays a game and adds its statistics
+    merge(other)
+        adds the statistics of other
+    survival_curves()
+        returns the share of the animals of every species alive over time
+    to_npz(path)
+        saves the statistics in a NumPy npz file
+    from_npz(path)
+        loads statistics saved by to_npz
+    to_csv(directory)
+        saves every statistic as a CSV file with one column per field
+    """
+
+    def __init__(self, grid_size, n_iter = 25, bins = (32, 32)):
+        """Constructor of CampaignStats, the statistics start empty
+
+        Parameters
+        ----------
+        grid_size : tuple of length 2 containing int
+            dimension of the grid of the games
+        n_iter : int
+            largest number of iterations of a game, default = 25
+        bins : tuple of int
+            largest number of rows and columns of the death heatmap,
+            default = (32, 32)
+        """
+
+        self.grid_size = tuple(grid_size)
+        self.n_iter = n_iter
+        self.bins = (min(bins[0], grid_size[0]), min(bins[1], grid_size[1]))
+        self.n_games = 0
+        self.survival = np.zeros((len(SPECIES), n_iter + 1), dtype = np.int64)
+        self.attacks = np.zeros((len(ATTACKS), len(ATTACKS), 2), dtype = np.int64)
+        self.species_wins = np.zeros((len(SPECIES), len(SPECIES)), dtype = np.int64)
+        self.victories = np.zeros((len(SPECIES), n_iter + 1), dtype = np.int64)
+        self.ties = 0
+        self.deaths = np.zeros(self.bins, dtype = np.int64)
+
+    def _bin(self, position):
+        """returns the bin of the death heatmap of a cell
+
+        Parameters
+        ----------
+        position : tuple of int
+            row and column of the cell
+
+        Returns
+        -------
+        tuple of int
+            row and column of the bin
+        """
+
+        return (position[0] * self.bins[0] // self.grid_size[0],
+                position[1] * self.bins[1] // self.grid_size[1])
+
+    def add_game(self, animals, n_iter = None, seed = None):
+        """plays a game with iter_game and adds its statistics
+
+        Parameters
+        ----------
+        animals : list of Animal
+            all of the animals in the order they move
+        n_iter : int or None
+            the number of iterations of the game, default = None for n_iter
+            of the statistics
+        seed : int or None
+            seed for the random numbers of this game, default = None
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        if n_iter is None:
+            n_iter = self.n_iter
+        if n_iter > self.n_iter:
+            raise ValueError('the game has more iterations than the statistics')
+
+        animals = list(animals)
+        species = [SPECIES_INDEX[animal.species] for animal in animals]
+        positions = {}
+        game = iter_game(animals, n_iter, self.grid_size, seed)
+        while True:
+            try:
+                delta = next(game)
+            except StopIteration as stop:
+                result = stop.value
+                break
+
+            for i, name, position in delta.spawns:
+                positions[i] = position
+            for i, old, new in delta.moves:
+                positions[i] = new
+            for one, two, attack_one, attack_two, loser in delta.battles:
+                winner = two if loser == one else one
+                self.attacks[attack_one, attack_two, int(loser == two)] += 1
+                self.species_wins[species[winner], species[loser]] += 1
+                # battles happen on the cell the moving animal moved to
+                self.deaths[self._bin(positions[one])] += 1
+            counts = [delta.species_count.get(name, 0) for name in SPECIES]
+            self.survival[:, delta.iteration] += counts
+
+        # the counts don't change after the game is won
+        self.survival[:, delta.iteration + 1:] += np.array(counts)[:, None]
+        if result.winner is None:
+            self.ties += 1
+        else:
+            self.victories[SPECIES_INDEX[result.winner], result.n_iter] += 1
+        self.n_games += 1
+        return result
+
+    def merge(self, other):
+        """adds the statistics of other, for example from another worker
+
+        Parameters
+        ----------
+        other : CampaignStats
+            statistics of games on boards of the same size
+        """
+
+        if (other.grid_size, other.n_iter, other.bins) != (self.grid_size, self.n_iter, self.bins):
+            raise ValueError('statistics of different boards can not be merged')
+        for name in COUNTS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.n_games += other.n_games
+
+    def survival_curves(self):
+        """returns the share of the animals of every species that is alive
+        at the start of every iteration
+
+        Returns
+        -------
+        dict
+            dictionary that maps the species name to an array of shares,
+            only species that were in the games
+        """
+
+        curves = {}
+        for i, name in enumerate(SPECIES):
+            if self.survival[i, 0] > 0:
+                curves[name] = self.survival[i] / self.survival[i, 0]
+        return curves
+
+    def to_npz(self, path):
+        """saves the statistics in a NumPy npz file
+
+        Parameters
+        ----------
+        path : str
+            path of the file
+        """
+
+        np.savez(path, grid_size = self.grid_size, n_iter = self.n_iter, bins = self.bins,
+                 n_games = self.n_games, species = SPECIES, attack_names = ATTACKS,
+                 **{name : getattr(self, name) for name in COUNTS})
+
+    @classmethod
+    def from_npz(cls, path):
+        """loads statistics saved by to_npz
+
+        Parameters
+        ----------
+        path : str
+            path of the file
+
+        Returns
+        -------
+        CampaignStats
+            the statistics
+        """
+
+        with np.load(path) as data:
+            if tuple(data['species']) != SPECIES:
+                raise ValueError('the statistics were saved with other species')
+            stats = cls(tuple(data['grid_size']), int(data['n_iter']), tuple(data['bins']))
+            stats.n_games = int(data['n_games'])
+            for name in COUNTS:
+                setattr(stats, name, data[name])
+        stats.ties = int(stats.ties)
+        return stats
+
+    def to_csv(self, directory):
+        """saves every statistic as a CSV file with one column per field
+        and one row per non zero count
+
+        Parameters
+        ----------
+        directory : str
+            directory of the files, it is created when it does not exist
+        """
+
+        os.makedirs(directory, exist_ok = True)
+        tables = {
+            'survival.csv' : (['iteration'] + list(SPECIES),
+                              [[it] + self.survival[:, it].tolist() for it in range(self.n_iter + 1)]),
+            'attacks.csv' : (['attack_one', 'attack_two', 'loser', 'count'],
+                             [[ATTACKS[a], ATTACKS[b], ('one', 'two')[lost], int(self.attacks[a, b, lost])]
+                              for a, b, lost in zip(*np.nonzero(self.attacks))]),
+            'species_wins.csv' : (['winner', 'loser', 'count'],
+                                  [[SPECIES[w], SPECIES[l], int(self.species_wins[w, l])]
+                                   for w, l in zip(*np.nonzero(self.species_wins))]),
+            'victories.csv' : (['species', 'iteration', 'count'],
+                               [[SPECIES[s], int(it), int(self.victories[s, it])]
+                                for s, it in zip(*np.nonzero(self.victories))]
+                               + [['tie', self.n_iter, self.ties]]),
+            'deaths.csv' : (['row_bin', 'col_bin', 'count'],
+                            [[int(r), int(c), int(self.deaths[r, c])]
+                             for r, c in zip(*np.nonzero(self.deaths))]),
+        }
+        for name, (header, rows) in tables.items():
+            with open(os.path.join(directory, name), 'w', newline = '') as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+
+def campaign_chunk(mix, n_iter, grid_size, seeds, bins):
+    """plays one game of the species mix for every seed and adds up their
+    statistics, this runs in the worker processes
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+    n_iter : int
+        the number of iterations of every game
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    seeds : list of int
+        seed of every game
+    bins : tuple of int
+        number of rows and columns of the death heatmap
+
+    Returns
+    -------
+    CampaignStats
+        the statistics of the games
+    """
+
+    stats = CampaignStats(grid_size, n_iter, bins)
+    for seed in seeds:
+        animals = make_animals(mix)
+        # the animals move in a random but reproducible order, like
+        # modules.tournament.play_games
+        random.Random(str(seed) + ':order').shuffle(animals)
+        stats.add_game(animals, n_iter, seed)
+    return stats
+
+
+def run_campaign(mix, n_games, n_iter = 25, grid_size = (5, 5), seed = None, workers = None,
+                 chunk_size = None, bins = (32, 32)):
+    """plays n_games games of the species mix, spread over a pool of worker
+    processes, and adds up their statistics
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+    n_games : int
+        number of games to play
+    n_iter : int
+        the number of iterations of every game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        master seed of the campaign, default = None for a random seed
+    workers : int or None
+        number of worker processes, 1 plays every game in this process.
+        default = None for the number of cores
+    chunk_size : int or None
+        number of games submitted to a worker at once, default = None
+        for four chunks per worker
+    bins : tuple of int
+        largest number of rows and columns of the death heatmap,
+        default = (32, 32)
+
+    Returns
+    -------
+    CampaignStats
+        the statistics of every game
+    """
+
+    if n_games <= 0:
+        raise ValueError('n_games must be positive')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(n_games / (4 * workers)))
+
+    stats = CampaignStats(grid_size, n_iter, bins)
+    chunks = game_seeds(seed, n_games, chunk_size)
+    if workers == 1:
+        for seeds in chunks:
+            stats.merge(campaign_chunk(mix, n_iter, grid_size, seeds, stats.bins))
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            futures = [executor.submit(campaign_chunk, mix, n_iter, grid_size, seeds, stats.bins)
+                       for seeds in chunks]
+            for future in futures:
+                stats.merge(future.result())
+    return stats
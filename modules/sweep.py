@@ -0,0 +1,285 @@
+"""This is the sweep module. This module plays every combination of grid
+sizes, species mixes, numbers of iterations and seeds, and keeps the
+outcome of every game in an SQLite file. Games that are in the file are
+not played again, so a sweep that was interrupted continues where it
+stopped, and adding seeds or configurations to a sweep only plays the new
+games.
+"""
+
+import hashlib
+import itertools
+import json
+import math
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from modules.classes import make_animals
+from modules.functions import run_simulation, GameResult
+
+
+# part of every key, change it when the rules of the game change so that
+# old results are not used anymore
+VERSION = 1
+
+
+def sweep_configs(grid_sizes, mixes, n_iters):
+    """returns every combination of grid size, species mix and number of
+    iterations
+
+    Parameters
+    ----------
+    grid_sizes : list of tuple
+        dimensions of the grids
+    mixes : list of dict
+        dictionaries that map the species name to the number of animals
+    n_iters : list of int
+        numbers of iterations
+
+    Returns
+    -------
+    list of dict
+        configurations with the keys 'grid_size', 'mix' and 'n_iter'
+    """
+
+    return [{'grid_size' : list(grid_size), 'mix' : dict(mix), 'n_iter' : n_iter}
+            for grid_size, mix, n_iter in itertools.product(grid_sizes, mixes, n_iters)]
+
+
+def cell_key(config, seed):
+    """returns the key of a game in the cache
+
+    Parameters
+    ----------
+    config : dict
+        configuration of the game
+    seed : int
+        seed of the game
+
+    Returns
+    -------
+    str
+        hash of the configuration, the seed and VERSION
+    """
+
+    # the order of the mix is the order the animals move in, so it is kept
+    # as a list of pairs when the other keys are sorted
+    if 'mix' in config:
+        config = dict(config, mix = [[species, count] for species, count in config['mix'].items()])
+    text = json.dumps({'version' : VERSION, 'config' : config, 'seed' : seed}, sort_keys = True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def play_cells(cells):
+    """plays a list of games, this runs in the worker processes
+
+    Parameters
+    ----------
+    cells : list of tuple
+        (key, config, seed) of every game
+
+    Returns
+    -------
+    list of tuple
+        (key, config, seed, GameResult) of every game
+    """
+
+    played = []
+    for key, config, seed in cells:
+        result = run_simulation(make_animals(config['mix']), config['n_iter'],
+                                tuple(config['grid_size']), seed)
+        played.append((key, config, seed, result))
+    return played
+
+
+class SweepCache():
+    """This class stores the outcome of games in an SQLite file
+
+    Methods
+    -------
+    keys()
+        returns the keys of every stored game
+    add(played)
+        stores games
+    get(key)
+        returns the outcome of a game
+    close()
+        closes the file
+    """
+
+    def __init__(self, path):
+        """Constructor of SweepCache, creates the file if it does not exist
+
+        Parameters
+        ----------
+        path : str
+            path of the SQLite file
+        """
+
+        self.connection = sqlite3.connect(path)
+        # write ahead logging keeps the file readable when a sweep is killed
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, config TEXT, seed INTEGER, '
+            'winner TEXT, n_iter INTEGER, species_count TEXT, n_battles INTEGER)')
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def keys(self):
+        """returns the keys of every stored game
+
+        Returns
+        -------
+        set of str
+            the keys
+        """
+
+        return {key for key, in self.connection.execute('SELECT key FROM results')}
+
+    def add(self, played):
+        """stores games and commits them to the file
+
+        Parameters
+        ----------
+        played : list of tuple
+            (key, config, seed, GameResult) of every game
+        """
+
+        rows = [(key, json.dumps(config, sort_keys = True), seed, result.winner, result.n_iter,
+                 json.dumps(result.species_count), result.n_battles)
+                for key, config, seed, result in played]
+        self.connection.executemany('INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        self.connection.commit()
+
+    def get(self, key):
+        """returns the outcome of a stored game
+
+        Parameters
+        ----------
+        key : str
+            key of the game, see cell_key
+
+        Returns
+        -------
+        GameResult or None
+            the outcome, None when the game is not stored
+        """
+
+        row = self.connection.execute(
+            'SELECT winner, n_iter, species_count, n_battles FROM results WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        winner, n_iter, species_count, n_battles = row
+        return GameResult(winner, n_iter, json.loads(species_count), n_battles)
+
+    def close(self):
+        """closes the file
+        """
+
+        self.connection.close()
+
+
+def _seed_list(seeds):
+    """turns a number of seeds into the seeds 0 to seeds - 1
+
+    Parameters
+    ----------
+    seeds : int or iterable of int
+        number of seeds or the seeds
+
+    Returns
+    -------
+    list of int
+        the seeds
+    """
+
+    if isinstance(seeds, int):
+        return list(range(seeds))
+    return list(seeds)
+
+
+def pending_cells(cache, configs, seeds):
+    """returns the games of a sweep that are not in the cache
+
+    Parameters
+    ----------
+    cache : SweepCache
+        the cache of the sweep
+    configs : list of dict
+        configurations of the sweep, see sweep_configs
+    seeds : int or iterable of int
+        number of seeds or the seeds of every configuration
+
+    Returns
+    -------
+    list of tuple
+        (key, config, seed) of every game left to play
+    """
+
+    done = cache.keys()
+    cells = []
+    for config in configs:
+        for seed in _seed_list(seeds):
+            key = cell_key(config, seed)
+            if key not in done:
+                cells.append((key, config, seed))
+    return cells
+
+
+def run_sweep(path, configs, seeds, workers = None, chunk_size = None):
+    """plays every game of a sweep that is not in the cache yet on a pool of
+    worker processes, storing the games as they finish
+
+    Parameters
+    ----------
+    path : str
+        path of the SQLite file of the sweep
+    configs : list of dict
+        configurations of the sweep, see sweep_configs
+    seeds : int or iterable of int
+        number of seeds or the seeds of every configuration
+    workers : int or None
+        number of worker processes, 1 plays every game in this process.
+        default = None for the number of cores
+    chunk_size : int or None
+        number of games submitted to a worker at once, default = None
+        for four chunks per worker, at most 1000
+
+    Returns
+    -------
+    results : list of tuple
+        (config, seed, GameResult) of every game of the sweep, in the order
+        of configs and seeds
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with SweepCache(path) as cache:
+        cells = pending_cells(cache, configs, seeds)
+        if chunk_size is None:
+            chunk_size = min(1000, max(1, math.ceil(len(cells) / (4 * workers))))
+        chunks = [cells[i:i + chunk_size] for i in range(0, len(cells), chunk_size)]
+
+        if workers == 1:
+            for chunk in chunks:
+                cache.add(play_cells(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                futures = [executor.submit(play_cells, chunk) for chunk in chunks]
+                # store every chunk as soon as it is done, so that a crash
+                # only loses the chunks that were still being played
+                for future in as_completed(futures):
+                    cache.add(future.result())
+
+        return [(config, seed, cache.get(cell_key(config, seed)))
+                for config in configs for seed in _seed_list(seeds)]
@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from modules.batched import BatchedBoards
+
+
+def test_batched_boards():
+    mix = {'dog' : 2, 'frog' : 2, 'lion' : 2, 'snake' : 1}
+    games = [mix] * 50 + [{'dog' : 3}, {}]
+    boards = BatchedBoards((5, 5), n_boards = 8, n_iter = 30, seed = 4)
+    results = boards.play(games)
+    
+    assert len(results) == len(games)
+    assert sum(result.n_battles for result in results) == boards.n_battles
+    for result in results[:50]:
+        assert result.n_iter <= 30
+        assert result.is_tie == (len(result.species_count) > 1)
+        # every battle kills one animal
+        assert sum(result.species_count.values()) == 7 - result.n_battles
+    
+    # a single species wins before its first iteration, no animals is a tie
+    assert (results[50].winner, results[50].n_iter) == ('dog', 0)
+    assert (results[51].winner, results[51].n_iter) == (None, 30)
+    
+    # the same seed and number of boards play the same games
+    again = BatchedBoards((5, 5), n_boards = 8, n_iter = 30, seed = 4).play(games)
+    assert [result.winner for result in again] == [result.winner for result in results]
+
+    # a typo in a species name is not played as a smaller game
+    with pytest.raises(ValueError, match = 'dgo'):
+        BatchedBoards((5, 5), n_boards = 2, seed = 4).play([mix, {'dgo' : 2, 'lion' : 1}])
@@ -0,0 +1,18 @@
+import json
+
+from modules.benchmark import run_benchmarks, scale_mix
+
+
+def test_scale_mix():
+    assert scale_mix({'frog' : 14, 'dog' : 1, 'lion' : 1}, 16) == {'frog' : 14, 'dog' : 1, 'lion' : 1}
+    assert sum(scale_mix({'dog' : 1, 'lion' : 2}, 100).values()) == 100
+    
+    
+def test_run_benchmarks():
+    report = run_benchmarks(scenarios = [('objects', (5, 5), 7, 'balanced', 20, 3)], micro_calls = 10)
+    scenario = report['scenarios'][0]
+    assert scenario['n_games'] == 3
+    assert scenario['iterations_per_sec'] > 0
+    assert scenario['peak_memory_bytes'] > 0
+    assert 'battle_dog_bear' in report['micro']
+    json.dumps(report)
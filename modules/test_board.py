@@ -0,0 +1,99 @@
+from modules.classes import *
+from modules.board import OccupancyIndex, Population, SpatialIndex
+from modules.functions import run_simulation
+
+
+def test_occupancy_index():
+    dog = Dog()
+    snake = Snake()
+    snake.position = (2, 3)
+    index = OccupancyIndex([dog, snake])
+    assert len(index) == 2
+    assert index.occupant((2, 3)) is snake
+    assert index.occupant((4, 4)) is None
+    
+    # animals placed on the same cell keep it occupied until both leave
+    turtle = Turtle()
+    index.add(turtle)
+    assert index.occupant((0, 0)) is turtle
+    index.remove(turtle)
+    assert index.occupant((0, 0)) is dog
+    index.remove(turtle)
+    index.remove(dog)
+    assert index.occupant((0, 0)) is None
+    assert len(index) == 1
+    
+    grid_list = index.to_grid((3, 4))
+    assert grid_list[2][3] == 'S'
+    assert grid_list[0][0] == '.'
+
+
+def test_population():
+    animals = [Dog(), Frog(), Lion(), Bear(), Snake()]
+    population = Population(animals)
+    assert population.compact() == 0
+    animals[0].is_alive = False
+    animals[3].is_alive = False
+    slots = population.animals
+    assert population.compact() == 2
+    # the alive animals keep their order in the same list
+    assert population.animals is slots
+    assert list(population) == [animals[1], animals[2], animals[4]]
+    assert len(animals) == 5
+
+
+def test_spatial_index():
+    animals = make_animals({'dog' : 3, 'lion' : 2})
+    positions = [(0, 0), (5, 5), (9, 1), (4, 4), (0, 9)]
+    for animal, position in zip(animals, positions):
+        animal.position = position
+    index = SpatialIndex(animals, bucket_size = 2)
+    
+    assert index.within((5, 4), 1) == [animals[1], animals[3]]
+    assert index.within((5, 4), 2, 'dog') == [animals[1]]
+    assert index.nearest((8, 8), 2) == [animals[1], animals[3]]
+    assert index.nearest((0, 1), 1, exclude = animals[0]) == [animals[3]]
+    assert index.nearest((0, 0), 1, 'lion') == [animals[3]]
+    
+    # moving and dying animals update the buckets
+    index.remove(animals[3])
+    assert index.nearest((0, 0), 1, 'lion') == [animals[4]]
+    index.remove(animals[4])
+    assert index.nearest((0, 0), 1, 'lion') == []
+
+
+class Hunter(Dog):
+    """dog that steps towards the closest lion"""
+    
+    __slots__ = ()
+    senses = True
+    
+    def move(self):
+        prey = self.board.nearest(self.position, 1, 'lion')
+        if not prey:
+            return
+        row, col = self.position
+        target = prey[0].position
+        if target[0] != row:
+            row += 1 if target[0] > row else -1
+        elif target[1] != col:
+            col += 1 if target[1] > col else -1
+        self.position = (row, col)
+
+
+class Bait(Snake):
+    """lion that stays in place like a snake"""
+    
+    __slots__ = ()
+    
+    def __init__(self):
+        Animal.__init__(self, 'lion', 'L')
+
+
+def test_sensing_species():
+    # a hunter reaches a lion that stays in place within 40 iterations
+    for seed in range(5):
+        animals = [Hunter(), Bait()]
+        result = run_simulation(animals, 40, (20, 20), seed)
+        assert result.n_battles == 1
+        assert animals[0].board is not None
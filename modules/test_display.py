@@ -0,0 +1,40 @@
+import io
+
+from modules.classes import *
+from modules.display import frame_updates, FrameRenderer
+from modules.functions import play_board
+
+
+def test_frame_updates():
+    old = {(0, 0) : 'D', (1, 2) : 'S', (3, 3) : 'F'}
+    new = {(0, 1) : 'D', (1, 2) : 'S', (3, 3) : 'L'}
+    assert sorted(frame_updates(old, new)) == [(0, 0, '.'), (0, 1, 'D'), (3, 3, 'L')]
+    assert frame_updates(new, new) == []
+
+
+def test_frame_renderer():
+    out = io.StringIO()
+    renderer = FrameRenderer((3, 3), fps = 1000, queue_size = 1, out = out)
+    
+    # without the thread the queue fills up and the oldest boards are dropped
+    for col in range(3):
+        renderer.submit({(0, col) : 'D'})
+    assert renderer.frames_dropped == 2
+    
+    renderer.start()
+    renderer.close()
+    assert renderer.frames_drawn == 1
+    assert out.getvalue().startswith('\x1b[2J\x1b[H. . D\n. . .\n. . .')
+    
+    # only the changed cells are written after the first board
+    renderer.start()
+    renderer.submit({(1, 1) : 'D'})
+    renderer.close()
+    assert out.getvalue().endswith('\x1b[1;5H.\x1b[2;3HD\x1b[4;1H')
+
+
+def test_play_board_renderer(capsys):
+    result = play_board([Dog(), Frog(), Snake(), Bear()], 50, (4, 4), seed = 2, fps = 1000)
+    output = capsys.readouterr().out
+    assert output.startswith('\x1b[2J')
+    assert ('Winner: ' in output) != result.is_tie
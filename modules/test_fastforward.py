@@ -0,0 +1,56 @@
+import random
+
+from modules.classes import *
+from modules.fastforward import FastForward, max_step, run_fast_forward, speed
+from modules.functions import run_simulation
+
+
+def test_speed():
+    assert max_step(Frog()) == 2
+    assert max_step(Snake()) == 0
+    assert max_step(Eagle()) is None
+    turtle = Turtle()
+    assert speed(turtle) == (1, 1)
+    turtle.can_move = False
+    assert speed(turtle) == (1, 0)
+    assert speed(Lion()) == (2, 0)
+
+
+def test_fast_forward_jumps():
+    # animals that are too far apart to meet are never moved
+    animals = [Snake(), Dog(), Frog()]
+    game = FastForward(animals, 100, (10000, 10000), random.Random(0))
+    animals[0].position = (0, 0)
+    animals[1].position = (5000, 5000)
+    animals[2].position = (9999, 0)
+    game._rebuild()
+    result = game.play()
+    assert result.is_tie and result.n_battles == 0
+    assert game.n_moved == 0
+
+
+def test_rebuild_finds_every_pair():
+    # the pairs found near every animal are every pair that can meet
+    animals = make_animals({'dog' : 30, 'turtle' : 30, 'frog' : 20, 'snake' : 20})
+    game = FastForward(animals, 15, (60, 60), random.Random(1))
+    game._rebuild()
+    expected = [(game._meeting(i, j), i, j) for i in range(100) for j in range(i + 1, 100)]
+    expected = sorted(pair for pair in expected if pair[0] < 15)
+    assert sorted(game.queue) == expected and 0 < len(expected) < 4950
+
+
+def test_fast_forward_matches_simulation():
+    mix = {'dog' : 2, 'lion' : 1, 'turtle' : 1}
+    n_games = 2000
+    for play in (run_simulation, run_fast_forward):
+        results = [play(make_animals(mix), 30, (5, 5), seed) for seed in range(n_games)]
+        wins = sum(result.winner == 'dog' for result in results) / n_games
+        mean_iter = sum(result.n_iter for result in results) / n_games
+        if play is run_simulation:
+            expected = (wins, mean_iter)
+    assert abs(wins - expected[0]) < 0.05
+    assert abs(mean_iter - expected[1]) < 1.5
+    
+    # games with eagles are played one iteration at a time until they die
+    result = run_fast_forward([Eagle(), Dog(), Snake()], 50, (6, 6), seed = 3)
+    assert result.n_iter <= 50
@@ -1,5 +1,5 @@
 from modules.classes import *
-from modules.functions import battle, check_position
+from modules.functions import battle, check_position, iter_game, run_simulation, valid_moves
 
 
 def test_Eagle():
@@ -8,7 +8,8 @@ def test_Eagle():
     assert eagle.species == 'eagle'
     assert eagle.character == 'E'
     assert eagle.is_alive == True
-    assert eagle.position == [0, 0]
+    assert eagle.position == (0, 0)
+    assert not hasattr(eagle, '__dict__')
     
     
 def test_attack():
@@ -67,4 +68,99 @@ def test_check_position():
     assert check_position([3, 2], (5, 10))
     
     assert not check_position([-1, 0], (5, 5))
-    assert not check_position([10, 10], (4, 5))
\ No newline at end of file
+    assert not check_position([10, 10], (4, 5))
+
+def test_run_simulation():
+    assert callable(run_simulation)
+    
+    result = run_simulation({Dog(), Dog(), Dog()}, n_iter = 10, seed = 1)
+    assert result.winner == 'dog'
+    assert not result.is_tie
+    assert result.n_iter == 0
+    assert result.n_battles == 0
+    
+    result = run_simulation({Snake(), Turtle()}, n_iter = 10, grid_size = (1, 2), seed = 1)
+    assert result.winner == 'snake'
+    assert result.species_count == {'snake' : 1}
+    assert result.n_battles == 1
+    
+    result = run_simulation({Snake(), Snake(), Eagle()}, n_iter = 1, grid_size = (50, 50), seed = 3)
+    assert result.is_tie
+    assert result.n_iter == 1
+
+
+def test_run_simulation_seed():
+    def play(seed):
+        animals = [Dog(), Dog(), Lion(), Frog(), Bear(), Eagle(), Turtle()]
+        result = run_simulation(animals, n_iter = 50, seed = seed)
+        return (result.winner, result.n_iter, result.n_battles, [animal.position for animal in animals])
+    
+    # the same seed replays the same game
+    assert play(11) == play(11)
+
+
+def test_valid_moves():
+    moves = [[-1, 0], [1, 0], [0, 1], [0, -1]]
+    assert valid_moves(moves, [2, 2], (5, 5)) == (0, 1, 2, 3)
+    assert valid_moves(moves, [0, 0], (5, 5)) == (1, 2)
+    assert valid_moves(moves, [4, 0], (5, 1)) == (0,)
+    
+    frog = Frog()
+    assert valid_moves(frog.moves, [1, 1], (5, 5)) == (1, 2)
+    assert valid_moves(frog.moves, [1, 1], (3, 3)) == ()
+    
+    # every move picked by wander stays on the board
+    frog.set_grid_size((3, 5))
+    for i in range(20):
+        frog.move()
+        assert check_position(frog.position, (3, 5))
+    
+    lion = Lion()
+    lion.set_grid_size((5, 5))
+    lion.move()
+    assert lion.position in [(1, 0), (0, 1)]
+    assert lion.move_count == 1
+
+
+def test_import_without_ipython():
+    import subprocess
+    import sys
+    
+    # importing functions first used to fail because of a circular import
+    code = 'import sys, modules.functions; print("IPython" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True)
+    assert output.returncode == 0
+    assert output.stdout.strip() == 'False'
+
+
+def test_iter_game():
+    animals = [Dog(), Frog(), Lion(), Bear(), Turtle(), Snake()]
+    game = iter_game(list(animals), n_iter = 30, grid_size = (4, 4), seed = 5)
+    
+    first = next(game)
+    assert first.iteration == 0
+    positions = {i : position for i, species, position in first.spawns}
+    alive = set(positions)
+    
+    # apply the deltas to rebuild the board
+    for delta in game:
+        for i, old, new in delta.moves:
+            assert positions[i] == old
+            positions[i] = new
+        for battle_event in delta.battles:
+            assert battle_event[4] in battle_event[:2]
+        alive -= set(delta.deaths)
+        counts = {}
+        for i in alive:
+            counts[animals[i].species] = counts.get(animals[i].species, 0) + 1
+        assert counts == delta.species_count
+    
+    for i in alive:
+        assert animals[i].is_alive
+        assert animals[i].position == positions[i]
+        
+    # the game stops when the caller stops pulling
+    game = iter_game([Dog(), Snake()], n_iter = 10 ** 9, grid_size = (100, 100), seed = 1)
+    for delta in game:
+        if delta.iteration == 3:
+            break
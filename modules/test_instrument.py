@@ -0,0 +1,40 @@
+from modules.classes import *
+from modules.functions import run_simulation
+from modules.instrument import Instrumentation
+
+
+def test_instrumentation():
+    calls = []
+    instrument = Instrumentation(lambda inst, it: calls.append(it), every = 5)
+    animals = [Dog(), Frog(), Lion(), Bear(), Turtle(), Snake(), Eagle()]
+    animals += [Dog() for i in range(10)]
+    result = run_simulation(animals, 40, (5, 5), seed = 3, instrument = instrument)
+    
+    counters = instrument.counters
+    assert counters['iterations'] == sum(instrument.battle_histogram)
+    assert counters['battles'] == result.n_battles
+    assert 0 < counters['max_battles'] <= counters['battles']
+    # the highest bin with iterations holds the iteration with most battles
+    highest = max(i for i, count in enumerate(instrument.battle_histogram) if count > 0)
+    assert highest == counters['max_battles'].bit_length()
+    # every dead animal is purged at the start of the next iteration
+    assert counters['purged'] <= result.n_battles
+    assert calls == [it for it in range(counters['iterations']) if (it + 1) % 5 == 0]
+    assert instrument.timers['move'] > 0
+    assert 'battles_per_iteration' in instrument.summary()
+    
+    # the instrument does not change the game
+    again = run_simulation([Dog(), Frog(), Lion(), Bear(), Turtle(), Snake(), Eagle()] +
+                           [Dog() for i in range(10)], 40, (5, 5), seed = 3)
+    assert (again.winner, again.n_iter, again.n_battles) == (result.winner, result.n_iter, result.n_battles)
+
+
+def test_retries_counted_per_game():
+    counts = []
+    for i in range(2):
+        instrument = Instrumentation()
+        run_simulation([Lion(), Lion(), Dog(), Dog()], 30, (3, 3), seed = 1, instrument = instrument)
+        counts.append(instrument.counters['wander_retries_avoided'])
+        # a game without an instrument counts nothing
+        run_simulation([Lion(), Lion(), Dog(), Dog()], 30, (3, 3), seed = 2)
+    assert counts[0] == counts[1] > 0
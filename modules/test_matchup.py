@@ -0,0 +1,44 @@
+import json
+from fractions import Fraction
+
+from modules.matchup import fight_odds, load_matrix, mean_field, MatchupMatrix
+
+
+def test_fight_odds():
+    # turtles never attack, snakes don't fight back against eagles
+    assert fight_odds('dog', 'turtle') == 1
+    assert fight_odds('snake', 'eagle') == 0
+    assert fight_odds('eagle', 'snake') == 1
+    assert fight_odds('dog', 'dog') == Fraction(1, 2)
+    # a bear with attack_index 2 bites like the snake, lions always roar
+    # against snakes and roar beats bite
+    assert fight_odds('bear', 'snake', 2) == Fraction(1, 2)
+    assert fight_odds('lion', 'snake') == 1
+
+
+def test_matrix_cache(tmp_path):
+    path = str(tmp_path / 'matchups.json')
+    matrix = load_matrix(path)
+    assert matrix.win_probability('dog', 'turtle') == 1
+    assert matrix.duel('dog', 'dog') == Fraction(1, 2)
+    with open(path) as file:
+        data = json.load(file)
+    assert MatchupMatrix.from_dict(data).odds == matrix.odds
+
+    # a file of other classes is computed again and overwritten
+    data['fingerprint'] = 'old'
+    data['odds'] = [[one, i, two, j, '0'] for one, i, two, j, p in data['odds']]
+    with open(path, 'w') as file:
+        json.dump(data, file)
+    assert load_matrix(path).win_probability('dog', 'turtle') == 1
+    with open(path) as file:
+        assert json.load(file)['fingerprint'] == matrix.fingerprint
+
+
+def test_mean_field():
+    history = mean_field({'dog' : 4, 'turtle' : 4}, 10, (4, 4))
+    assert len(history) == 11
+    assert history[0] == {'dog' : 4, 'turtle' : 4}
+    # turtles lose every battle against dogs
+    assert history[-1]['turtle'] < history[-1]['dog']
+    assert all(after['dog'] <= before['dog'] for before, after in zip(history, history[1:]))
@@ -0,0 +1,66 @@
+import random
+
+from modules.classes import *
+from modules.functions import iter_game
+from modules.replay import ReplayReader, record_game
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / 'game.abr')
+    mix = {'dog' : 3, 'frog' : 2, 'lion' : 2, 'bear' : 2, 'eagle' : 1, 'snake' : 2}
+    animals = make_animals(mix)
+    random.Random(0).shuffle(animals)
+    order = tuple(animal.species for animal in animals)
+    result = record_game(path, animals, n_iter = 200, grid_size = (8, 8), seed = 3,
+                         checkpoint_every = 7)
+    
+    # play the same game again and compare every iteration with the file
+    again = [SPECIES_CLASSES[name]() for name in order]
+    expected = {}
+    positions = {}
+    alive = set()
+    for delta in iter_game(again, n_iter = 200, grid_size = (8, 8), seed = 3):
+        for i, species, position in delta.spawns:
+            positions[i] = position
+            alive.add(i)
+        for i, old, new in delta.moves:
+            positions[i] = new
+        alive -= set(delta.deaths)
+        expected[delta.iteration] = (dict(positions), set(alive), delta.species_count)
+    
+    with ReplayReader(path) as reader:
+        assert reader.seed == 3
+        assert reader.grid_size == (8, 8)
+        assert reader.n_iter == max(expected)
+        assert reader.species == order
+        for iteration in [reader.n_iter, 0, 6, 7, 8, 1, reader.n_iter // 2]:
+            state = reader.state_at(iteration)
+            positions, alive, species_count = expected[iteration]
+            assert {i for i, is_alive in enumerate(state.alive) if is_alive} == alive
+            for i in alive:
+                assert state.positions[i] == positions[i]
+            assert state.species_count() == species_count
+    
+    assert result.species_count == expected[max(expected)][2]
+
+
+def test_replay_seed_range(tmp_path):
+    path = str(tmp_path / 'game.abr')
+    # tournament seeds use all 64 bits
+    seed = 2 ** 63 + 5
+    result = record_game(path, make_animals({'dog' : 2, 'lion' : 2}), 20, (4, 4), seed)
+    with ReplayReader(path) as reader:
+        assert reader.seed == seed
+        assert reader.state_at(reader.n_iter).species_count() == result.species_count
+    
+    try:
+        record_game(path, make_animals({'dog' : 2}), 20, (4, 4), 2 ** 64)
+        assert False
+    except ValueError as error:
+        assert '2 ** 64' in str(error)
+
+    try:
+        record_game(path, make_animals({'dog' : 2}), 20, (4, 4), 1, checkpoint_every = 0)
+        assert False
+    except ValueError as error:
+        assert 'checkpoint_every' in str(error)
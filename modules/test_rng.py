@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from modules.rng import BlockRandom
+
+
+def test_block_random():
+    rng = BlockRandom(0, block_size = 8)
+    draws = [rng.randrange(3) for i in range(100)]
+    assert set(draws) == {0, 1, 2}
+    assert rng.choice(['roar']) == 'roar'
+    assert 0 <= rng.random() < 1
+    
+    items = list(range(20))
+    rng.shuffle(items)
+    assert sorted(items) == list(range(20))
+    
+    again = BlockRandom(0, block_size = 8)
+    assert [again.randrange(3) for i in range(100)] == draws
+    
+    # every range shares the same block, a long shuffle is one permutation
+    items = list(range(20000))
+    rng.shuffle(items)
+    assert sorted(items) == list(range(20000)) and items != list(range(20000))
+    assert len(rng._floats) <= rng.block_size
+    assert rng.randrange(2 ** 40) < 2 ** 40
@@ -0,0 +1,90 @@
+import os
+import signal
+import threading
+
+from modules.classes import *
+from modules.functions import run_simulation
+from modules.service import play_specs, SimulationClient, SimulationServer, SimulationService
+from modules.tournament import run_tournament
+
+
+MIX = {'dog' : 3, 'lion' : 2, 'turtle' : 2}
+
+
+def outcome(result):
+    return result.winner, result.n_iter, result.species_count, result.n_battles
+
+
+def test_service(tmp_path):
+    address = str(tmp_path / 'service.sock')
+    with SimulationServer(address, SimulationService(workers = 1)) as server:
+        with SimulationClient(address) as client:
+            for seed in range(5):
+                expected = run_simulation(make_animals(MIX), 20, (5, 5), seed)
+                assert outcome(client.run_simulation(MIX, 20, (5, 5), seed)) == outcome(expected)
+            # the order of the animals is kept
+            animals = [Lion(), Dog(), Turtle(), Dog()]
+            expected = run_simulation([Lion(), Dog(), Turtle(), Dog()], 20, (4, 4), 9)
+            assert outcome(client.play_board(animals, 20, (4, 4), 9)) == outcome(expected)
+            # a single animal is put in a collection first
+            assert client.play_board(Dog(), 5, (3, 3), 1).winner == 'dog'
+
+            metrics = client.metrics()
+            assert metrics['cache_misses'] == 7 and metrics['cache_hits'] == 0
+            client.run_simulation(MIX, 20, (5, 5), 3)
+            metrics = client.metrics()
+            assert metrics['cache_hits'] == 1 and metrics['games'] == 7
+            assert metrics['queue_depth'] == 0 and metrics['in_flight'] == 0
+
+            tournament = client.tournament(MIX, 40, 20, (5, 5), seed = 2, chunk_size = 10)
+            expected = run_tournament(MIX, 40, 20, (5, 5), seed = 2, workers = 1, chunk_size = 10)
+            assert tournament['wins'] == expected.wins and tournament['ties'] == expected.ties
+
+            try:
+                client.request({'type' : 'game', 'mix' : {'unicorn' : 2}})
+                assert False
+            except RuntimeError as error:
+                assert 'unicorn' in str(error)
+            # the connection still works after an error
+            assert client.metrics()['errors'] == 1
+
+
+def test_failed_games():
+    good = {'animals' : ['dog', 'lion'], 'n_iter' : 10, 'grid_size' : [3, 3]}
+    bad = {'animals' : ['dog', 'lion'], 'n_iter' : 10, 'grid_size' : [0, 3]}
+    # a game that fails does not fail the other games of its batch
+    played = play_specs([('one', good, 1), ('two', bad, 1)])
+    assert played[0][1] is not None and played[0][2] is None
+    assert played[1][1] is None and isinstance(played[1][2], ValueError)
+
+    with SimulationService(workers = 1, batch_wait = 0.5) as service:
+        # the bad game skips game_config and fails in the worker, in the same
+        # batch as the good game
+        answers = {}
+
+        def play(name, config):
+            try:
+                answers[name] = service.play(config, 1)[0]
+            except ValueError as error:
+                answers[name] = error
+
+        threads = [threading.Thread(target = play, args = (name, config))
+                   for name, config in (('good', good), ('bad', bad))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics = service.metrics()
+        assert metrics['batches'] == 1 and metrics['errors'] == 1 and metrics['games'] == 1
+        assert answers['good']['winner'] in ('dog', 'lion', None)
+        assert isinstance(answers['bad'], ValueError)
+        assert service.play(good, 1)[0] == answers['good']
+        assert not service.handle({'type' : 'game', 'mix' : {'dog' : 2}, 'n_iter' : -1})['ok']
+
+        # a pool with a dead worker is replaced instead of hanging
+        for pid in list(service.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        answers = [service.handle({'type' : 'game', 'mix' : {'dog' : 2, 'lion' : 2}, 'seed' : seed})
+                   for seed in (2, 3)]
+        assert answers[-1]['ok']
+        assert service.metrics()['restarts'] == 1 and service.metrics()['in_flight'] == 0
@@ -0,0 +1,39 @@
+from fractions import Fraction
+
+from modules.classes import *
+from modules.functions import run_simulation
+from modules.solver import enumerate_outcomes, solve_game, ExactSolver
+
+
+def test_enumerate_outcomes():
+    # the second draw only happens after the first option of the first
+    outcomes = enumerate_outcomes(lambda rng: rng.randrange(2) or rng.choice('ab'))
+    assert outcomes == {'a' : Fraction(1, 4), 'b' : Fraction(1, 4), 1 : Fraction(1, 2)}
+
+
+def test_solve_trivial():
+    assert solve_game([Dog(), Dog()], 5, (2, 2)) == {'dog' : 1}
+    # the animals of the caller are left as they were
+    bear = Bear()
+    solve_game([bear, Turtle()], 3, (2, 2))
+    assert bear.position == (0, 0) and bear.grid_size is None and bear.attack_index == 0
+    assert solve_game([Snake(), Frog()], 0, (2, 2)) == {'tie' : 1}
+    # snakes never move and frogs can't jump on a 2 x 2 board, so they only
+    # battle when they start on the same cell
+    outcome = solve_game([Snake(), Frog()], 10, (2, 2))
+    assert outcome['tie'] == Fraction(3, 4)
+
+
+def test_solve_matches_simulation():
+    mix = {'dog' : 1, 'lion' : 1, 'bear' : 1}
+    solver = ExactSolver((2, 3), 6)
+    outcome = solver.solve(make_animals(mix))
+    assert sum(outcome.values()) == 1
+    assert solver.cache_info()['values'].hits > 0
+
+    n_games = 4000
+    results = [run_simulation(make_animals(mix), 6, (2, 3), seed) for seed in range(n_games)]
+    for species, probability in outcome.items():
+        winner = None if species == 'tie' else species
+        share = sum(result.winner == winner for result in results) / n_games
+        assert abs(share - probability) < 0.03
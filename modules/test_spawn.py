@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from modules.classes import *
+from modules.functions import iter_game
+from modules.spawn import counts_for_density, place_animals, sample_cells, spawn_board
+
+
+def test_sample_cells():
+    rng = np.random.default_rng(0)
+    # a full region leaves no cell out
+    rows, cols = sample_cells(12, (3, 4), rng)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(r, c) for r in range(3) for c in range(4)]
+    
+    taken = np.array([0, 5, 6])
+    rows, cols = sample_cells(3, (3, 4), rng, region = (0, 0, 2, 3), taken = taken)
+    cells = set((rows * 4 + cols).tolist())
+    assert cells == {1, 2, 4}
+    
+    with pytest.raises(ValueError):
+        sample_cells(4, (3, 4), rng, region = (0, 0, 2, 3), taken = taken)
+
+
+def test_spawn_board():
+    counts = counts_for_density({'dog' : 1, 'snake' : 1}, (50, 40), 0.9)
+    assert sum(counts.values()) == 1800
+    board = spawn_board(counts, (50, 40), seed = 1, regions = {'snake' : (10, 10, 40, 40)})
+    cells = board.rows * 40 + board.cols
+    assert len(np.unique(cells)) == 1800
+    snakes = board.species == 6
+    assert board.rows[snakes].min() >= 10 and board.cols[snakes].min() >= 10
+    assert board.species_count() == counts
+
+
+def test_distinct_game():
+    animals = make_animals({'dog' : 10, 'frog' : 10, 'lion' : 5})
+    place_animals(animals, (5, 5), seed = 2)
+    assert len({animal.position for animal in animals}) == 25
+    
+    first = next(iter_game(make_animals({'dog' : 10, 'frog' : 15}), 10, (5, 5), seed = 3,
+                           distinct = True))
+    assert len({position for i, species, position in first.spawns}) == 25
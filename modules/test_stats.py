@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from modules.classes import *
+from modules.stats import COUNTS, CampaignStats, run_campaign, SPECIES_INDEX
+
+
+def test_add_game():
+    stats = CampaignStats((6, 6), 30, bins = (3, 3))
+    n_battles = 0
+    winners = 0
+    for seed in range(20):
+        result = stats.add_game(make_animals({'dog' : 3, 'lion' : 2, 'turtle' : 2}), seed = seed)
+        n_battles += result.n_battles
+        winners += result.winner is not None
+
+    assert stats.n_games == 20
+    assert stats.attacks.sum() == stats.species_wins.sum() == stats.deaths.sum() == n_battles
+    assert stats.victories.sum() == winners and stats.ties == 20 - winners
+    # every animal is counted at the start and the dead ones never come back
+    assert stats.survival[SPECIES_INDEX['dog'], 0] == 60
+    assert (np.diff(stats.survival, axis = 1) <= 0).all()
+    # the alive animals at the end are the animals that never lost
+    assert stats.survival[:, 0].sum() - stats.survival[:, -1].sum() == n_battles
+    assert stats.survival_curves()['turtle'][0] == 1
+
+
+def test_campaign_merge(tmp_path):
+    mix = {'dog' : 2, 'bear' : 2}
+    one = run_campaign(mix, 40, 20, (5, 5), seed = 3, workers = 1, chunk_size = 10)
+    two = run_campaign(mix, 40, 20, (5, 5), seed = 3, workers = 2, chunk_size = 10)
+    for name in COUNTS:
+        assert np.array_equal(getattr(one, name), getattr(two, name))
+
+    path = str(tmp_path / 'campaign.npz')
+    one.to_npz(path)
+    loaded = CampaignStats.from_npz(path)
+    loaded.merge(two)
+    assert loaded.n_games == 80
+    assert np.array_equal(loaded.survival, 2 * one.survival)
+
+    one.to_csv(str(tmp_path / 'csv'))
+    with open(str(tmp_path / 'csv' / 'survival.csv')) as file:
+        assert file.readline().strip() == 'iteration,dog,turtle,frog,eagle,bear,lion,snake'
+    assert len(os.listdir(str(tmp_path / 'csv'))) == 5
@@ -0,0 +1,38 @@
+from modules.classes import make_animals
+from modules.functions import run_simulation
+from modules.sweep import cell_key, pending_cells, run_sweep, sweep_configs, SweepCache
+
+
+def test_run_sweep(tmp_path):
+    path = str(tmp_path / 'sweep.db')
+    configs = sweep_configs([(4, 4), (6, 6)], [{'dog' : 2, 'snake' : 2}], [10, 20])
+    assert len(configs) == 4
+    
+    results = run_sweep(path, configs, 5, workers = 1, chunk_size = 3)
+    assert len(results) == 20
+    config, seed, result = results[7]
+    expected = run_simulation(make_animals(config['mix']), config['n_iter'],
+                              tuple(config['grid_size']), seed)
+    assert (result.winner, result.n_iter, result.n_battles) == \
+        (expected.winner, expected.n_iter, expected.n_battles)
+    
+    # adding seeds only leaves the new games to play
+    with SweepCache(path) as cache:
+        assert len(cache) == 20
+        assert pending_cells(cache, configs, 5) == []
+        assert len(pending_cells(cache, configs, 8)) == 12
+    
+    # a sweep on a pool of workers continues the same file
+    results = run_sweep(path, configs, 8, workers = 2)
+    assert len(results) == 32
+    assert all(result is not None for config, seed, result in results)
+    with SweepCache(path) as cache:
+        assert len(cache) == 32
+
+
+def test_cell_key_mix_order():
+    one = {'grid_size' : [5, 5], 'mix' : {'dog' : 2, 'lion' : 1}, 'n_iter' : 25}
+    two = {'n_iter' : 25, 'mix' : {'lion' : 1, 'dog' : 2}, 'grid_size' : [5, 5]}
+    # the animals move in the order of the mix, so it is another game
+    assert cell_key(one, 1) != cell_key(two, 1)
+    assert cell_key(one, 1) == cell_key(dict(two, mix = {'dog' : 2, 'lion' : 1}), 1)
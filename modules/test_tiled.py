@@ -0,0 +1,40 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from modules.tiled import counter_uniform, tile_edges, HashedBoard, TiledBoard
+
+
+MIX = {'dog' : 60, 'frog' : 40, 'eagle' : 20, 'lion' : 30, 'bear' : 30, 'turtle' : 20, 'snake' : 10}
+
+
+def outcome(result):
+    return result.winner, result.n_iter, result.species_count, result.n_battles
+
+
+def test_counter_uniform():
+    ids = np.arange(1000)
+    u = counter_uniform(7, ids, np.zeros(1000))
+    assert ((0 <= u) & (u < 1)).all()
+    assert len(np.unique(u)) == 1000
+    # a number only depends on the seed, the animal and the counter
+    assert (counter_uniform(7, ids[::-1], np.zeros(1000)) == u[::-1]).all()
+    assert (counter_uniform(8, ids, np.zeros(1000)) != u).any()
+    assert tile_edges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+
+
+def test_tiles_match_single_board():
+    expected = outcome(HashedBoard.from_counts(MIX, (12, 12), 3).play(40))
+    for n_tiles in (1, 2, 5, 12):
+        board = TiledBoard.from_counts(MIX, (12, 12), n_tiles, 3)
+        result = board.play(40, processes = False)
+        assert outcome(result) == expected
+    assert result.n_battles > 0
+
+
+def test_tile_processes():
+    expected = outcome(TiledBoard.from_counts(MIX, (12, 12), 1, 5).play(20, processes = False))
+    board = TiledBoard.from_counts(MIX, (12, 12), 3, 5)
+    assert outcome(board.play(20)) == expected
+    # the final population is kept after the shared memory is released
+    assert board.species_count() == expected[2]
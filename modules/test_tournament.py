@@ -0,0 +1,24 @@
+from modules.tournament import run_tournament, wilson_interval
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert wilson_interval(0, 10)[0] == 0.0
+    assert wilson_interval(10, 10)[1] == 1.0
+    
+    
+def test_run_tournament():
+    mix = {'dog' : 2, 'snake' : 2, 'frog' : 1}
+    result = run_tournament(mix, 40, n_iter = 20, seed = 7, workers = 1, chunk_size = 6)
+    assert result.n_games == 40
+    assert sum(result.wins.values()) + result.ties == 40
+    assert abs(sum(result.win_rates.values()) + result.tie_rate - 1) < 1e-9
+    for species in mix:
+        low, high = result.intervals[species]
+        assert low <= result.win_rates[species] <= high
+    
+    # the same master seed gives the same results, also on a process pool
+    again = run_tournament(mix, 40, n_iter = 20, seed = 7, workers = 2, chunk_size = 6)
+    assert again.wins == result.wins
+    assert again.ties == result.ties
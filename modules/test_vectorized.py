@@ -0,0 +1,83 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from modules.classes import *
+from modules.vectorized import ArrayBoard, SPECIES_ID, settle_battles
+
+
+def test_from_animals():
+    bear = Bear()
+    bear.attack_index = 2
+    board = ArrayBoard.from_animals([Dog(), bear, Snake()], (5, 5), seed = 0)
+    assert board.species_count() == {'dog' : 1, 'bear' : 1, 'snake' : 1}
+    assert list(board.attack_index) == [0, 2, 0]
+    assert np.all((0 <= board.rows) & (board.rows < 5))
+    
+    
+def test_moves():
+    counts = {'turtle' : 50, 'frog' : 50, 'lion' : 50, 'snake' : 50}
+    board = ArrayBoard.from_counts(counts, (1000, 1000), seed = 1)
+    species = board.species
+    rows = board.rows.copy()
+    cols = board.cols.copy()
+    board._move()
+    dist = np.abs(board.rows - rows) + np.abs(board.cols - cols)
+    
+    assert np.all(dist[species == SPECIES_ID['snake']] == 0)
+    assert np.all(dist[species == SPECIES_ID['frog']] == 2)
+    assert np.all(dist[species == SPECIES_ID['turtle']] == 1)
+    assert not np.any(board.can_move[species == SPECIES_ID['turtle']])
+    
+    # lions keep walking up until they reach the wall
+    lions = species == SPECIES_ID['lion']
+    assert np.all((board.rows[lions] == rows[lions] - 1) | (rows[lions] == 0))
+    
+    rows = board.rows.copy()
+    board._move()
+    assert np.all(board.rows[species == SPECIES_ID['turtle']] == rows[species == SPECIES_ID['turtle']])
+    
+    
+def test_play():
+    board = ArrayBoard.from_animals([Snake(), Turtle()], (1, 2), seed = 2)
+    result = board.play(10)
+    assert result.winner == 'snake'
+    assert result.n_battles == 1
+    
+    board = ArrayBoard.from_counts({'dog' : 20000, 'eagle' : 20000}, (100, 100), seed = 3)
+    board.play(3)
+    assert board.n_battles > 0
+    assert np.all((0 <= board.rows) & (board.rows < 100))
+    assert np.all((0 <= board.cols) & (board.cols < 100))
+
+
+def test_settle_battles():
+    rng = np.random.default_rng(4)
+    # roar loses to bump, bite beats bump, none loses to roar, bite beats roar
+    one_lost = settle_battles(np.array([1, 3, 0, 1]), np.array([2, 2, 1, 3]), rng)
+    assert list(one_lost) == [True, False, True, False]
+    
+    ties = settle_battles(np.full(1000, 2), np.full(1000, 2), rng)
+    assert 400 < ties.sum() < 600
+
+
+def test_battle_pairs():
+    board = ArrayBoard.from_animals([Snake(), Turtle(), Dog(), Frog(), Lion()], (5, 5), seed = 5)
+    # the turtle dies in the first pair so its second pair is skipped
+    losers, counts = board.battle_pairs([0, 1, 2], [1, 4, 3])
+    assert losers[0] == 1 and losers[1] == -1
+    assert losers[2] in (2, 3)
+    assert not board.alive[1] and not board.alive[losers[2]]
+    assert counts == board.species_count()
+    assert sum(counts.values()) == 3
+    assert board.n_battles == 2
+    
+    # a bear that fights twice rotates its attacks in the order of the pairs
+    board = ArrayBoard.from_counts({'bear' : 1, 'turtle' : 2}, (5, 5), seed = 6)
+    losers, counts = board.battle_pairs([0, 0], [1, 2])
+    assert list(losers) == [1, 2]
+    assert counts == {'bear' : 1}
+    assert board.attack_index[0] == 2
+    
+    with pytest.raises(ValueError):
+        board.battle_pairs([0], [0])
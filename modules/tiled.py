@@ -0,0 +1,712 @@
+"""This is the tiled module. This module plays a single giant board on many
+processes. The rows of the board are split into tiles, and every tile is
+played by its own worker process. The arrays of the population live in
+shared memory so that no process has to copy the board.
+
+Every iteration has two phases with a barrier in between. Every worker
+keeps the list of animals on its tile. First every worker moves its
+animals and hands the ones that crossed into another tile, at most two rows
+away for frogs and anywhere for eagles, to the worker of that tile. Then
+every worker settles the battles of the cells of its tile.
+
+The random numbers are a hash of the seed, the number of the animal and
+how many numbers the animal drew before (see HashedBoard), instead of a
+stream that depends on the order the animals are stored in. Ties in the
+order of arrivals on a cell are broken by the number of the animal. So a
+seed gives the same game for any number of tiles.
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from modules.functions import GameResult
+from modules.vectorized import ArrayBoard, LOSER, SPECIES, SPECIES_ID
+
+
+# constants of the splitmix64 generator
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_ONE = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_TWO = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(x):
+    """scrambles the bits of 64 bit integers with the splitmix64 finalizer
+
+    Parameters
+    ----------
+    x : numpy.ndarray of numpy.uint64
+        the integers
+
+    Returns
+    -------
+    numpy.ndarray of numpy.uint64
+        the scrambled integers
+    """
+
+    x = x ^ (x >> np.uint64(30))
+    x = x * _MIX_ONE
+    x = x ^ (x >> np.uint64(27))
+    x = x * _MIX_TWO
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_uniform(seed, ids, counters):
+    """returns a random number in [0, 1) for every (animal, counter) pair
+    that only depends on the seed, the animal and the counter
+
+    Parameters
+    ----------
+    seed : int
+        seed of the game
+    ids : numpy.ndarray of int
+        number of every animal
+    counters : numpy.ndarray of int
+        number of the draw of every animal
+
+    Returns
+    -------
+    numpy.ndarray of float
+        one number per pair
+    """
+
+    # the integers are meant to wrap around
+    with np.errstate(over = 'ignore'):
+        key = _mix(np.uint64(seed % 2 ** 64) + np.asarray(ids).astype(np.uint64) * _GAMMA)
+        bits = _mix(key + np.asarray(counters).astype(np.uint64) * _GAMMA)
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+class HashedBoard(ArrayBoard):
+    """This class is an ArrayBoard whose random numbers don't depend on the
+    order of the arrays. Every animal has a number and counts the random
+    numbers it drew, and its next number is counter_uniform of the two
+
+    Attributes
+    ----------
+    seed : int
+        seed of the game
+    ids : numpy.ndarray of int
+        number of every animal
+    draws : numpy.ndarray of int
+        how many random numbers every animal drew
+    """
+
+    ARRAYS = ArrayBoard.ARRAYS + ('ids', 'draws')
+
+    def __init__(self, species, grid_size, seed = None, positions = None):
+        """Constructor of HashedBoard. Every animal starts on a random
+        position with the default state of its species
+
+        Parameters
+        ----------
+        species : array of int
+            species id of every animal
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        seed : int or None
+            seed of the random numbers, default = None
+        positions : tuple of two arrays of int or None
+            rows and columns of every animal, default = None for random
+            positions that animals can share
+        """
+
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+        self.seed = seed
+        n = len(species)
+        self.ids = np.arange(n, dtype = np.int64)
+        self.draws = np.zeros(n, dtype = np.int64)
+        if positions is None:
+            everyone = np.arange(n)
+            positions = (self._integers(everyone, grid_size[0]), self._integers(everyone, grid_size[1]))
+        super().__init__(species, grid_size, seed, positions)
+
+    def _uniform(self, idx):
+        """draws the next random number of every given animal, an animal
+        must not be given twice
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+
+        Returns
+        -------
+        numpy.ndarray of float
+            one number per animal
+        """
+
+        u = counter_uniform(self.seed, self.ids[idx], self.draws[idx])
+        self.draws[idx] += 1
+        return u
+
+    def _integers(self, idx, high):
+        """draws a random integer in [0, high) for every given animal
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+        high : int
+            upper bound, excluded
+
+        Returns
+        -------
+        numpy.ndarray of int
+            one integer per animal
+        """
+
+        return (self._uniform(idx) * high).astype(np.int64)
+
+    def _arrival_order(self, idx, cell, moved):
+        """returns the order in which animals settle their cells like
+        ArrayBoard, with the number of the animal as the last tie breaker
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the alive animals
+        cell : numpy.ndarray of int
+            cell of every animal, see _cells
+        moved : numpy.ndarray of bool
+            whether every animal changed its cell
+
+        Returns
+        -------
+        numpy.ndarray of int
+            the order of idx
+        """
+
+        return np.lexsort((self.ids[idx], self._uniform(idx), moved, cell))
+
+    def _battle(self, animal_one, animal_two):
+        """battles the animals like ArrayBoard, ties are broken with the
+        random numbers of the first animals
+
+        Parameters
+        ----------
+        animal_one : numpy.ndarray of int
+            indices of the first animals of each battle
+        animal_two : numpy.ndarray of int
+            indices of the second animals of each battle
+
+        Returns
+        -------
+        numpy.ndarray of int
+            indices of the winners
+        """
+
+        attack_one = self._attacks(animal_one, animal_two)
+        attack_two = self._attacks(animal_two, animal_one)
+        loser = LOSER[attack_one, attack_two]
+        tie = loser == 2
+        loser[tie] = self._uniform(animal_one[tie]) < 0.5
+        one_lost = loser == 0
+        self.alive[np.where(one_lost, animal_one, animal_two)] = False
+        self.n_battles += len(animal_one)
+        return np.where(one_lost, animal_two, animal_one)
+
+
+# arrays of the population that are shared between the tiles, ids are the
+# index in the arrays
+SHARED = ('rows', 'cols', 'species', 'alive', 'can_move', 'move_index', 'move_count',
+          'attack_index', 'draws', 'moved')
+
+
+def tile_edges(n_rows, n_tiles):
+    """splits the rows of the board into tiles of about the same height
+
+    Parameters
+    ----------
+    n_rows : int
+        number of rows of the board
+    n_tiles : int
+        number of tiles
+
+    Returns
+    -------
+    list of tuple
+        (first row, end row) of every tile, the end is excluded
+    """
+
+    if not 1 <= n_tiles <= n_rows:
+        raise ValueError('the number of tiles must be between 1 and the number of rows')
+    edges = [n_rows * t // n_tiles for t in range(n_tiles + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _local_board(arrays, idx, grid_size, seed):
+    """copies some animals of the shared arrays into a HashedBoard
+
+    Parameters
+    ----------
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    idx : numpy.ndarray of int
+        indices of the animals in the shared arrays
+    grid_size : tuple of length 2 containing int
+        dimension of the whole board
+    seed : int
+        seed of the game
+
+    Returns
+    -------
+    HashedBoard
+        board of the animals, numbered by their index in the shared arrays
+    """
+
+    board = HashedBoard.__new__(HashedBoard)
+    board.grid_size = grid_size
+    board.seed = seed
+    board.n_battles = 0
+    board.ids = idx
+    for name in HashedBoard.ARRAYS:
+        if name != 'ids':
+            setattr(board, name, arrays[name][idx])
+    return board
+
+
+def _owned(arrays, band):
+    """returns the alive animals on the rows of a tile, this looks at every
+    animal and is only used to start a game
+
+    Parameters
+    ----------
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    band : tuple of int
+        (first row, end row) of the tile
+
+    Returns
+    -------
+    numpy.ndarray of int
+        indices of the animals
+    """
+
+    rows = arrays['rows']
+    return np.flatnonzero(arrays['alive'] & (rows >= band[0]) & (rows < band[1]))
+
+
+def _move_tile(arrays, owned, grid_size, seed):
+    """moves the animals of a tile and writes them back to the shared arrays
+
+    Parameters
+    ----------
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    owned : numpy.ndarray of int
+        animals that were on the tile after the last battles
+    grid_size : tuple of length 2 containing int
+        dimension of the whole board
+    seed : int
+        seed of the game
+    """
+
+    owned = owned[arrays['alive'][owned]]
+    board = _local_board(arrays, owned, grid_size, seed)
+    old_rows = board.rows.copy()
+    old_cols = board.cols.copy()
+    board._move()
+    for name in ('rows', 'cols', 'can_move', 'move_index', 'move_count', 'draws'):
+        arrays[name][owned] = getattr(board, name)
+    arrays['moved'][owned] = (board.rows != old_rows) | (board.cols != old_cols)
+
+
+def _hand_off(arrays, owned, tiles, tile):
+    """splits the animals of a tile after they moved into the ones that
+    stayed on the tile and the ones that crossed into other tiles
+
+    Parameters
+    ----------
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    owned : numpy.ndarray of int
+        animals that were on the tile before they moved
+    tiles : list of tuple
+        (first row, end row) of every tile
+    tile : int
+        number of the tile
+
+    Returns
+    -------
+    kept : numpy.ndarray of int
+        animals that are still on the tile
+    leaving : list of numpy.ndarray of int
+        animals that landed on every tile, empty for this tile
+    """
+
+    owned = owned[arrays['alive'][owned]]
+    rows = arrays['rows'][owned]
+    stays = (rows >= tiles[tile][0]) & (rows < tiles[tile][1])
+    if stays.all():
+        return owned, [owned[:0]] * len(tiles)
+
+    # group the animals that left by the tile they landed on
+    left = owned[~stays]
+    starts = [band[0] for band in tiles]
+    dest = np.searchsorted(starts, rows[~stays], side = 'right') - 1
+    order = np.argsort(dest, kind = 'stable')
+    bounds = np.searchsorted(dest[order], np.arange(len(tiles) + 1))
+    leaving = [left[order[bounds[t]:bounds[t + 1]]] for t in range(len(tiles))]
+    return owned[stays], leaving
+
+
+def _resolve_tile(arrays, owned, grid_size, seed):
+    """settles the battles on the cells of a tile
+
+    Parameters
+    ----------
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    owned : numpy.ndarray of int
+        animals on the tile, the ones that stayed and the ones that landed
+        on it in this iteration
+    grid_size : tuple of length 2 containing int
+        dimension of the whole board
+    seed : int
+        seed of the game
+
+    Returns
+    -------
+    owned : numpy.ndarray of int
+        animals on the tile that are still alive
+    n_battles : int
+        number of battles on the tile
+    """
+
+    board = _local_board(arrays, owned, grid_size, seed)
+    board._resolve(arrays['moved'][owned])
+    for name in ('alive', 'attack_index', 'draws'):
+        arrays[name][owned] = getattr(board, name)
+    return owned[board.alive], board.n_battles
+
+
+def _attach(specs):
+    """attaches to the shared memory of the arrays in a worker process
+
+    Parameters
+    ----------
+    specs : dict
+        dictionary that maps the names of SHARED to (name of the shared
+        memory, dtype, length)
+
+    Returns
+    -------
+    blocks : list of SharedMemory
+        the attached memory, to be closed by the worker
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays
+    """
+
+    blocks = []
+    arrays = {}
+    for name, (shm_name, dtype, n) in specs.items():
+        block = shared_memory.SharedMemory(name = shm_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(n, dtype = dtype, buffer = block.buf)
+    return blocks, arrays
+
+
+def _tile_worker(specs, tile, tiles, grid_size, seed, barrier, stop, battles, inboxes):
+    """plays one tile until the coordinator stops the game, this runs in
+    the worker processes
+
+    Parameters
+    ----------
+    specs : dict
+        shared arrays, see _attach
+    tile : int
+        number of the tile
+    tiles : list of tuple
+        (first row, end row) of every tile
+    grid_size : tuple of length 2 containing int
+        dimension of the whole board
+    seed : int
+        seed of the game
+    barrier : multiprocessing.Barrier
+        barrier of the coordinator and every worker
+    stop : multiprocessing.Value
+        set by the coordinator to end the game
+    battles : multiprocessing.Array
+        number of battles of every tile
+    inboxes : list of multiprocessing.Queue
+        queue of every tile that receives the animals that landed on it
+    """
+
+    blocks, arrays = _attach(specs)
+    try:
+        owned = _owned(arrays, tiles[tile])
+        while True:
+            barrier.wait()
+            if stop.value:
+                break
+            _move_tile(arrays, owned, grid_size, seed)
+            owned, leaving = _hand_off(arrays, owned, tiles, tile)
+            for other, animals in enumerate(leaving):
+                if other != tile:
+                    inboxes[other].put(animals)
+            barrier.wait()
+            arrived = [inboxes[tile].get() for other in range(len(tiles) - 1)]
+            here = np.sort(np.concatenate([owned] + arrived))
+            owned, n_battles = _resolve_tile(arrays, here, grid_size, seed)
+            battles[tile] += n_battles
+            barrier.wait()
+    except BaseException:
+        # let the coordinator and the other workers stop waiting
+        barrier.abort()
+        raise
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+class TiledBoard():
+    """This class plays a board split into tiles of rows, with the rules of
+    modules.vectorized and random numbers of HashedBoard
+
+    Attributes
+    ----------
+    grid_size : tuple
+        dimension of the grid
+    seed : int
+        seed of the game
+    tiles : list of tuple
+        (first row, end row) of every tile
+    arrays : dict
+        dictionary that maps the names of SHARED to the arrays of the
+        population
+    n_battles : int
+        number of battles fought on this board
+
+    Methods
+    -------
+    from_counts(counts, grid_size, n_tiles, seed)
+        creates a board from the number of animals of each species
+    species_count()
+        returns the dictionary of remaining animals per species
+    play(n_iter, processes)
+        plays the board until a species wins or n_iter is reached
+    """
+
+    def __init__(self, species, grid_size, n_tiles = 4, seed = None, positions = None):
+        """Constructor of TiledBoard. Every animal starts on a random
+        position with the default state of its species
+
+        Parameters
+        ----------
+        species : array of int
+            species id of every animal
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        n_tiles : int
+            number of tiles, default = 4
+        seed : int or None
+            seed of the random numbers, default = None
+        positions : tuple of two arrays of int or None
+            rows and columns of every animal, default = None for random
+            positions that animals can share
+        """
+
+        board = HashedBoard(species, grid_size, seed, positions)
+        self.grid_size = grid_size
+        self.seed = board.seed
+        self.tiles = tile_edges(grid_size[0], n_tiles)
+        self.arrays = {name : getattr(board, name) for name in SHARED if name != 'moved'}
+        self.arrays['moved'] = np.zeros(len(board.species), dtype = bool)
+        self.n_battles = 0
+
+    @classmethod
+    def from_counts(cls, counts, grid_size, n_tiles = 4, seed = None):
+        """creates a board from the number of animals of each species
+
+        Parameters
+        ----------
+        counts : dict
+            dictionary that maps the species name to the number of animals
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        n_tiles : int
+            number of tiles, default = 4
+        seed : int or None
+            seed of the random numbers, default = None
+
+        Returns
+        -------
+        TiledBoard
+            the new board
+        """
+
+        species = np.repeat([SPECIES_ID[name] for name in counts],
+                            [counts[name] for name in counts])
+        return cls(species, grid_size, n_tiles, seed)
+
+    def species_count(self):
+        """returns the number of remaining animals of every species
+
+        Returns
+        -------
+        dict
+            dictionary that maps the species name to the remaining count
+        """
+
+        counts = np.bincount(self.arrays['species'][self.arrays['alive']], minlength = len(SPECIES))
+        return {SPECIES[i] : int(count) for i, count in enumerate(counts) if count > 0}
+
+    def _winner(self, it):
+        """returns the outcome of the game when a species has won
+
+        Parameters
+        ----------
+        it : int
+            the iteration that is about to start
+
+        Returns
+        -------
+        GameResult or None
+            the outcome, None when the game goes on
+        """
+
+        species_count = self.species_count()
+        if len(species_count) == 1:
+            for winner in species_count.keys():
+                return GameResult(winner, it, species_count, self.n_battles)
+        return None
+
+    def play(self, n_iter = 25, processes = True):
+        """plays the board until only one species is left or the number of
+        iterations is reached
+
+        Parameters
+        ----------
+        n_iter : int
+            the number of iterations to run for this game. default = 25
+        processes : bool
+            whether to play every tile in its own process, default = True.
+            False plays the tiles one after the other in this process
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        if processes:
+            return self._play_processes(n_iter)
+
+        owned = [_owned(self.arrays, band) for band in self.tiles]
+        for it in range(n_iter):
+            result = self._winner(it)
+            if result is not None:
+                return result
+            # every tile moves before any battle is settled
+            arrived = [[] for band in self.tiles]
+            for t in range(len(self.tiles)):
+                _move_tile(self.arrays, owned[t], self.grid_size, self.seed)
+                owned[t], leaving = _hand_off(self.arrays, owned[t], self.tiles, t)
+                for other, animals in enumerate(leaving):
+                    arrived[other].append(animals)
+            for t in range(len(self.tiles)):
+                here = np.sort(np.concatenate([owned[t]] + arrived[t]))
+                owned[t], n_battles = _resolve_tile(self.arrays, here, self.grid_size, self.seed)
+                self.n_battles += n_battles
+        return GameResult(None, n_iter, self.species_count(), self.n_battles)
+
+    def _play_processes(self, n_iter):
+        """plays the board with a worker process per tile
+
+        Parameters
+        ----------
+        n_iter : int
+            the number of iterations to run for this game
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        context = multiprocessing.get_context()
+        n_tiles = len(self.tiles)
+        barrier = context.Barrier(n_tiles + 1)
+        stop = context.Value('b', 0)
+        battles = context.Array('q', n_tiles)
+        inboxes = [context.Queue() for t in range(n_tiles)]
+
+        # move the arrays into shared memory
+        blocks = []
+        specs = {}
+        private = self.arrays
+        self.arrays = {}
+        try:
+            for name, array in private.items():
+                block = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+                blocks.append(block)
+                shared = np.ndarray(len(array), dtype = array.dtype, buffer = block.buf)
+                shared[:] = array
+                self.arrays[name] = shared
+                specs[name] = (block.name, array.dtype.str, len(array))
+
+            workers = [context.Process(target = _tile_worker,
+                                       args = (specs, t, self.tiles, self.grid_size, self.seed, barrier,
+                                               stop, battles, inboxes))
+                       for t in range(n_tiles)]
+            for worker in workers:
+                worker.start()
+
+            result = None
+            try:
+                for it in range(n_iter):
+                    self.n_battles = sum(battles)
+                    result = self._winner(it)
+                    if result is not None:
+                        break
+                    # start the iteration, wait for the moves and the battles
+                    barrier.wait()
+                    barrier.wait()
+                    barrier.wait()
+                self.n_battles = sum(battles)
+                stop.value = 1
+                barrier.wait()
+            finally:
+                for worker in workers:
+                    worker.join()
+        finally:
+            # keep the final population after the shared memory is gone
+            self.arrays = {name : np.array(array) for name, array in self.arrays.items()}
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        if result is None:
+            result = GameResult(None, n_iter, self.species_count(), self.n_battles)
+        return result
+
+
+def run_tiled(counts, grid_size, n_tiles = 4, n_iter = 25, seed = None, processes = True):
+    """plays a board split into tiles
+
+    Parameters
+    ----------
+    counts : dict
+        dictionary that maps the species name to the number of animals
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    n_tiles : int
+        number of tiles, default = 4
+    n_iter : int
+        the number of iterations to run for this game. default = 25
+    seed : int or None
+        seed of the random numbers, default = None
+    processes : bool
+        whether to play every tile in its own process, default = True
+
+    Returns
+    -------
+    GameResult
+        the outcome of the game
+    """
+
+    return TiledBoard.from_counts(counts, grid_size, n_tiles, seed).play(n_iter, processes)
@@ -0,0 +1,208 @@
+"""This is the tournament module. This module contains functions for
+playing many independent games of the same species mix on a pool of
+worker processes and estimating how often each species wins.
+"""
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.classes import make_animals
+from modules.functions import run_simulation
+
+
+class TournamentResult():
+    """This class stores the aggregated outcome of a tournament
+
+    Attributes
+    ----------
+    n_games : int
+        number of games played
+    seed : int
+        master seed of the tournament, used to replay it
+    wins : dict
+        dictionary that maps the species name to the number of games won
+    ties : int
+        number of games that ended in a tie
+    win_rates : dict
+        dictionary that maps the species name to the fraction of games won
+    tie_rate : float
+        fraction of games that ended in a tie
+    intervals : dict
+        dictionary that maps the species name (and 'tie') to the 95%
+        Wilson confidence interval of its rate as a tuple (low, high)
+    """
+
+    def __init__(self, mix, n_games, seed, winners):
+        """Constructor of TournamentResult
+
+        Parameters
+        ----------
+        mix : dict
+            dictionary that maps the species name to the number of animals
+        n_games : int
+            number of games played
+        seed : int
+            master seed of the tournament
+        winners : list of str or None
+            winner of every game, None for a tie
+        """
+
+        self.n_games = n_games
+        self.seed = seed
+        self.wins = {species : 0 for species in mix}
+        self.ties = 0
+        for winner in winners:
+            if winner is None:
+                self.ties += 1
+            else:
+                self.wins[winner] += 1
+
+        self.win_rates = {species : wins / n_games for species, wins in self.wins.items()}
+        self.tie_rate = self.ties / n_games
+        self.intervals = {species : wilson_interval(wins, n_games)
+                          for species, wins in self.wins.items()}
+        self.intervals['tie'] = wilson_interval(self.ties, n_games)
+
+    def __repr__(self):
+        return ('TournamentResult(n_games=' + str(self.n_games) + ', win_rates='
+                + repr(self.win_rates) + ', tie_rate=' + repr(self.tie_rate) + ')')
+
+
+def wilson_interval(successes, n, z = 1.96):
+    """returns the Wilson score interval of a proportion
+
+    Parameters
+    ----------
+    successes : int
+        number of successes
+    n : int
+        number of trials
+    z : float
+        quantile of the normal distribution, default = 1.96 for 95%
+
+    Returns
+    -------
+    tuple of float
+        lower and upper bound of the interval
+    """
+
+    if n == 0:
+        return (0.0, 1.0)
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return (max(0.0, center - half), min(1.0, center + half))
+
+
+def game_seeds(seed, n_games, chunk_size):
+    """splits the games into chunks and draws the seed of every game. Each
+    chunk draws from its own stream derived from the master seed, so the
+    seeds don't depend on which worker plays the chunk
+
+    Parameters
+    ----------
+    seed : int
+        master seed of the tournament
+    n_games : int
+        number of games to play
+    chunk_size : int
+        number of games in every chunk
+
+    Returns
+    -------
+    chunks : list of list of int
+        seeds of the games of every chunk
+    """
+
+    chunks = []
+    for start in range(0, n_games, chunk_size):
+        stream = random.Random(str(seed) + ':' + str(len(chunks)))
+        size = min(chunk_size, n_games - start)
+        chunks.append([stream.getrandbits(64) for i in range(size)])
+    return chunks
+
+
+def play_games(mix, n_iter, grid_size, seeds):
+    """plays one game of the species mix for every seed
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+    n_iter : int
+        the number of iterations of every game
+    grid_size : tuple of length 2 containing int
+        dimension of the grid
+    seeds : list of int
+        seed of every game
+
+    Returns
+    -------
+    winners : list of str or None
+        winner of every game, None for a tie
+    """
+
+    winners = []
+    for seed in seeds:
+        animals = make_animals(mix)
+        # the animals move in a random but reproducible order, drawn from
+        # a stream of its own so it does not follow the game's numbers
+        random.Random(str(seed) + ':order').shuffle(animals)
+        winners.append(run_simulation(animals, n_iter, grid_size, seed).winner)
+    return winners
+
+
+def run_tournament(mix, n_games, n_iter = 25, grid_size = (5, 5), seed = None,
+                   workers = None, chunk_size = None):
+    """plays n_games independent games of the species mix, spread over a
+    pool of worker processes, and aggregates the winners
+
+    Parameters
+    ----------
+    mix : dict
+        dictionary that maps the species name to the number of animals
+    n_games : int
+        number of games to play
+    n_iter : int
+        the number of iterations of every game. default = 25
+    grid_size : tuple of length 2 containing int
+        dimension of the grid, default = (5, 5)
+    seed : int or None
+        master seed of the tournament, default = None for a random seed
+    workers : int or None
+        number of worker processes, 1 plays every game in this process.
+        default = None for the number of cores
+    chunk_size : int or None
+        number of games submitted to a worker at once, default = None
+        for four chunks per worker
+
+    Returns
+    -------
+    TournamentResult
+        the aggregated outcome of the tournament
+    """
+
+    if n_games <= 0:
+        raise ValueError('n_games must be positive')
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(n_games / (4 * workers)))
+
+    chunks = game_seeds(seed, n_games, chunk_size)
+    winners = []
+    if workers == 1:
+        for seeds in chunks:
+            winners.extend(play_games(mix, n_iter, grid_size, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            futures = [executor.submit(play_games, mix, n_iter, grid_size, seeds)
+                       for seeds in chunks]
+            # collect in submission order so that results are reproducible
+            for future in futures:
+                winners.extend(future.result())
+    return TournamentResult(mix, n_games, seed, winners)
@@ -0,0 +1,615 @@
+"""This is the vectorized module. This module contains an alternative
+engine that stores the whole population in NumPy arrays (one array per
+attribute instead of one object per animal) so that boards with millions
+of animals can be played.
+
+The species behave like the classes in modules.classes, but every animal
+moves at the same time in an iteration and battles are resolved
+afterwards for every cell that holds more than one animal.
+"""
+
+import numpy as np
+
+from modules.classes import Animal
+from modules.functions import BATTLE_TABLE, GameResult
+
+
+# species ids used in the species array
+DOG, TURTLE, FROG, EAGLE, BEAR, LION, SNAKE = range(7)
+SPECIES = ('dog', 'turtle', 'frog', 'eagle', 'bear', 'lion', 'snake')
+SPECIES_ID = {name : i for i, name in enumerate(SPECIES)}
+
+# attack ids, see modules.functions.ATTACKS
+NONE, ROAR, BUMP, BITE = range(4)
+
+# default moves of Animal, the order matters for Lion.move_index
+MOVES = np.array([[-1, 0], [1, 0], [0, 1], [0, -1]])
+# distance of a single move for every species (eagles fly, snakes stay)
+STEPS = np.array([1, 1, 2, 0, 1, 1, 0])
+
+# LOSER[attack_one, attack_two] is 0 when the first animal loses, 1 when
+# the second animal loses and 2 when the loser is chosen by random
+LOSER = np.array(BATTLE_TABLE)
+
+
+def settle_battles(attack_one, attack_two, rng):
+    """settles a whole array of battles from the attacks of both sides
+
+    Parameters
+    ----------
+    attack_one : numpy.ndarray of int
+        attack ids of the first animal of every battle
+    attack_two : numpy.ndarray of int
+        attack ids of the second animal of every battle
+    rng : numpy.random.Generator
+        random number generator used to break ties
+
+    Returns
+    -------
+    numpy.ndarray of bool
+        whether the first animal lost each battle
+    """
+
+    loser = LOSER[attack_one, attack_two]
+    # choose the loser by random when the attacks are the same
+    tie = loser == 2
+    loser[tie] = rng.random(np.count_nonzero(tie)) < 0.5
+    return loser == 0
+
+
+def _pair_waves(animal_one, animal_two):
+    """splits a list of battles into waves so that no animal fights twice in
+    a wave and the battles of every animal keep their order
+
+    Parameters
+    ----------
+    animal_one : numpy.ndarray of int
+        indices of the first animals of each battle
+    animal_two : numpy.ndarray of int
+        indices of the second animals of each battle
+
+    Returns
+    -------
+    numpy.ndarray of int
+        wave of every battle
+    """
+
+    fighters = np.concatenate([animal_one, animal_two])
+    if len(fighters) == 0 or np.bincount(fighters).max() == 1:
+        # no animal fights twice, everything is settled at once
+        return np.zeros(len(animal_one), dtype = np.int64)
+
+    wave = np.empty(len(animal_one), dtype = np.int64)
+    last = {}
+    for pair, (one, two) in enumerate(zip(animal_one.tolist(), animal_two.tolist())):
+        wave[pair] = max(last.get(one, -1), last.get(two, -1)) + 1
+        last[one] = last[two] = wave[pair]
+    return wave
+
+
+class ArrayBoard():
+    """This class stores a population of animals as a structure of arrays
+    and plays it on a board with vectorized operations
+
+    Attributes
+    ----------
+    grid_size : tuple
+        tuple containing the dimensions of the grid
+    rows : numpy.ndarray of int
+        row of every animal
+    cols : numpy.ndarray of int
+        column of every animal
+    species : numpy.ndarray of int
+        species id of every animal, see SPECIES
+    alive : numpy.ndarray of bool
+        whether every animal is alive or not
+    can_move : numpy.ndarray of bool
+        Turtle.can_move of every animal
+    move_index : numpy.ndarray of int
+        Lion.move_index of every animal
+    move_count : numpy.ndarray of int
+        Lion.move_count of every animal
+    attack_index : numpy.ndarray of int
+        Bear.attack_index of every animal
+    rng : numpy.random.Generator
+        random number generator of this board
+    n_battles : int
+        number of battles fought on this board
+
+    Methods
+    -------
+    from_animals(animals, grid_size, seed)
+        creates a board from Animal objects
+    from_counts(counts, grid_size, seed)
+        creates a board from the number of animals of each species
+    species_count()
+        returns the dictionary of remaining animals per species
+    battle_pairs(animal_one, animal_two)
+        battles a list of pairs and returns the losers and species counts
+    step()
+        plays one iteration of the board
+    play(n_iter)
+        plays the board until a species wins or n_iter is reached
+    """
+
+    # names of the arrays that hold one value per animal
+    ARRAYS = ('rows', 'cols', 'species', 'alive', 'can_move', 'move_index', 'move_count',
+              'attack_index')
+
+    def __init__(self, species, grid_size, seed = None, positions = None):
+        """Constructor of ArrayBoard. Every animal starts on a random
+        position with the default state of its species
+
+        Parameters
+        ----------
+        species : array of int
+            species id of every animal
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        seed : int or None
+            seed of the random number generator, default = None
+        positions : tuple of two arrays of int or None
+            rows and columns of every animal, default = None for random
+            positions that animals can share
+        """
+
+        self.grid_size = grid_size
+        self.rng = np.random.default_rng(seed)
+        self.species = np.asarray(species, dtype = np.int8)
+        n = len(self.species)
+
+        if positions is None:
+            # randomize the position of each animal
+            self.rows = self.rng.integers(grid_size[0], size = n)
+            self.cols = self.rng.integers(grid_size[1], size = n)
+        else:
+            self.rows = np.asarray(positions[0], dtype = np.int64)
+            self.cols = np.asarray(positions[1], dtype = np.int64)
+
+        self.alive = np.ones(n, dtype = bool)
+        self.can_move = np.ones(n, dtype = bool)
+        self.move_index = np.zeros(n, dtype = np.int8)
+        self.move_count = np.zeros(n, dtype = np.int8)
+        self.attack_index = np.zeros(n, dtype = np.int8)
+        self.n_battles = 0
+
+    @classmethod
+    def from_animals(cls, animals, grid_size, seed = None):
+        """creates a board from Animal objects and copies their state
+
+        Parameters
+        ----------
+        animals : iterable of Animal
+            the animals to put on the board
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        seed : int or None
+            seed of the random number generator, default = None
+
+        Returns
+        -------
+        ArrayBoard
+            the new board
+        """
+
+        if isinstance(animals, Animal):
+            animals = [animals]
+        animals = list(animals)
+        board = cls([SPECIES_ID[animal.species] for animal in animals], grid_size, seed)
+
+        # copy the species specific state of every animal
+        for i, animal in enumerate(animals):
+            board.alive[i] = animal.is_alive
+            board.can_move[i] = getattr(animal, 'can_move', True)
+            board.move_index[i] = getattr(animal, 'move_index', 0)
+            board.move_count[i] = getattr(animal, 'move_count', 0)
+            board.attack_index[i] = getattr(animal, 'attack_index', 0)
+        return board
+
+    @classmethod
+    def from_counts(cls, counts, grid_size, seed = None):
+        """creates a board from the number of animals of each species
+
+        Parameters
+        ----------
+        counts : dict
+            dictionary that maps the species name to the number of animals
+        grid_size : tuple of length 2 containing int
+            dimension of the grid
+        seed : int or None
+            seed of the random number generator, default = None
+
+        Returns
+        -------
+        ArrayBoard
+            the new board
+        """
+
+        species = np.repeat([SPECIES_ID[name] for name in counts],
+                            [counts[name] for name in counts])
+        return cls(species, grid_size, seed)
+
+    def species_count(self):
+        """returns the number of remaining animals of every species
+
+        Returns
+        -------
+        dict
+            dictionary that maps the species name to the remaining count
+        """
+
+        counts = np.bincount(self.species[self.alive], minlength = len(SPECIES))
+        return {SPECIES[i] : int(count) for i, count in enumerate(counts) if count > 0}
+
+    def _uniform(self, idx):
+        """draws a random number in [0, 1) for every given animal
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+
+        Returns
+        -------
+        numpy.ndarray of float
+            one number per animal
+        """
+
+        return self.rng.random(len(idx))
+
+    def _integers(self, idx, high):
+        """draws a random integer in [0, high) for every given animal
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+        high : int
+            upper bound, excluded
+
+        Returns
+        -------
+        numpy.ndarray of int
+            one integer per animal
+        """
+
+        return self.rng.integers(high, size = len(idx))
+
+    def _pick_valid(self, valid, idx):
+        """picks one of the valid moves uniformly, which is the same
+        distribution as retrying random moves until one is valid
+
+        Parameters
+        ----------
+        valid : numpy.ndarray of bool
+            array of shape (n, 4) of whether every move is valid
+        idx : numpy.ndarray of int
+            indices of the animals the moves belong to
+
+        Returns
+        -------
+        numpy.ndarray of int
+            index of the chosen move, -1 when no move is valid
+        """
+
+        n_valid = valid.sum(axis = 1)
+        # pick the k-th valid move of every animal
+        k = (self._uniform(idx) * n_valid).astype(np.int64)
+        choice = np.argmax(np.cumsum(valid, axis = 1) > k[:, None], axis = 1)
+        choice[n_valid == 0] = -1
+        return choice
+
+    def _valid_moves(self, idx):
+        """returns which of the four moves are valid for the given animals
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals to check
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            array of shape (len(idx), 4) of whether every move is valid
+        """
+
+        steps = STEPS[self.species[idx]][:, None]
+        new_rows = self.rows[idx][:, None] + MOVES[:, 0] * steps
+        new_cols = self.cols[idx][:, None] + MOVES[:, 1] * steps
+        return ((0 <= new_rows) & (new_rows < self.grid_size[0])
+                & (0 <= new_cols) & (new_cols < self.grid_size[1]))
+
+    def _apply_moves(self, idx, choice):
+        """adds the chosen move to the position of the given animals
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals to move
+        choice : numpy.ndarray of int
+            index of the move of each animal, -1 to stay in place
+        """
+
+        # animals without any valid move stay where they are
+        has_move = choice >= 0
+        idx = idx[has_move]
+        choice = choice[has_move]
+        steps = STEPS[self.species[idx]]
+        self.rows[idx] += MOVES[choice, 0] * steps
+        self.cols[idx] += MOVES[choice, 1] * steps
+
+    def _move(self):
+        """moves every alive animal according to its species
+        """
+
+        species = self.species
+        alive = self.alive
+
+        # dogs, frogs, bears and turtles that can move wander randomly
+        is_turtle = alive & (species == TURTLE)
+        walkers = np.flatnonzero(alive & ((species == DOG) | (species == FROG) | (species == BEAR)
+                                          | (is_turtle & self.can_move)))
+        self._apply_moves(walkers, self._pick_valid(self._valid_moves(walkers), walkers))
+        # turtles move every other round
+        self.can_move[is_turtle] = ~self.can_move[is_turtle]
+
+        # eagles fly to any position on the board
+        eagles = np.flatnonzero(alive & (species == EAGLE))
+        self.rows[eagles] = self._integers(eagles, self.grid_size[0])
+        self.cols[eagles] = self._integers(eagles, self.grid_size[1])
+
+        # lions keep their direction for four moves, and when the direction
+        # is blocked they keep trying until a random new direction is valid
+        lions = np.flatnonzero(alive & (species == LION))
+        valid = self._valid_moves(lions)
+        move_index = self.move_index[lions].astype(np.int64)
+        keeps = valid[np.arange(len(lions)), move_index]
+
+        straight = lions[keeps]
+        self._apply_moves(straight, move_index[keeps])
+        count = self.move_count[straight] + 1
+        switch = count == 4
+        count[switch] = 0
+        self.move_count[straight] = count
+        self.move_index[straight[switch]] = self._integers(straight[switch], 4)
+
+        turning = lions[~keeps]
+        choice = self._pick_valid(valid[~keeps], turning)
+        self._apply_moves(turning, choice)
+        self.move_index[turning] = np.where(choice >= 0, choice, self.move_index[turning])
+        self.move_count[turning] = 1
+
+    def _attacks(self, me, opponent):
+        """returns the attack of every animal in me against the animal
+        at the same index in opponent, and rotates the attacks of bears
+
+        Parameters
+        ----------
+        me : numpy.ndarray of int
+            indices of the attacking animals
+        opponent : numpy.ndarray of int
+            indices of their opponents
+
+        Returns
+        -------
+        numpy.ndarray of int
+            attack ids, see modules.functions.ATTACKS
+        """
+
+        species = self.species[me]
+        other = self.species[opponent]
+        u = self._uniform(me)
+        # random attack out of roar, bump and bite
+        any_attack = 1 + (u * 3).astype(np.int8)
+        # random attack out of roar and bite
+        lion_attack = np.where(u < 0.5, ROAR, BITE)
+
+        attack = np.select(
+            [species == DOG,
+             species == FROG,
+             (species == EAGLE) & (other == DOG),
+             (species == EAGLE) & (other == FROG),
+             species == EAGLE,
+             species == BEAR,
+             (species == LION) & (other == SNAKE),
+             species == LION,
+             (species == SNAKE) & (other != EAGLE)],
+            [any_attack,
+             BUMP,
+             ROAR,
+             BITE,
+             any_attack,
+             1 + self.attack_index[me],
+             ROAR,
+             lion_attack,
+             BITE],
+            NONE)
+
+        bears = me[species == BEAR]
+        self.attack_index[bears] = (self.attack_index[bears] + 1) % 3
+        return attack
+
+    def _battle(self, animal_one, animal_two):
+        """battles every animal in animal_one with the animal at the same
+        index in animal_two and kills the losers
+
+        Parameters
+        ----------
+        animal_one : numpy.ndarray of int
+            indices of the first animals of each battle
+        animal_two : numpy.ndarray of int
+            indices of the second animals of each battle
+
+        Returns
+        -------
+        numpy.ndarray of int
+            indices of the winners
+        """
+
+        attack_one = self._attacks(animal_one, animal_two)
+        attack_two = self._attacks(animal_two, animal_one)
+        one_lost = settle_battles(attack_one, attack_two, self.rng)
+        self.alive[np.where(one_lost, animal_one, animal_two)] = False
+        self.n_battles += len(animal_one)
+        return np.where(one_lost, animal_two, animal_one)
+
+    def battle_pairs(self, animal_one, animal_two):
+        """battles every animal in animal_one with the animal at the same
+        index in animal_two in the order of the pairs and kills the losers.
+        Pairs that share no animal are settled together with arrays, a pair
+        is skipped when one of its animals is already dead
+
+        Parameters
+        ----------
+        animal_one : array of int
+            indices of the first animals of each battle
+        animal_two : array of int
+            indices of the second animals of each battle
+
+        Returns
+        -------
+        losers : numpy.ndarray of int
+            index of the loser of every pair, -1 if the pair was skipped
+        species_count : dict
+            dictionary that maps the species name to the remaining count
+        """
+
+        animal_one = np.asarray(animal_one, dtype = np.int64)
+        animal_two = np.asarray(animal_two, dtype = np.int64)
+        if animal_one.shape != animal_two.shape:
+            raise ValueError('animal_one and animal_two must have the same length')
+        if np.any(animal_one == animal_two):
+            raise ValueError('an animal can not battle itself')
+
+        losers = np.full(len(animal_one), -1, dtype = np.int64)
+        wave = _pair_waves(animal_one, animal_two)
+        # group the pairs by wave, the stable sort keeps their order
+        order = np.argsort(wave, kind = 'stable')
+        bounds = np.flatnonzero(np.diff(wave[order])) + 1
+        for pairs in np.split(order, bounds) if len(order) > 0 else []:
+            one = animal_one[pairs]
+            two = animal_two[pairs]
+            fight = self.alive[one] & self.alive[two]
+            pairs, one, two = pairs[fight], one[fight], two[fight]
+            winners = self._battle(one, two)
+            losers[pairs] = np.where(winners == one, two, one)
+        return losers, self.species_count()
+
+    def _resolve(self, moved):
+        """battles animals that share a cell until one animal is left on
+        each cell. Animals that stayed in place hold their cell and the
+        animals that moved in attack the holder one at a time in random order
+
+        Parameters
+        ----------
+        moved : numpy.ndarray of bool
+            whether every animal changed its cell in this iteration
+        """
+
+        idx = np.flatnonzero(self.alive)
+        cell = self._cells(idx)
+        order = self._arrival_order(idx, cell, moved[idx])
+        idx = idx[order]
+        cell = cell[order]
+
+        # find the first animal and the size of every group sharing a cell
+        is_start = np.ones(len(idx), dtype = bool)
+        is_start[1:] = cell[1:] != cell[:-1]
+        starts = np.flatnonzero(is_start)
+        sizes = np.diff(np.append(starts, len(idx)))
+
+        crowded = sizes > 1
+        starts = starts[crowded]
+        sizes = sizes[crowded]
+        holders = idx[starts]
+
+        # the r-th arrival of every cell attacks the current holder
+        for r in range(1, sizes.max() if len(sizes) else 1):
+            has_arrival = sizes > r
+            arrivals = idx[starts[has_arrival] + r]
+            holders[has_arrival] = self._battle(arrivals, holders[has_arrival])
+
+    def _arrival_order(self, idx, cell, moved):
+        """returns the order in which animals settle their cells: by cell,
+        then the animals that stayed first, then in random order
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the alive animals
+        cell : numpy.ndarray of int
+            cell of every animal, see _cells
+        moved : numpy.ndarray of bool
+            whether every animal changed its cell
+
+        Returns
+        -------
+        numpy.ndarray of int
+            the order of idx
+        """
+
+        # all packed in one integer key because a single sort is fastest
+        key = (2 * cell + moved) << 20 | self._integers(idx, 1 << 20)
+        return np.argsort(key)
+
+    def _cells(self, idx):
+        """returns the number of the cell of the given animals
+
+        Parameters
+        ----------
+        idx : numpy.ndarray of int
+            indices of the animals
+
+        Returns
+        -------
+        numpy.ndarray of int
+            row * number of columns + column of every animal
+        """
+
+        return self.rows[idx] * self.grid_size[1] + self.cols[idx]
+
+    def _compact(self):
+        """drops dead animals from the arrays
+        """
+
+        keep = self.alive
+        for name in self.ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+
+    def step(self):
+        """plays one iteration of the board, every animal moves and then
+        animals on the same cell battle
+        """
+
+        old_rows = self.rows.copy()
+        old_cols = self.cols.copy()
+        self._move()
+        self._resolve((self.rows != old_rows) | (self.cols != old_cols))
+
+        # drop dead animals once they take up most of the arrays
+        if 2 * np.count_nonzero(self.alive) < len(self.alive):
+            self._compact()
+
+    def play(self, n_iter = 25):
+        """plays the board until only one species is left or the number of
+        iterations is reached
+
+        Parameters
+        ----------
+        n_iter : int
+            the number of iterations to run for this game. default = 25
+
+        Returns
+        -------
+        GameResult
+            the outcome of the game
+        """
+
+        for it in range(n_iter):
+            species_count = self.species_count()
+            # Check if a species has won
+            if len(species_count) == 1:
+                for winner in species_count.keys():
+                    return GameResult(winner, it, species_count, self.n_battles)
+            self.step()
+        return GameResult(None, n_iter, self.species_count(), self.n_battles)